@@ -1,13 +1,25 @@
 from django.contrib import admin
 
-from .models import InvertedIndex, DocumentPhrase
+from .models import (
+    Term, InvertedIndex, DocumentPhrase, CorpusStatistic, TermStatistic, VocabularyTerm, IndexingJob,
+    ExtractionFailure,
+)
+
+
+@admin.register(Term)
+class TermAdmin(admin.ModelAdmin):
+    list_display = ('id', 'text')
+    search_fields = ('text',)
+    ordering = ('text',)
 
 
 @admin.register(InvertedIndex)
 class InvertedIndexAdmin(admin.ModelAdmin):
     list_display = ('term', 'original_term', 'document', 'term_frequency', 'document_frequency', 'tf_idf', 'indexed_at')
-    list_filter = ('document__file_type',)
-    search_fields = ('term', 'original_term', 'document__original_filename', 'document__uploaded_by__username')
+    list_filter = ('document__file_type', 'deleted')
+    search_fields = ('term__text', 'original_term__text', 'document__original_filename', 'user__username')
+    list_select_related = ('term', 'original_term', 'document')
+    raw_id_fields = ('term', 'original_term', 'document', 'user')
     readonly_fields = ('indexed_at',)
     ordering = ('-tf_idf',)
 
@@ -16,7 +28,7 @@ class InvertedIndexAdmin(admin.ModelAdmin):
 class DocumentPhraseAdmin(admin.ModelAdmin):
     list_display = ('phrase_preview', 'document', 'position')
     list_filter = ('document__file_type',)
-    search_fields = ('phrase', 'document__original_filename', 'document__uploaded_by__username')
+    search_fields = ('phrase', 'document__original_filename', 'user__username')
     ordering = ('document', 'position')
 
     @admin.display(description='Phrase')
@@ -24,3 +36,40 @@ class DocumentPhraseAdmin(admin.ModelAdmin):
         return obj.phrase[:80] + '…' if len(obj.phrase) > 80 else obj.phrase
 
 
+
+
+@admin.register(CorpusStatistic)
+class CorpusStatisticAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_documents', 'total_tokens', 'updated_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(TermStatistic)
+class TermStatisticAdmin(admin.ModelAdmin):
+    list_display = ('term', 'user', 'document_frequency')
+    search_fields = ('term', 'user__username')
+    ordering = ('-document_frequency',)
+
+
+@admin.register(VocabularyTerm)
+class VocabularyTermAdmin(admin.ModelAdmin):
+    list_display = ('word', 'user', 'document_frequency', 'occurrences')
+    search_fields = ('word', 'user__username')
+    ordering = ('-document_frequency',)
+
+
+@admin.register(IndexingJob)
+class IndexingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'document', 'status', 'attempts', 'run_after', 'locked_by', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('document__original_filename', 'locked_by')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ExtractionFailure)
+class ExtractionFailureAdmin(admin.ModelAdmin):
+    list_display = ('document', 'page', 'reason', 'created_at')
+    list_filter = ('document__file_type',)
+    search_fields = ('document__original_filename', 'reason')
+    readonly_fields = ('created_at',)
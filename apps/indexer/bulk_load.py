@@ -0,0 +1,180 @@
+"""
+Bulk loader for a document's postings and phrases.
+
+Step 6 of `pipeline.index_document` (used by uploads and by
+`manage.py reindex`) writes every InvertedIndex row of a document at once.
+`bulk_create(update_conflicts=True)` sends those rows as one large
+`INSERT … VALUES … ON CONFLICT DO UPDATE`: every value is a bind parameter
+that is formatted, sent and parsed, and the statement text grows with the
+number of distinct terms.
+
+`load_postings()` instead streams the rows through `COPY … FROM STDIN`
+into a session-local staging table and merges them into the index with a
+single statement:
+
+    WITH staged AS (DELETE FROM <staging> RETURNING …)
+    INSERT INTO indexer_invertedindex … SELECT … FROM staged
+    ON CONFLICT (document_id, term_id, user_id) DO UPDATE SET …
+
+The staging table is TEMPORARY (never WAL-logged) and emptied by the merge
+itself, so several loads in one transaction do not see each other's rows.
+Its rows are also dropped at commit, so the COPY and the merge always run in
+one transaction — the caller's, or one of their own under autocommit.
+`load_phrases()` copies DocumentPhrase rows straight into their table:
+they have no unique key to merge on, and the pipeline deletes the old ones
+first.
+
+Both accept the unsaved model instances the pipeline already builds, as
+any iterable: with COPY the rows are formatted as they are sent, so a
+generator over a whole corpus (`pipeline.rebuild_user_corpus`) is never
+held in memory at once.
+INDEXER_COPY_LOADER=False falls back to `bulk_create`, which
+`manage.py bench_bulk_load` compares against.
+"""
+
+import io
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+STAGING = 'indexer_invertedindex_staging'
+
+# InvertedIndex columns written by the loader (`id` and `indexed_at` are
+# filled in by the merge), with their types in the staging table.
+POSTING_COLUMNS = (
+    ('document_id', 'bigint'),
+    ('user_id', 'bigint'),
+    ('deleted', 'boolean'),
+    ('term_id', 'integer'),
+    ('original_term_id', 'integer'),
+    ('term_frequency', 'double precision'),
+    ('document_frequency', 'integer'),
+    ('tf_idf', 'double precision'),
+    ('positions', 'bytea'),
+)
+# Columns refreshed when the (document, term, user) row already exists.
+UPDATE_COLUMNS = ('term_frequency', 'document_frequency', 'tf_idf', 'positions', 'original_term_id')
+PHRASE_COLUMNS = ('document_id', 'user_id', 'deleted', 'phrase', 'position')
+
+# Bytes handed to COPY per read() — rows are formatted lazily.
+_CHUNK_SIZE = 64 * 1024
+
+
+def load_postings(rows) -> int:
+    """Upsert unsaved InvertedIndex instances; returns the number of rows."""
+    from apps.indexer.models import InvertedIndex
+
+    if not _use_copy():
+        rows = list(rows)
+        if rows:
+            InvertedIndex.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['document', 'term', 'user'],
+                update_fields=['term_frequency', 'document_frequency', 'tf_idf', 'positions', 'original_term'],
+            )
+        return len(rows)
+
+    columns = [name for name, _ in POSTING_COLUMNS]
+    table = InvertedIndex._meta.db_table
+    # The staged rows are dropped at commit: under autocommit the COPY would
+    # commit (and empty the staging table) before the merge reads it.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING} '
+            f'({", ".join(f"{name} {kind}" for name, kind in POSTING_COLUMNS)}) '
+            f'ON COMMIT DELETE ROWS'
+        )
+        if not _copy(cursor, STAGING, columns, _values(InvertedIndex, columns, rows)):
+            return 0
+        cursor.execute(
+            f'WITH staged AS (DELETE FROM {STAGING} RETURNING *) '
+            f'INSERT INTO {table} ({", ".join(columns)}, indexed_at) '
+            f'SELECT {", ".join(columns)}, now() FROM staged '
+            f'ON CONFLICT (document_id, term_id, user_id) DO UPDATE SET '
+            f'{", ".join(f"{name} = EXCLUDED.{name}" for name in UPDATE_COLUMNS)}'
+        )
+        return cursor.rowcount
+
+
+def load_phrases(rows) -> int:
+    """Insert unsaved DocumentPhrase instances; returns the number of rows."""
+    from apps.indexer.models import DocumentPhrase
+
+    if not _use_copy():
+        rows = DocumentPhrase.objects.bulk_create(list(rows))
+        return len(rows)
+
+    with connection.cursor() as cursor:
+        return _copy(
+            cursor, DocumentPhrase._meta.db_table, PHRASE_COLUMNS,
+            _values(DocumentPhrase, PHRASE_COLUMNS, rows),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+def _use_copy() -> bool:
+    return getattr(settings, 'INDEXER_COPY_LOADER', True) and connection.vendor == 'postgresql'
+
+
+def _values(model, columns, rows):
+    """Each row's column values, prepared for the database by their fields."""
+    fields = [model._meta.get_field(column.removesuffix('_id')) for column in columns]
+    for row in rows:
+        yield [field.get_prep_value(getattr(row, field.attname)) for field in fields]
+
+
+def _copy(cursor, table: str, columns, rows) -> int:
+    """COPY `rows` (lists of prepared values) into `table`; returns the row count."""
+    cursor.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN',
+        _CopyStream(_format(values) for values in rows),
+        _CHUNK_SIZE,  # positional: Django's debug cursor wrapper takes no keywords
+    )
+    return cursor.rowcount
+
+
+# COPY text format: tab-separated columns, one line per row, \N for NULL.
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _format(values) -> str:
+    out = []
+    for value in values:
+        if value is None:
+            out.append('\\N')
+        elif isinstance(value, bool):
+            out.append('t' if value else 'f')
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            out.append('\\\\x' + bytes(value).hex())
+        elif isinstance(value, float):
+            out.append(repr(value))
+        else:
+            out.append(str(value).translate(_ESCAPES))
+    return '\t'.join(out) + '\n'
+
+
+class _CopyStream(io.RawIOBase):
+    """A read-only file over an iterator of COPY lines, consumed on demand."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = ''.join(islice(self._lines, 1024))
+            if not chunk:
+                break
+            self._buffer += chunk.encode('utf-8')
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
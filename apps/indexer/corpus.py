@@ -0,0 +1,224 @@
+"""
+Corpus statistics module.
+
+Keeps the per-user `CorpusStatistic` / `TermStatistic` / `VocabularyTerm`
+tables in step with the InvertedIndex so document frequencies (and word
+completions) can be read with a key lookup instead of an aggregate over
+every posting the user owns.
+
+All mutating helpers must be called inside the same transaction that writes
+or deletes the corresponding InvertedIndex rows.
+"""
+
+import logging
+import math
+from collections import defaultdict
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from apps.indexer.postings import PositionCount
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+
+def smoothed_idf(df: int, total_docs: int) -> float:
+    """Smoothed IDF used throughout the indexer: log((N + 1) / (df + 1)) + 1."""
+    return math.log((total_docs + 1) / (df + 1)) + 1
+
+
+def lookup(user, terms: list[str]) -> tuple[int, dict[str, int]]:
+    """
+    Return `(total_documents, {term: document_frequency})` for the user's
+    corpus.  Terms the user has never indexed are absent from the dict.
+    """
+    from apps.indexer.models import CorpusStatistic, TermStatistic
+
+    total_docs = (
+        CorpusStatistic.objects
+        .filter(user=user)
+        .values_list('total_documents', flat=True)
+        .first()
+    ) or 0
+
+    if not terms:
+        return total_docs, {}
+
+    df = dict(
+        TermStatistic.objects
+        .filter(user=user, term__in=terms)
+        .values_list('term', 'document_frequency')
+    )
+    return total_docs, df
+
+
+def add_document(user, terms: list[str], token_count: int, words: dict[str, int] | None = None):
+    """
+    Count one newly indexed document containing `terms` into the corpus.
+
+    `words` maps the document's original (pre-stem) words to their
+    occurrence counts, for the vocabulary used by word completion.
+    """
+    from apps.indexer.models import CorpusStatistic, TermStatistic, VocabularyTerm
+
+    if not terms:
+        return
+
+    CorpusStatistic.objects.get_or_create(user=user)
+    CorpusStatistic.objects.filter(user=user).update(
+        total_documents=F('total_documents') + 1,
+        total_tokens=F('total_tokens') + token_count,
+    )
+
+    TermStatistic.objects.bulk_create(
+        [TermStatistic(user=user, term=term) for term in terms],
+        ignore_conflicts=True,
+    )
+    TermStatistic.objects.filter(user=user, term__in=terms).update(
+        document_frequency=F('document_frequency') + 1,
+    )
+
+    if words:
+        VocabularyTerm.objects.bulk_create(
+            [VocabularyTerm(user=user, word=word) for word in words],
+            ignore_conflicts=True,
+        )
+        vocabulary = VocabularyTerm.objects.filter(user=user)
+        vocabulary.filter(word__in=list(words)).update(
+            document_frequency=F('document_frequency') + 1,
+        )
+        for count, group in _group_by_count(words).items():
+            vocabulary.filter(word__in=group).update(occurrences=F('occurrences') + count)
+
+
+def remove_document(user, document_id: int) -> bool:
+    """
+    Discount a document's existing InvertedIndex rows from the corpus.
+
+    Must run before those rows are deleted.  Returns False if the document
+    had no rows (and therefore was never counted).
+    """
+    from apps.indexer.models import CorpusStatistic, InvertedIndex, TermStatistic, VocabularyTerm
+
+    rows = list(
+        InvertedIndex.objects
+        .filter(document_id=document_id)
+        .annotate(n=PositionCount('positions'))
+        .values_list('term__text', 'original_term__text', 'n')
+    )
+    if not rows:
+        return False
+
+    terms = [term for term, _, _ in rows]
+    token_count = sum(n for _, _, n in rows)
+    words: dict[str, int] = defaultdict(int)
+    for _, word, n in rows:
+        if word:
+            words[word] += n
+
+    CorpusStatistic.objects.filter(user=user).update(
+        total_documents=Greatest(F('total_documents') - 1, 0),
+        total_tokens=Greatest(F('total_tokens') - token_count, 0),
+    )
+    TermStatistic.objects.filter(user=user, term__in=terms).update(
+        document_frequency=Greatest(F('document_frequency') - 1, 0),
+    )
+    TermStatistic.objects.filter(user=user, term__in=terms, document_frequency=0).delete()
+
+    if words:
+        vocabulary = VocabularyTerm.objects.filter(user=user)
+        vocabulary.filter(word__in=list(words)).update(
+            document_frequency=Greatest(F('document_frequency') - 1, 0),
+        )
+        for count, group in _group_by_count(words).items():
+            vocabulary.filter(word__in=group).update(
+                occurrences=Greatest(F('occurrences') - count, 0),
+            )
+        vocabulary.filter(word__in=list(words), document_frequency=0).delete()
+    return True
+
+
+def reset(user):
+    """
+    Empty the user's corpus statistics: zero the totals and drop their
+    TermStatistic and VocabularyTerm rows.  For full rebuilds that discard
+    the user's InvertedIndex rows wholesale (`partitions.truncate_user`).
+    """
+    from apps.indexer.models import CorpusStatistic, TermStatistic, VocabularyTerm
+
+    CorpusStatistic.objects.filter(user=user).update(total_documents=0, total_tokens=0)
+    TermStatistic.objects.filter(user=user).delete()
+    VocabularyTerm.objects.filter(user=user).delete()
+
+
+def replace(
+    user,
+    total_documents: int,
+    total_tokens: int,
+    document_frequency: dict[str, int],
+    words: dict[str, tuple[int, int]],
+):
+    """
+    Replace the user's corpus statistics with totals counted over their
+    whole corpus at once (`pipeline.rebuild_user_corpus`).
+
+    `words` maps each original word to `(document_frequency, occurrences)`.
+    """
+    from apps.indexer.models import CorpusStatistic, TermStatistic, VocabularyTerm
+
+    reset(user)
+    CorpusStatistic.objects.get_or_create(user=user)
+    CorpusStatistic.objects.filter(user=user).update(
+        total_documents=total_documents,
+        total_tokens=total_tokens,
+    )
+    TermStatistic.objects.bulk_create(
+        (TermStatistic(user=user, term=term, document_frequency=df) for term, df in document_frequency.items()),
+        batch_size=BATCH_SIZE,
+    )
+    VocabularyTerm.objects.bulk_create(
+        (
+            VocabularyTerm(user=user, word=word, document_frequency=df, occurrences=occurrences)
+            for word, (df, occurrences) in words.items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def tally(rows) -> tuple[int, int, dict[str, int], dict[str, tuple[int, int]]]:
+    """
+    Count existing InvertedIndex `rows` (a queryset) the way `replace()`
+    takes them: `(total_documents, total_tokens, {term: document_frequency},
+    {word: (document_frequency, occurrences)})`.
+    """
+    from django.db.models import Count, Sum
+
+    totals = rows.aggregate(
+        documents=Count('document', distinct=True),
+        tokens=Sum(PositionCount('positions')),
+    )
+    document_frequency = dict(
+        rows.values('term__text').annotate(df=Count('document')).values_list('term__text', 'df')
+    )
+    words = {
+        word: (df, occurrences)
+        for word, df, occurrences in (
+            rows.exclude(original_term=None)
+            .values('original_term__text')
+            .annotate(df=Count('document', distinct=True), n=Sum(PositionCount('positions')))
+            .values_list('original_term__text', 'df', 'n')
+        )
+    }
+    return totals['documents'], totals['tokens'] or 0, document_frequency, words
+
+
+def _group_by_count(words: dict[str, int]) -> dict[int, list[str]]:
+    # Most words in a document share a handful of distinct counts, so one
+    # UPDATE per count replaces one per word.
+    groups: dict[int, list[str]] = defaultdict(list)
+    for word, count in words.items():
+        groups[count].append(word)
+    return groups
+
@@ -1,19 +1,47 @@
 """
 Text extraction module.
 
-Dispatches on the file_type of an UploadedFile instance and returns raw
-extracted text as a Python string.  Returns an empty string for types where
-extraction is not supported (e.g. images without Tesseract installed).
+Dispatches on the file_type of an UploadedFile instance.  `iter_text()`
+yields the extracted text in chunks — one per PDF page, or blocks of at most
+about TEXT_CHUNK_CHARS characters ending at a paragraph break — so large
+documents are never held in memory whole; `extract_text()` joins them into
+one string.  Nothing is produced for types where extraction is not supported
+(e.g. images without Tesseract installed).
+
+Extraction runs outside the calling process: PDF pages in the
+`pdf_pages.py` worker processes, everything else in a reusable sandboxed
+worker (`sandbox.py`) with memory, CPU and wall-clock limits.
+`iter_text_in_process()` is the in-process extractor the workers run.
 """
 
 import logging
+from collections.abc import Iterator
 
 logger = logging.getLogger(__name__)
 
+TEXT_CHUNK_CHARS = 64 * 1024
+
+SUPPORTED_TYPES = frozenset({'pdf', 'docx', 'md', 'txt', 'png', 'jpg'})
+
+# Bump whenever a change here alters the text extracted from a file, so
+# cached extractions (see text_cache.py) are not served.
+EXTRACTOR_VERSION = 1
+
 
 def extract_text(uploaded_file) -> str:
     """
-    Extract plain text from an UploadedFile.
+    Extract plain text from an UploadedFile as a single string.
+
+    Returns an empty string if the file type is unsupported or if extraction
+    fails (see `iter_text`).
+    """
+    return ''.join(iter_text(uploaded_file))
+
+
+def iter_text(uploaded_file, failures: list | None = None) -> Iterator[str]:
+    """
+    Yield the plain text of an UploadedFile in chunks; concatenated, they
+    are the document text (page and paragraph separators included).
 
     Supports:
       - pdf   → PyPDF2
@@ -21,92 +49,142 @@ def extract_text(uploaded_file) -> str:
       - md/txt → plain read (UTF-8)
       - png / jpg → pytesseract OCR (Tesseract must be installed on the host)
 
-    Returns an empty string if the file type is unsupported or if extraction
-    fails for any reason (errors are logged, never raised).
+    Yields nothing if the file type is unsupported.  If extraction fails
+    part-way, the chunks already yielded stand and iteration ends (errors are
+    logged, never raised).  PDF pages that fail or time out are skipped.
+
+    What could not be extracted is appended to `failures`, when given, as
+    `(page_number, reason)` — page_number is None for the whole document.
     """
+    from django.conf import settings
+
     file_type = uploaded_file.file_type
     file_path = uploaded_file.file.path
+    if failures is None:
+        failures = []
 
     try:
-        if file_type == 'pdf':
-            return _extract_pdf(file_path)
-        elif file_type == 'docx':
-            return _extract_docx(file_path)
-        elif file_type in ('md', 'txt'):
-            return _extract_text_file(file_path)
-        elif file_type in ('png', 'jpg'):
-            return _extract_image(file_path)
-        else:
+        if file_type not in SUPPORTED_TYPES:
             logger.warning('Unsupported file type for extraction: %s', file_type)
-            return ''
+        elif file_type == 'pdf' and getattr(settings, 'PDF_EXTRACT_WORKERS', 2) > 0:
+            yield from _extract_pdf_pages(file_path, failures)
+        elif getattr(settings, 'EXTRACTOR_SANDBOX', True):
+            from apps.indexer import sandbox
+            yield from sandbox.run(file_type, file_path, failures)
+        else:
+            yield from iter_text_in_process(file_type, file_path, failures)
     except Exception as exc:
         logger.error(
             'Text extraction failed for file id=%s type=%s: %s',
             uploaded_file.id, file_type, exc, exc_info=True,
         )
-        return ''
+        failures.append((None, f'{type(exc).__name__}: {exc}'[:255]))
+
+
+def iter_text_in_process(file_type: str, file_path: str, failures: list) -> Iterator[str]:
+    """
+    Extract in the current process — no limits.  `iter_text()` runs this in
+    a sandboxed worker; exceptions propagate.
+    """
+    if file_type == 'pdf':
+        yield from _join_pages(_iter_pdf_pages(file_path, failures))
+    elif file_type == 'docx':
+        yield from _extract_docx(file_path)
+    elif file_type in ('md', 'txt'):
+        yield from _extract_text_file(file_path)
+    elif file_type in ('png', 'jpg'):
+        text = _extract_image(file_path)
+        if text:
+            yield text
 
 
 # ---------------------------------------------------------------------------
 # Private helpers
 # ---------------------------------------------------------------------------
 
-def _extract_pdf(file_path: str) -> str:
+def _extract_pdf_pages(file_path: str, failures: list) -> Iterator[str]:
+    from django.conf import settings
+    from apps.indexer import sandbox
+    from apps.indexer.pdf_pages import iter_pages
+
+    yield from _join_pages(iter_pages(
+        file_path,
+        failures,
+        workers=getattr(settings, 'PDF_EXTRACT_WORKERS', 2),
+        page_timeout=getattr(settings, 'PDF_PAGE_TIMEOUT', 30),
+        document_timeout=getattr(settings, 'PDF_DOCUMENT_TIMEOUT', 300),
+        memory_bytes=sandbox.memory_limit(),
+        cpu_seconds=getattr(settings, 'EXTRACTOR_CPU_LIMIT', 120),
+    ))
+
+
+def _join_pages(pages: Iterator[str]) -> Iterator[str]:
+    separator = ''
+    for page_text in pages:
+        if page_text:
+            yield separator + page_text
+            separator = '\n'
+
+
+def _iter_pdf_pages(file_path: str, failures: list) -> Iterator[str]:
+    """Serial page extraction (PDF_EXTRACT_WORKERS=0); no per-page timeout."""
     import PyPDF2
 
-    text_parts = []
     with open(file_path, 'rb') as fh:
         reader = PyPDF2.PdfReader(fh)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text_parts.append(page_text)
-    return '\n'.join(text_parts)
+        for number, page in enumerate(reader.pages, 1):
+            try:
+                yield page.extract_text() or ''
+            except MemoryError:
+                raise
+            except Exception as exc:
+                logger.warning('PDF page %d of %s failed: %s', number, file_path, exc)
+                failures.append((number, f'{type(exc).__name__}: {exc}'[:255]))
 
 
-def _extract_docx(file_path: str) -> str:
+def _extract_docx(file_path: str) -> Iterator[str]:
     from docx import Document
 
     doc = Document(file_path)
-    paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
-    return '\n'.join(paragraphs)
-
-
-def _extract_text_file(file_path: str) -> str:
+    separator = ''
+    batch, size = [], 0
+    for p in doc.paragraphs:
+        if not p.text.strip():
+            continue
+        batch.append(p.text)
+        size += len(p.text) + 1
+        if size >= TEXT_CHUNK_CHARS:
+            yield separator + '\n'.join(batch)
+            separator = '\n'
+            batch, size = [], 0
+    if batch:
+        yield separator + '\n'.join(batch)
+
+
+def _extract_text_file(file_path: str) -> Iterator[str]:
     with open(file_path, 'r', encoding='utf-8', errors='replace') as fh:
-        return fh.read()
+        carry = ''
+        block = fh.read(TEXT_CHUNK_CHARS)
+        while block:
+            following = fh.read(TEXT_CHUNK_CHARS)
+            block = carry + block
+            if not following:
+                yield block
+                break
+            # End the chunk after the last paragraph break (or, failing
+            # that, whitespace) so no sentence or word is cut in two.
+            cut = block.rfind('\n\n') + 2
+            if cut < 2:
+                cut = max(block.rfind(' '), block.rfind('\n')) + 1
+            if cut < 1:
+                cut = len(block)
+            carry = block[cut:]
+            yield block[:cut]
+            block = following
 
 
 def _extract_image(file_path: str) -> str:
-    """
-    OCR-based text extraction for PNG/JPG images using pytesseract + Pillow.
-
-    Requires the Tesseract binary to be installed on the host:
-      - Debian/Ubuntu: apt install tesseract-ocr
-      - Fedora:        dnf install tesseract
-      - Docker:        add RUN apt-get install -y tesseract-ocr to Dockerfile
-
-    If Tesseract is not available, logs a warning and returns empty string.
-    """
-    try:
-        import pytesseract
-        from PIL import Image
-    except ImportError:
-        logger.warning(
-            'pytesseract/Pillow not available — skipping OCR for image %s.',
-            file_path,
-        )
-        return ''
-
-    try:
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image)
-        return text or ''
-    except pytesseract.pytesseract.TesseractNotFoundError:
-        logger.warning(
-            'Tesseract not found - skipping OCR for image %s. '
-            'Install tesseract-ocr to enable image indexing.',
-            file_path,
-        )
-        return ''
+    """OCR for PNG/JPG images — see `ocr.py`."""
+    from apps.indexer.ocr import image_to_text
 
+    return image_to_text(file_path)
@@ -0,0 +1,140 @@
+"""
+Persistent indexing job queue.
+
+Uploads call `enqueue()`; the `index_worker` management command drains the
+queue with `claim()` → `index_document()` → `complete()` / `retry_or_fail()`.
+Jobs live in the IndexingJob table, so they survive process restarts and can
+be processed by any number of worker processes on any number of hosts.
+
+Claiming uses SELECT … FOR UPDATE SKIP LOCKED: concurrent workers never block
+on, or double-claim, the same row.  While a job runs its worker renews the
+lock with `heartbeat()`; a claimed job whose lock is not renewed within the
+worker's visibility timeout is treated as abandoned and re-claimed.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 60 * 60
+
+
+def enqueue(uploaded_file_id: int):
+    """Queue an UploadedFile for indexing and return the IndexingJob."""
+    from apps.indexer.models import IndexingJob
+
+    job = IndexingJob.objects.create(document_id=uploaded_file_id)
+    logger.info('jobs: enqueued job=%s file=%s', job.pk, uploaded_file_id)
+    return job
+
+
+def claim(worker_id: str, visibility_timeout: int, max_attempts: int):
+    """
+    Atomically claim the next runnable job for `worker_id`.
+
+    Runnable means queued and due, or running with a lock older than
+    `visibility_timeout` seconds.  Abandoned jobs that have already used
+    `max_attempts` are marked failed instead of being handed out again.
+
+    Returns the claimed IndexingJob, or None if the queue is empty.
+    """
+    from apps.indexer.models import IndexingJob
+
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=visibility_timeout)
+
+    IndexingJob.objects.filter(
+        status='running',
+        locked_at__lt=stale_before,
+        attempts__gte=max_attempts,
+    ).update(status='failed', locked_by='', last_error='Visibility timeout exceeded.')
+
+    with transaction.atomic():
+        job = (
+            IndexingJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status='queued', run_after__lte=now)
+                | Q(status='running', locked_at__lt=stale_before)
+            )
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = 'running'
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts = F('attempts') + 1
+        job.save(update_fields=['status', 'locked_by', 'locked_at', 'attempts', 'updated_at'])
+
+    job.refresh_from_db(fields=['attempts'])
+    return job
+
+
+def heartbeat(job, worker_id: str) -> bool:
+    """
+    Renew `worker_id`'s lock on a running `job`, so a long job is not taken
+    for abandoned.  Returns False if the lock was already lost.
+    """
+    from apps.indexer.models import IndexingJob
+
+    updated = IndexingJob.objects.filter(pk=job.pk, status='running', locked_by=worker_id).update(
+        locked_at=timezone.now(),
+    )
+    return bool(updated)
+
+
+def complete(job, worker_id: str) -> bool:
+    """
+    Mark `job` done.  Returns False if the lock was lost to another worker
+    (visibility timeout expired), in which case nothing is changed.
+    """
+    from apps.indexer.models import IndexingJob
+
+    updated = IndexingJob.objects.filter(pk=job.pk, locked_by=worker_id).update(
+        status='done',
+        locked_by='',
+        last_error='',
+        updated_at=timezone.now(),
+    )
+    return bool(updated)
+
+
+def retry_or_fail(job, worker_id: str, error: str, max_attempts: int, backoff: float) -> bool:
+    """
+    Re-queue `job` with exponential backoff (`backoff` · 2^(attempts-1)
+    seconds, capped at one hour), or mark it failed once it has used
+    `max_attempts`.
+
+    Returns False if the lock was lost to another worker.
+    """
+    from apps.indexer.models import IndexingJob
+
+    now = timezone.now()
+    jobs = IndexingJob.objects.filter(pk=job.pk, locked_by=worker_id)
+
+    if job.attempts >= max_attempts:
+        updated = jobs.update(status='failed', locked_by='', last_error=error, updated_at=now)
+        logger.error('jobs: job=%s file=%s failed permanently: %s', job.pk, job.document_id, error)
+        return bool(updated)
+
+    delay = min(backoff * (2 ** (job.attempts - 1)), MAX_BACKOFF_SECONDS)
+    updated = jobs.update(
+        status='queued',
+        locked_by='',
+        last_error=error,
+        run_after=now + timedelta(seconds=delay),
+        updated_at=now,
+    )
+    logger.warning(
+        'jobs: job=%s file=%s attempt %d failed, retrying in %.0fs: %s',
+        job.pk, job.document_id, job.attempts, delay, error,
+    )
+    return bool(updated)
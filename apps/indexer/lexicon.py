@@ -0,0 +1,47 @@
+"""
+Term dictionary helpers.
+
+InvertedIndex stores terms as ids in the global `Term` table.  Strings are
+turned into ids here, in bulk:
+
+  - `lookup(texts)`   ids of the texts already in the dictionary — used by
+                      search, once per query; unknown query terms cannot
+                      match anything and are simply absent
+  - `resolve(texts)`  ids of all texts, adding the missing ones first —
+                      used by the indexing pipeline
+
+`resolve` should run outside the transaction that writes the postings: the
+INSERT … ON CONFLICT DO NOTHING then commits at once, and concurrent
+workers adding the same new term never wait on each other's document.
+"""
+
+import logging
+from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+
+def lookup(texts: Iterable[str]) -> dict[str, int]:
+    """Return `{text: id}` for those of `texts` that are in the dictionary."""
+    from apps.indexer.models import Term
+
+    texts = list(set(texts))
+    if not texts:
+        return {}
+    return dict(Term.objects.filter(text__in=texts).values_list('text', 'id'))
+
+
+def resolve(texts: Iterable[str]) -> dict[str, int]:
+    """Return `{text: id}` for every one of `texts`, adding unknown texts."""
+    from apps.indexer.models import Term
+
+    texts = set(texts)
+    ids = lookup(texts)
+    missing = texts.difference(ids)
+    if missing:
+        # Sorted: concurrent inserts of overlapping terms then take the
+        # unique-index locks in the same order and cannot deadlock.
+        Term.objects.bulk_create([Term(text=text) for text in sorted(missing)], ignore_conflicts=True)
+        ids.update(lookup(missing))
+        logger.debug('lexicon: added %d term(s)', len(missing))
+    return ids
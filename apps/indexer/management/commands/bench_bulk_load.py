@@ -0,0 +1,199 @@
+"""
+Management command: bench_bulk_load
+
+Compares the two ways Step 6 of the indexing pipeline can write a
+document's postings and phrases (apps/indexer/bulk_load.py): the ORM's
+`bulk_create(update_conflicts=True)` and COPY through a staging table
+merged in one statement.  Synthetic documents with many distinct terms are
+written by each path — first as new rows, then again over the existing
+rows (the upsert case) — and the wall time and WAL generated are reported.
+Everything runs in a transaction that is rolled back.
+
+Usage examples:
+    # 10 documents of 20000 distinct terms and 2000 phrases each (default)
+    python manage.py bench_bulk_load
+
+    # Fewer, larger documents
+    python manage.py bench_bulk_load --documents 3 --terms 60000
+"""
+
+import random
+import string
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.test import override_settings
+
+from apps.indexer import bulk_load, lexicon
+from apps.indexer.models import DocumentPhrase, InvertedIndex
+from apps.upload.models import UploadedFile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk_create against the COPY loader for postings and phrases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=10,
+            metavar='N',
+            help='Documents written by each path (default: 10).',
+        )
+        parser.add_argument(
+            '--terms',
+            type=int,
+            default=20_000,
+            metavar='N',
+            help='Distinct terms per document (default: 20000).',
+        )
+        parser.add_argument(
+            '--phrases',
+            type=int,
+            default=2_000,
+            metavar='N',
+            help='Phrases per document (default: 2000).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        results = {}
+
+        with transaction.atomic():
+            # -------------------------------------------------------------- #
+            # Synthetic owner, dictionary and documents (rolled back)
+            # -------------------------------------------------------------- #
+            user = User.objects.create(username=f'bench_bulk_load_{rng.getrandbits(32):08x}')
+            words = self._vocabulary(rng, options['terms'] * 2)
+            term_ids = list(lexicon.resolve(words).values())
+            self.stdout.write(
+                f'{options["documents"]} documents × {options["terms"]:,} postings '
+                f'+ {options["phrases"]:,} phrases per path\n'
+            )
+
+            # The same content for both paths, written to separate documents.
+            contents = [
+                self._synthetic_content(rng, term_ids, options['terms'], options['phrases'])
+                for _ in range(options['documents'])
+            ]
+
+            for name, use_copy in (('bulk_create', False), ('copy', True)):
+                documents = [
+                    UploadedFile.objects.create(
+                        file=f'bench/{name}-{i}.txt', original_filename=f'{name}-{i}.txt',
+                        file_type='txt', file_size=0, uploaded_by=user, status='processed',
+                    )
+                    for i in range(options['documents'])
+                ]
+                batches = [self._rows(document, user, *content) for document, content in zip(documents, contents)]
+                with override_settings(INDEXER_COPY_LOADER=use_copy):
+                    for phase in ('insert', 'upsert'):
+                        results[name, phase] = self._measure(batches, phrases=phase == 'insert')
+                results[name, 'check'] = self._checksum(documents)
+
+            transaction.set_rollback(True)
+
+        # ------------------------------------------------------------------ #
+        # Summary
+        # ------------------------------------------------------------------ #
+        self.stdout.write(f'{"":14}{"insert (s)":>12}{"WAL (MiB)":>11}{"upsert (s)":>12}{"WAL (MiB)":>11}')
+        for name in ('bulk_create', 'copy'):
+            line = f'{name:14}'
+            for phase in ('insert', 'upsert'):
+                seconds, wal = results[name, phase]
+                line += f'{seconds:12.3f}{wal / 2**20:11.1f}'
+            self.stdout.write(line)
+
+        orm, copy = (results[name, 'insert'][0] + results[name, 'upsert'][0] for name in ('bulk_create', 'copy'))
+        orm_wal, copy_wal = (results[name, 'insert'][1] + results[name, 'upsert'][1] for name in ('bulk_create', 'copy'))
+        summary = f'Done. copy ×{orm / copy:.2f} faster  WAL ×{copy_wal / max(orm_wal, 1):.2f}'
+        if results['bulk_create', 'check'] == results['copy', 'check']:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.ERROR(f'{summary}  (stored rows differ!)'))
+
+    # ---------------------------------------------------------------------- #
+    # Helpers
+    # ---------------------------------------------------------------------- #
+
+    @staticmethod
+    def _measure(batches, phrases: bool) -> tuple[float, int]:
+        """(seconds, WAL bytes) to write every batch, one transaction each."""
+        with connection.cursor() as cursor:
+            # Start after a checkpoint, so that full-page images are not
+            # charged to whichever path happens to follow one.
+            try:
+                with transaction.atomic():
+                    cursor.execute('CHECKPOINT')
+            except DatabaseError:
+                pass  # needs pg_checkpoint (PostgreSQL 15+) or superuser
+            cursor.execute('SELECT pg_current_wal_insert_lsn()')
+            (start_lsn,) = cursor.fetchone()
+            started = time.perf_counter()
+            for postings, phrase_rows in batches:
+                with transaction.atomic():
+                    bulk_load.load_postings(postings)
+                    if phrases:
+                        bulk_load.load_phrases(phrase_rows)
+            seconds = time.perf_counter() - started
+            cursor.execute('SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), %s)', [start_lsn])
+            return seconds, int(cursor.fetchone()[0])
+
+    @staticmethod
+    def _checksum(documents) -> tuple:
+        """Row counts and column sums that both paths must agree on."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*), sum(term_id), sum(original_term_id), sum(document_frequency), '
+                '       round(sum(tf_idf)::numeric, 6), sum(octet_length(positions)) '
+                'FROM indexer_invertedindex WHERE document_id = ANY(%s)',
+                [[d.pk for d in documents]],
+            )
+            postings = cursor.fetchone()
+        phrases = DocumentPhrase.objects.filter(document__in=documents)
+        return postings, phrases.count(), sorted(phrases.values_list('phrase', flat=True))[:100]
+
+    @staticmethod
+    def _vocabulary(rng, size: int) -> list[str]:
+        words = set()
+        while len(words) < size:
+            words.add('bench' + ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))))
+        return sorted(words)
+
+    @staticmethod
+    def _synthetic_content(rng, term_ids, terms: int, phrases: int) -> tuple[list[tuple], list[str]]:
+        """(term id, original term id, positions) per posting, and phrase texts."""
+        postings = []
+        offset = 0
+        for term_id in rng.sample(term_ids, terms):
+            positions = []
+            for _ in range(rng.choice((1, 1, 1, 2, 3, 8))):
+                offset += rng.randint(1, 5)
+                positions.append(offset)
+            postings.append((term_id, rng.choice((None, term_id)), positions))
+        texts = [' '.join(rng.choices(string.ascii_lowercase, k=rng.randint(10, 90))) for _ in range(phrases)]
+        return postings, texts
+
+    @staticmethod
+    def _rows(document, user, postings, texts) -> tuple[list[InvertedIndex], list[DocumentPhrase]]:
+        length = sum(len(positions) for _, _, positions in postings)
+        return (
+            [
+                InvertedIndex(
+                    document=document, user=user, deleted=False,
+                    term_id=term_id, original_term_id=original_id,
+                    term_frequency=len(positions) / length, document_frequency=1,
+                    tf_idf=len(positions) / length * 1.5, positions=positions,
+                )
+                for term_id, original_id, positions in postings
+            ],
+            [
+                DocumentPhrase(document=document, user=user, deleted=False, phrase=text, position=i)
+                for i, text in enumerate(texts)
+            ],
+        )
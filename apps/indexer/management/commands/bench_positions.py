@@ -0,0 +1,116 @@
+"""
+Management command: bench_positions
+
+Compares the old JSON list encoding of InvertedIndex.positions with the
+packed binary encoding (apps/indexer/postings.py) on synthetic postings:
+table size in PostgreSQL (jsonb vs bytea, TOAST included) and the time to
+decode every row back into integers.
+
+Usage examples:
+    # 200 documents of 20k tokens each (default)
+    python manage.py bench_positions
+
+    # Fewer, longer documents
+    python manage.py bench_positions --documents 20 --tokens 200000
+"""
+
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.indexer.postings import decode_positions, encode_positions
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON against packed binary term positions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=200,
+            metavar='N',
+            help='Number of synthetic documents (default: 200).',
+        )
+        parser.add_argument(
+            '--tokens',
+            type=int,
+            default=20_000,
+            metavar='N',
+            help='Positioned tokens per document (default: 20000).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0).')
+
+    def handle(self, *args, **options):
+        rows = self._synthetic_postings(random.Random(options['seed']), options['documents'], options['tokens'])
+        as_json = [json.dumps(positions) for positions in rows]
+        packed = [encode_positions(positions) for positions in rows]
+        self.stdout.write(
+            f'{len(rows):,} rows, {sum(len(p) for p in rows):,} positions\n'
+        )
+
+        # ------------------------------------------------------------------ #
+        # Table size (scratch tables, rolled back)
+        # ------------------------------------------------------------------ #
+        with transaction.atomic(), connection.cursor() as cursor:
+            json_size = self._table_size(cursor, 'jsonb', [(value,) for value in as_json])
+            packed_size = self._table_size(cursor, 'bytea', [(value,) for value in packed])
+            transaction.set_rollback(True)
+
+        # ------------------------------------------------------------------ #
+        # Row decode
+        # ------------------------------------------------------------------ #
+        started = time.perf_counter()
+        decoded_json = [json.loads(value) for value in as_json]
+        json_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        decoded_packed = [decode_positions(value) for value in packed]
+        packed_s = time.perf_counter() - started
+
+        # ------------------------------------------------------------------ #
+        # Summary
+        # ------------------------------------------------------------------ #
+        self.stdout.write(f'{"":10}{"payload (MiB)":>15}{"table (MiB)":>13}{"decode (s)":>12}')
+        for name, values, size, seconds in (
+            ('json', as_json, json_size, json_s),
+            ('packed', packed, packed_size, packed_s),
+        ):
+            payload = sum(len(v) for v in values)
+            self.stdout.write(f'{name:10}{payload / 2**20:15.1f}{size / 2**20:13.1f}{seconds:12.3f}')
+
+        summary = f'Done. table ×{json_size / packed_size:.1f} smaller  decode ×{json_s / packed_s:.1f}'
+        if all(list(a) == b for a, b in zip(decoded_packed, decoded_json)):
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.ERROR(f'{summary}  (outputs differ!)'))
+
+    # ---------------------------------------------------------------------- #
+    # Helpers
+    # ---------------------------------------------------------------------- #
+
+    @staticmethod
+    def _table_size(cursor, column_type: str, values: list[tuple]) -> int:
+        table = f'bench_positions_{column_type}'
+        cursor.execute(f'CREATE TEMPORARY TABLE {table} (positions {column_type} NOT NULL)')
+        cursor.executemany(f'INSERT INTO {table} (positions) VALUES (%s)', values)
+        cursor.execute(f'ANALYZE {table}')
+        cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _synthetic_postings(rng, documents: int, tokens: int) -> list[list[int]]:
+        # Zipf-distributed vocabulary, as in natural text: a few terms with
+        # thousands of positions, a long tail with one or two.
+        vocabulary = 5_000
+        weights = [1 / (rank + 1) for rank in range(vocabulary)]
+        rows = []
+        for _ in range(documents):
+            positions: dict[int, list[int]] = {}
+            for offset, term in enumerate(rng.choices(range(vocabulary), weights=weights, k=tokens)):
+                positions.setdefault(term, []).append(offset)
+            rows.extend(positions.values())
+        return rows
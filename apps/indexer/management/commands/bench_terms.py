@@ -0,0 +1,204 @@
+"""
+Management command: bench_terms
+
+Compares InvertedIndex rows that repeat the term and original word as
+strings with rows that reference the Term dictionary by integer id, on a
+synthetic corpus: total size in PostgreSQL (heap, TOAST and the
+(document, term), term and document indexes — plus the dictionary itself
+for the id layout) and the time of a search-shaped `term IN (…)` query,
+including resolving the query terms for the id layout.
+
+Usage examples:
+    # 1000 documents of 2000 tokens each (default)
+    python manage.py bench_terms
+
+    # A larger corpus, more queries
+    python manage.py bench_terms --documents 5000 --queries 2000
+"""
+
+import io
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.indexer.postings import encode_positions
+
+_SUFFIXES = ('', '', 's', 'ing', 'ed', 'er', 'ly')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark string terms against Term dictionary ids in InvertedIndex rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=1000,
+            metavar='N',
+            help='Number of synthetic documents (default: 1000).',
+        )
+        parser.add_argument(
+            '--tokens',
+            type=int,
+            default=2000,
+            metavar='N',
+            help='Tokens per document (default: 2000).',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=500,
+            metavar='N',
+            help='Number of two-term searches to time (default: 500).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = self._vocabulary(rng, 20_000)
+        postings = self._synthetic_postings(rng, words, options['documents'], options['tokens'])
+        ids = {text: i for i, text in enumerate(sorted({t for w in words for t in w}), start=1)}
+        self.stdout.write(f'{len(postings):,} postings, {len(ids):,} dictionary entries\n')
+
+        # Mid-frequency terms, as typed into a search box.
+        queries = [[w[0] for w in rng.sample(words[50:5000], 2)] for _ in range(options['queries'])]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # -------------------------------------------------------------- #
+            # Build both layouts (scratch tables, rolled back)
+            # -------------------------------------------------------------- #
+            cursor.execute(
+                'CREATE TEMPORARY TABLE bench_terms_text ('
+                ' document_id bigint NOT NULL, term varchar(100) NOT NULL,'
+                ' original_term varchar(100) NOT NULL, term_frequency float8 NOT NULL,'
+                ' document_frequency integer NOT NULL, tf_idf float8 NOT NULL, positions bytea NOT NULL)'
+            )
+            self._copy(cursor, 'bench_terms_text', (
+                (doc, term, original, tf, 1, tf, positions)
+                for doc, term, original, tf, positions in postings
+            ))
+            cursor.execute('CREATE TEMPORARY TABLE bench_terms_dict (id integer PRIMARY KEY, text varchar(100) UNIQUE)')
+            self._copy(cursor, 'bench_terms_dict', ((i, text) for text, i in ids.items()))
+            cursor.execute(
+                'CREATE TEMPORARY TABLE bench_terms_id ('
+                ' document_id bigint NOT NULL, term_id integer NOT NULL,'
+                ' original_term_id integer, term_frequency float8 NOT NULL,'
+                ' document_frequency integer NOT NULL, tf_idf float8 NOT NULL, positions bytea NOT NULL)'
+            )
+            self._copy(cursor, 'bench_terms_id', (
+                (doc, ids[term], ids[original] if original else None, tf, 1, tf, positions)
+                for doc, term, original, tf, positions in postings
+            ))
+            for table, column in (('bench_terms_text', 'term'), ('bench_terms_id', 'term_id')):
+                cursor.execute(f'CREATE UNIQUE INDEX ON {table} (document_id, {column})')
+                cursor.execute(f'CREATE INDEX ON {table} ({column})')
+                cursor.execute(f'CREATE INDEX ON {table} (document_id)')
+                cursor.execute(f'ANALYZE {table}')
+            cursor.execute('ANALYZE bench_terms_dict')
+
+            text_heap, text_indexes = self._sizes(cursor, 'bench_terms_text')
+            id_heap, id_indexes = self._sizes(cursor, 'bench_terms_id')
+            dict_size = sum(self._sizes(cursor, 'bench_terms_dict'))
+
+            # -------------------------------------------------------------- #
+            # Search-shaped lookups
+            # -------------------------------------------------------------- #
+            search = (
+                'SELECT document_id, SUM(term_frequency) AS score FROM {table}'
+                ' WHERE {column} = ANY(%s) GROUP BY document_id ORDER BY score DESC, document_id LIMIT 20'
+            )
+            started = time.perf_counter()
+            text_results = []
+            for terms in queries:
+                cursor.execute(search.format(table='bench_terms_text', column='term'), [terms])
+                text_results.append(cursor.fetchall())
+            text_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            id_results = []
+            for terms in queries:
+                cursor.execute('SELECT id FROM bench_terms_dict WHERE text = ANY(%s)', [terms])
+                term_ids = [row[0] for row in cursor.fetchall()]
+                cursor.execute(search.format(table='bench_terms_id', column='term_id'), [term_ids])
+                id_results.append(cursor.fetchall())
+            id_s = time.perf_counter() - started
+
+            transaction.set_rollback(True)
+
+        # ------------------------------------------------------------------ #
+        # Summary
+        # ------------------------------------------------------------------ #
+        self.stdout.write(
+            f'{"":12}{"heap (MiB)":>12}{"indexes (MiB)":>15}{"dictionary (MiB)":>18}'
+            f'{"total (MiB)":>13}{"queries (s)":>13}'
+        )
+        for name, heap, indexes, dictionary, seconds in (
+            ('strings', text_heap, text_indexes, 0, text_s),
+            ('ids', id_heap, id_indexes, dict_size, id_s),
+        ):
+            total = heap + indexes + dictionary
+            self.stdout.write(
+                f'{name:12}{heap / 2**20:12.1f}{indexes / 2**20:15.1f}{dictionary / 2**20:18.1f}'
+                f'{total / 2**20:13.1f}{seconds:13.3f}'
+            )
+
+        text_size = text_heap + text_indexes
+        id_size = id_heap + id_indexes + dict_size
+        summary = (
+            f'Done. total ×{text_size / id_size:.2f} smaller  '
+            f'queries ×{text_s / id_s:.2f} faster'
+        )
+        if text_results == id_results:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.ERROR(f'{summary}  (results differ!)'))
+
+    # ---------------------------------------------------------------------- #
+    # Helpers
+    # ---------------------------------------------------------------------- #
+
+    @staticmethod
+    def _copy(cursor, table: str, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(
+                r'\N' if value is None
+                else '\\\\x' + value.hex() if isinstance(value, bytes)
+                else str(value)
+                for value in row
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor.copy_expert(f'COPY {table} FROM STDIN', buffer)
+
+    @staticmethod
+    def _sizes(cursor, table: str) -> tuple[int, int]:
+        """(heap incl. TOAST, indexes) of `table`, in bytes."""
+        cursor.execute('SELECT pg_table_size(%s), pg_indexes_size(%s)', [table, table])
+        return cursor.fetchone()
+
+    @staticmethod
+    def _vocabulary(rng, size: int) -> list[tuple[str, str]]:
+        # (stem, original word) pairs; stems of English-like lengths.
+        words = {}
+        while len(words) < size:
+            stem = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+            words.setdefault(stem, stem + rng.choice(_SUFFIXES))
+        return list(words.items())
+
+    @staticmethod
+    def _synthetic_postings(rng, words, documents: int, tokens: int) -> list[tuple]:
+        # Zipf-distributed vocabulary, as in natural text.
+        weights = [1 / (rank + 1) for rank in range(len(words))]
+        rows = []
+        for doc in range(1, documents + 1):
+            positions: dict[int, list[int]] = {}
+            for offset, word in enumerate(rng.choices(range(len(words)), weights=weights, k=tokens)):
+                positions.setdefault(word, []).append(offset)
+            for word, offsets in positions.items():
+                stem, original = words[word]
+                rows.append((doc, stem, original, len(offsets) / tokens, encode_positions(offsets)))
+        return rows
@@ -0,0 +1,162 @@
+"""
+Management command: bench_tokenizer
+
+Measures tokenize_with_positions() throughput in tokens per second:
+
+  - baseline   in-process, NLTK word_tokenize, every token stemmed afresh
+               (the old behaviour)
+  - regex      in-process, the 'regex' word tokenizer, no stem memo
+  - memoized   in-process, 'regex' tokenizer, stems served from the LRU memo
+  - pool       memoized, split into spans across a process pool
+
+Usage examples:
+    # ~5 MB of synthetic English text, pool sized to the CPU count
+    python manage.py bench_tokenizer
+
+    # Real documents, four pool workers
+    python manage.py bench_tokenizer --file book.txt --file paper.txt --workers 4
+"""
+
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from apps.indexer import tokenizer
+
+_WORDS = (
+    'index search document query result ranking score term frequency corpus '
+    'engine retrieval relevance token stem phrase sentence paragraph chapter '
+    'reading writing learning running jumping quickly slowly happily network '
+    'system process thread memory storage database table column row value '
+    'analysis analyst analyze analyzing connection connected connecting '
+    'compute computer computing computation national nation nationally '
+    'develop developer developing development organize organization '
+    'the a an of to in and or but for with on at by from is are was were be '
+    'been being have has had do does did not this that these those it its'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark tokenizer throughput (tokens/sec).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            action='append',
+            default=[],
+            metavar='PATH',
+            help='Text file to tokenize (repeatable). Defaults to synthetic text.',
+        )
+        parser.add_argument(
+            '--chars',
+            type=int,
+            default=5_000_000,
+            metavar='N',
+            help='Size of the synthetic text in characters (default: 5000000).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            metavar='N',
+            help='Process pool size for the pool run (default: CPU count).',
+        )
+
+    def handle(self, *args, **options):
+        if options['file']:
+            texts = []
+            for path in options['file']:
+                try:
+                    with open(path, encoding='utf-8', errors='replace') as fh:
+                        texts.append(fh.read())
+                except OSError as exc:
+                    raise CommandError(f'Cannot read {path}: {exc}')
+        else:
+            texts = [self._synthetic_text(options['chars'])]
+
+        chars = sum(len(t) for t in texts)
+        self.stdout.write(f'{len(texts)} text(s), {chars:,} characters\n')
+
+        # ------------------------------------------------------------------ #
+        # Baseline (NLTK word_tokenize) and regex tokenizer: no stem memo
+        # ------------------------------------------------------------------ #
+        memo = tokenizer._get_stem()
+        tokenizer._stem = tokenizer._get_stemmer().stem
+        try:
+            with override_settings(TOKENIZER_WORKERS=0, TOKENIZER_BACKEND='nltk'):
+                baseline, baseline_s = self._run(texts)
+            with override_settings(TOKENIZER_WORKERS=0, TOKENIZER_BACKEND='regex'):
+                self._run(texts[:1])  # warm the chunk memo
+                regex, regex_s = self._run(texts)
+        finally:
+            tokenizer._stem = memo
+
+        # ------------------------------------------------------------------ #
+        # Memoized, in-process (memo warmed by a first pass)
+        # ------------------------------------------------------------------ #
+        with override_settings(TOKENIZER_WORKERS=0, TOKENIZER_BACKEND='regex'):
+            self._run(texts[:1])
+            memoized, memoized_s = self._run(texts)
+
+        # ------------------------------------------------------------------ #
+        # Memoized, process pool
+        # ------------------------------------------------------------------ #
+        with override_settings(
+            TOKENIZER_WORKERS=options['workers'],
+            TOKENIZER_PARALLEL_MIN_CHARS=0,
+            TOKENIZER_BACKEND='regex',
+        ):
+            tokenizer._get_pool()  # start workers outside the timed run
+            pooled, pooled_s = self._run(texts)
+
+        tokens = sum(len(d['positions']) for result in baseline for d in result.values())
+
+        # ------------------------------------------------------------------ #
+        # Summary
+        # ------------------------------------------------------------------ #
+        self.stdout.write(f'{"":12}{"seconds":>10}{"tokens/sec":>14}')
+        for name, seconds in (
+            ('baseline', baseline_s),
+            ('regex', regex_s),
+            ('memoized', memoized_s),
+            (f'pool ×{options["workers"]}', pooled_s),
+        ):
+            self.stdout.write(f'{name:12}{seconds:10.2f}{tokens / seconds:14,.0f}')
+
+        summary = (
+            f'Done. {tokens:,} tokens  regex ×{baseline_s / regex_s:.1f}  '
+            f'memo ×{baseline_s / memoized_s:.1f}  '
+            f'pool ×{baseline_s / pooled_s:.1f}'
+        )
+        if baseline == regex == memoized == pooled:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.ERROR(f'{summary}  (outputs differ!)'))
+
+    # ---------------------------------------------------------------------- #
+    # Helpers
+    # ---------------------------------------------------------------------- #
+
+    @staticmethod
+    def _run(texts):
+        started = time.perf_counter()
+        results = [tokenizer.tokenize_with_positions(text) for text in texts]
+        return results, time.perf_counter() - started
+
+    @staticmethod
+    def _synthetic_text(chars: int) -> str:
+        rng = random.Random(0)
+        weights = [1 / (rank + 1) for rank in range(len(_WORDS))]
+        paragraphs, size = [], 0
+        while size < chars:
+            sentences = []
+            for _ in range(rng.randint(3, 8)):
+                words = rng.choices(_WORDS, weights=weights, k=rng.randint(6, 20))
+                sentences.append(' '.join(words).capitalize() + '.')
+            paragraph = ' '.join(sentences)
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 2
+        return '\n\n'.join(paragraphs)
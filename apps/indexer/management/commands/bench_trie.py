@@ -0,0 +1,202 @@
+"""
+Management command: bench_trie
+
+Compares PrefixTrie (node-per-character, edited in place), CompactTrie
+(bulk-built flat arrays) and MappedTrie (an mmap-ed on-disk snapshot) on
+build time, memory and suggest() latency.  For MappedTrie, "build" is the
+time to write the snapshot and memory is what opening it allocates.
+
+Usage examples:
+    # 100k synthetic phrases (default)
+    python manage.py bench_trie
+
+    # A real user's autocomplete phrase set
+    python manage.py bench_trie --user fardin
+"""
+
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from apps.indexer import trie_store
+from apps.indexer.trie import CompactTrie, PrefixTrie
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark PrefixTrie against CompactTrie and MappedTrie.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--phrases',
+            type=int,
+            default=100_000,
+            metavar='N',
+            help='Number of synthetic phrases to generate (default: 100000).',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=20_000,
+            metavar='N',
+            help='Number of suggest() calls to time (default: 20000).',
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            metavar='USERNAME',
+            help="Benchmark on this user's filename and content phrases instead.",
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["user"]}" not found.')
+            phrases = self._user_phrases(user)
+        else:
+            phrases = self._synthetic_phrases(rng, options['phrases'])
+
+        if not phrases:
+            raise CommandError('No phrases to benchmark.')
+
+        prefixes = self._prefixes(rng, phrases, options['queries'])
+        self.stdout.write(f'{len(phrases)} phrases, {len(prefixes)} queries\n')
+
+        # ------------------------------------------------------------------ #
+        # PrefixTrie
+        # ------------------------------------------------------------------ #
+        def build_prefix_trie():
+            trie = PrefixTrie()
+            for phrase, weight in phrases:
+                trie.insert(phrase, weight=weight)
+            return trie
+
+        prefix_trie, prefix_build, prefix_mem = self._measure_build(build_prefix_trie)
+        prefix_query = self._measure_queries(prefix_trie, prefixes)
+
+        # ------------------------------------------------------------------ #
+        # CompactTrie
+        # ------------------------------------------------------------------ #
+        compact_trie, compact_build, compact_mem = self._measure_build(
+            lambda: CompactTrie.from_phrases(phrases)
+        )
+        compact_query = self._measure_queries(compact_trie, prefixes)
+
+        # ------------------------------------------------------------------ #
+        # MappedTrie
+        # ------------------------------------------------------------------ #
+        with tempfile.TemporaryDirectory() as snapshot_dir, \
+                override_settings(AUTOCOMPLETE_SNAPSHOT_DIR=snapshot_dir):
+            started = time.perf_counter()
+            trie_store.save(0, 1, phrases)
+            mapped_build = time.perf_counter() - started
+
+            started = time.perf_counter()
+            mapped_trie = trie_store.open_latest(0, 1)
+            mapped_trie.suggest(prefixes[0])
+            mapped_first = time.perf_counter() - started
+
+            tracemalloc.start()
+            mapped_trie = trie_store.open_latest(0, 1)
+            mapped_mem, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            mapped_query = self._measure_queries(mapped_trie, prefixes)
+            mapped_size = mapped_trie.estimated_size()
+
+            mismatches = sum(
+                prefix_trie.suggest(p) != compact_trie.suggest(p)
+                or prefix_trie.suggest(p) != mapped_trie.suggest(p)
+                for p in prefixes[:1000]
+            )
+            del mapped_trie
+
+        # ------------------------------------------------------------------ #
+        # Summary
+        # ------------------------------------------------------------------ #
+        self.stdout.write(f'{"":14}{"build (s)":>12}{"memory (MiB)":>15}{"suggest (µs)":>15}')
+        for name, build, mem, query in (
+            ('PrefixTrie', prefix_build, prefix_mem, prefix_query),
+            ('CompactTrie', compact_build, compact_mem, compact_query),
+            ('MappedTrie', mapped_build, mapped_mem, mapped_query),
+        ):
+            self.stdout.write(f'{name:14}{build:12.2f}{mem / 2**20:15.1f}{query * 1e6:15.1f}')
+        self.stdout.write(
+            f'Snapshot: {mapped_size / 2**20:.1f} MiB on disk, '
+            f'open + first suggest {mapped_first * 1e6:.0f} µs'
+        )
+
+        summary = (
+            f'Done. build ×{prefix_build / compact_build:.1f}  '
+            f'memory ×{prefix_mem / compact_mem:.1f}  '
+            f'suggest ×{prefix_query / compact_query:.1f}'
+        )
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f'{summary}  ({mismatches} differing results)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    # ---------------------------------------------------------------------- #
+    # Helpers
+    # ---------------------------------------------------------------------- #
+
+    @staticmethod
+    def _measure_build(build):
+        # Two builds: tracemalloc slows allocation-heavy code several-fold,
+        # so it would distort the timing.
+        started = time.perf_counter()
+        trie = build()
+        elapsed = time.perf_counter() - started
+        del trie
+
+        tracemalloc.start()
+        trie = build()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return trie, elapsed, memory
+
+    @staticmethod
+    def _measure_queries(trie, prefixes) -> float:
+        started = time.perf_counter()
+        for prefix in prefixes:
+            trie.suggest(prefix)
+        return (time.perf_counter() - started) / len(prefixes)
+
+    @staticmethod
+    def _synthetic_phrases(rng, count: int) -> list[tuple[str, float]]:
+        syllables = ['ka', 'lo', 'ri', 'sen', 'tor', 'mi', 'da', 'vel', 'on', 'ure', 'ph', 'ast']
+        vocabulary = sorted({
+            ''.join(rng.choice(syllables) for _ in range(rng.randint(1, 4)))
+            for _ in range(5_000)
+        })
+        # Zipf-like word choice so phrases share prefixes the way real text does.
+        word_weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        phrases = []
+        for _ in range(count):
+            words = rng.choices(vocabulary, weights=word_weights, k=rng.randint(2, 8))
+            phrases.append((' '.join(words), float(rng.randint(1, 3))))
+        return phrases
+
+    @staticmethod
+    def _user_phrases(user) -> list[tuple[str, float]]:
+        from apps.indexer.services import AutocompleteService
+
+        return list(AutocompleteService._build_user_trie(user).items())
+
+    @staticmethod
+    def _prefixes(rng, phrases, count: int) -> list[str]:
+        prefixes = []
+        for _ in range(count):
+            phrase = rng.choice(phrases)[0]
+            prefixes.append(phrase[: rng.randint(1, min(len(phrase), 12))])
+        return prefixes
@@ -0,0 +1,94 @@
+"""
+Management command: dedup_stats
+
+Reports upload de-duplication: how many uploads were identical to a file
+the same user already had (and so were indexed by copying that file's
+index instead of extracting and tokenizing it), and how many bytes of
+extraction that saved.
+
+Usage examples:
+    # All users
+    python manage.py dedup_stats
+
+    # One user, hashing files uploaded before content hashes were recorded
+    python manage.py dedup_stats --user fardin --backfill
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q, Sum
+
+from apps.upload.models import UploadedFile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Report the upload de-duplication hit rate and the bytes it saved.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            metavar='USERNAME',
+            help='Limit the report to a specific user (by username).',
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='First compute content hashes for files that have none, so '
+                 'later re-uploads of them are de-duplicated.',
+        )
+
+    def handle(self, *args, **options):
+        files = UploadedFile.objects.all()
+        if options['user']:
+            try:
+                files = files.filter(uploaded_by=User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["user"]}" not found.')
+
+        if options['backfill']:
+            self._backfill(files.filter(content_hash='', deleted_at=None))
+
+        rows = (
+            files
+            .values('uploaded_by__username')
+            .annotate(
+                uploads=Count('pk'),
+                duplicates=Count('pk', filter=Q(duplicate_of__isnull=False)),
+                saved=Sum('file_size', filter=Q(duplicate_of__isnull=False), default=0),
+            )
+            .order_by('uploaded_by__username')
+        )
+
+        self.stdout.write(f'{"user":20}{"uploads":>10}{"deduplicated":>14}{"hit rate":>10}{"saved (MiB)":>13}')
+        total_uploads = total_duplicates = total_saved = 0
+        for row in rows:
+            self._write_row(row['uploaded_by__username'], row['uploads'], row['duplicates'], row['saved'])
+            total_uploads += row['uploads']
+            total_duplicates += row['duplicates']
+            total_saved += row['saved']
+        self._write_row('total', total_uploads, total_duplicates, total_saved)
+
+    # ---------------------------------------------------------------------- #
+    # Helpers
+    # ---------------------------------------------------------------------- #
+
+    def _write_row(self, name: str, uploads: int, duplicates: int, saved: int):
+        rate = duplicates / uploads if uploads else 0.0
+        self.stdout.write(f'{name:20}{uploads:10}{duplicates:14}{rate:10.1%}{saved / 2**20:13.1f}')
+
+    def _backfill(self, files):
+        from apps.indexer.text_cache import file_sha256
+
+        hashed = 0
+        for uploaded_file in files.iterator():
+            try:
+                uploaded_file.content_hash = file_sha256(uploaded_file.file.path)
+            except OSError as exc:
+                self.stderr.write(f'  cannot read file id={uploaded_file.pk}: {exc}')
+                continue
+            uploaded_file.save(update_fields=['content_hash'])
+            hashed += 1
+        self.stdout.write(f'Hashed {hashed} file(s).\n')
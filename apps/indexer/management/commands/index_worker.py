@@ -0,0 +1,235 @@
+"""
+Management command: index_worker
+
+Drains the persistent IndexingJob queue.  Run one or more of these per host
+(or per container) — workers coordinate through the database, so indexing
+capacity scales independently of the web tier.
+
+Document text is extracted in sandboxed worker processes (see
+`apps/indexer/sandbox.py`); on exit the command prints, per file type, how
+many extractions ran and how many timed out, ran out of memory or crashed.
+On start it drops cached text of older extractor versions
+(`text_cache.prune_stale`).
+
+Usage examples:
+    # Long-running worker with two indexing threads
+    python manage.py index_worker --concurrency 2
+
+    # Process everything that is currently due, then exit
+    python manage.py index_worker --burst
+
+    # Re-claim the jobs of a crashed worker after 30 minutes of silence
+    python manage.py index_worker --visibility-timeout 1800
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from apps.indexer import jobs, sandbox, text_cache
+from apps.indexer.pipeline import index_document
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Process queued indexing jobs (SELECT … FOR UPDATE SKIP LOCKED).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            metavar='N',
+            help='Number of indexing threads in this process (default: 1).',
+        )
+        parser.add_argument(
+            '--visibility-timeout',
+            type=int,
+            default=600,
+            metavar='SECONDS',
+            help='Re-claim running jobs whose lock has not been renewed for this long; '
+                 'running jobs renew it every third of this (default: 600).',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            metavar='N',
+            help='Give up on a job after this many attempts (default: 5).',
+        )
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=30.0,
+            metavar='SECONDS',
+            help='Base retry delay; doubles on each failed attempt (default: 30).',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            metavar='SECONDS',
+            help='Sleep between polls when the queue is empty (default: 2).',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no runnable jobs are left instead of polling forever.',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency must be at least 1.')
+
+        self._options = options
+        self._stop = threading.Event()
+        self._processed = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+
+        base_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+
+        self.stdout.write(
+            f'Index worker {base_id} started (concurrency={concurrency}, '
+            f'visibility_timeout={options["visibility_timeout"]}s).'
+        )
+        pruned = text_cache.prune_stale()
+        if pruned:
+            self.stdout.write(f'Dropped {pruned} cached extraction(s) of older extractor versions.')
+
+        try:
+            if concurrency == 1:
+                self._work_loop(f'{base_id}:0')
+            else:
+                threads = [
+                    threading.Thread(
+                        target=self._thread_main,
+                        args=(f'{base_id}:{i}',),
+                        name=f'index-worker-{i}',
+                        daemon=True,
+                    )
+                    for i in range(concurrency)
+                ]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    while t.is_alive():
+                        t.join(timeout=1.0)
+        except KeyboardInterrupt:
+            self._stop.set()
+        finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+
+        summary = f'Done. processed={self._processed}  failed={self._failed}'
+        if self._failed:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+        for file_type, counts in sorted(sandbox.stats().items()):
+            self.stdout.write(
+                f'  extraction {file_type}: '
+                + '  '.join(f'{outcome}={counts[outcome]}' for outcome in sandbox.OUTCOMES)
+            )
+
+    # ---------------------------------------------------------------------- #
+    # Worker loop
+    # ---------------------------------------------------------------------- #
+
+    def _thread_main(self, worker_id: str):
+        try:
+            self._work_loop(worker_id)
+        finally:
+            connection.close()
+
+    def _work_loop(self, worker_id: str):
+        opts = self._options
+        while not self._stop.is_set():
+            close_old_connections()
+            job = jobs.claim(worker_id, opts['visibility_timeout'], opts['max_attempts'])
+            if job is None:
+                if opts['burst']:
+                    return
+                self._stop.wait(opts['poll_interval'])
+                continue
+
+            if self._run_job(job, worker_id):
+                jobs.complete(job, worker_id)
+                self._record(ok=True)
+                self.stdout.write(f'  ✓ job {job.pk} file {job.document_id}')
+            else:
+                jobs.retry_or_fail(
+                    job, worker_id,
+                    error='index_document returned a failure status.',
+                    max_attempts=opts['max_attempts'],
+                    backoff=opts['backoff'],
+                )
+                self._record(ok=False)
+                self.stdout.write(self.style.ERROR(
+                    f'  ✗ job {job.pk} file {job.document_id} (attempt {job.attempts})'
+                ))
+
+    def _run_job(self, job, worker_id: str) -> bool:
+        """
+        Index the job's file, renewing the job's lock in the background so
+        that no other worker re-claims it while it runs.  A False return
+        from index_document is only a failure if the file is still waiting
+        to be indexed — files that were deleted or already processed in the
+        meantime simply complete the job.
+        """
+        from apps.upload.models import UploadedFile
+
+        done = threading.Event()
+        beat = threading.Thread(
+            target=self._heartbeat,
+            args=(job, worker_id, done),
+            name=f'heartbeat-{job.pk}',
+            daemon=True,
+        )
+        beat.start()
+        try:
+            if index_document(job.document_id):
+                return True
+        except Exception as exc:
+            logger.error('index_worker: job=%s crashed: %s', job.pk, exc, exc_info=True)
+            return False
+        finally:
+            done.set()
+            beat.join()
+
+        status = (
+            UploadedFile.objects
+            .filter(pk=job.document_id)
+            .values_list('status', flat=True)
+            .first()
+        )
+        return status not in ('pending', 'failed')
+
+    def _heartbeat(self, job, worker_id: str, done: threading.Event):
+        interval = max(self._options['visibility_timeout'] / 3, 0.1)
+        try:
+            while not done.wait(interval):
+                if not jobs.heartbeat(job, worker_id):
+                    logger.warning('index_worker: job=%s lock lost to another worker', job.pk)
+                    return
+        finally:
+            connection.close()
+
+    def _record(self, ok: bool):
+        with self._lock:
+            if ok:
+                self._processed += 1
+            else:
+                self._failed += 1
@@ -0,0 +1,80 @@
+"""
+Management command: partition_index
+
+Switches the InvertedIndex table between one table for all users and the
+partitioned layout of apps/indexer/partitions.py, gives large tenants a
+partition of their own, and shows the current layout.
+
+Usage examples:
+    # Show the partitions, their bounds, estimated rows and size
+    python manage.py partition_index
+
+    # Split the table into 16 hash partitions by user
+    python manage.py partition_index --partitions 16
+
+    # Move a large tenant into a dedicated partition
+    python manage.py partition_index --dedicate fardin
+
+    # Back to a single table
+    python manage.py partition_index --off
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.indexer import partitions
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Partition the inverted index by user, or show its partitions.'
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument(
+            '--partitions',
+            type=int,
+            metavar='N',
+            help='Convert the single table into N hash partitions by user.',
+        )
+        group.add_argument(
+            '--dedicate',
+            type=str,
+            metavar='USERNAME',
+            help='Move a user into a partition of their own.',
+        )
+        group.add_argument(
+            '--off',
+            action='store_true',
+            help='Convert the partitioned layout back into a single table.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['partitions'] is not None:
+                partitions.partition(options['partitions'])
+                self.stdout.write(self.style.SUCCESS(
+                    f'Partitioned into {options["partitions"]} hash partitions.'
+                ))
+            elif options['dedicate']:
+                try:
+                    user = User.objects.get(username=options['dedicate'])
+                except User.DoesNotExist:
+                    raise CommandError(f'User "{options["dedicate"]}" not found.')
+                name = partitions.dedicate(user.pk)
+                self.stdout.write(self.style.SUCCESS(f'{user.username} → {name}'))
+            elif options['off']:
+                partitions.unpartition()
+                self.stdout.write(self.style.SUCCESS('Converted back to a single table.'))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        # ------------------------------------------------------------------ #
+        # Layout
+        # ------------------------------------------------------------------ #
+        self.stdout.write(f'\n{"table":36}{"bound":44}{"rows":>12}{"size (MiB)":>12}')
+        for leaf in partitions.describe():
+            self.stdout.write(
+                f'{leaf["name"]:36}{leaf["bound"] or "-":44}{leaf["rows"]:12,}{leaf["bytes"] / 2**20:12.1f}'
+            )
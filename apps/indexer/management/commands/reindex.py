@@ -8,11 +8,16 @@ Usage examples:
     # Re-index all pending/failed files for a specific user
     python manage.py reindex --user fardin
 
-    # Full corpus re-score for all users (fixes TF-IDF eventual-consistency drift)
+    # Full corpus re-score for all users (refreshes the stored tf_idf snapshot;
+    # only needed with INDEXER_SCORING_MODE=index_time)
     python manage.py reindex --all
 
     # Combine: full re-score for one user only
     python manage.py reindex --all --user fardin
+
+    # Two-phase rebuild: analyze every document first (8 threads), then write
+    # all postings with exact corpus statistics in one pass
+    python manage.py reindex --all --rebuild --workers 8
 """
 
 import logging
@@ -20,7 +25,9 @@ import logging
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
 
-from apps.indexer.pipeline import index_document, reindex_user_corpus
+from apps.indexer.pipeline import (
+    index_document, rebuild_user_corpus, reindex_user_corpus,
+)
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -53,11 +60,26 @@ class Command(BaseCommand):
             metavar='USERNAME',
             help='Limit operation to a specific user (by username).',
         )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='With --all: analyze every document first, then write all postings '
+                 'with exact corpus statistics in one pass.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            metavar='N',
+            help='Threads analyzing documents for --rebuild (default: INDEXER_REBUILD_WORKERS).',
+        )
 
     def handle(self, *args, **options):
         user_filter = options.get('user')
         target_user = None
 
+        if options['rebuild'] and not options['all']:
+            raise CommandError('--rebuild requires --all.')
+
         if user_filter:
             try:
                 target_user = User.objects.get(username=user_filter)
@@ -68,7 +90,7 @@ class Command(BaseCommand):
             self._reindex_single(options['file_id'])
 
         elif options['all']:
-            self._reindex_all(target_user)
+            self._reindex_all(target_user, rebuild=options['rebuild'], workers=options['workers'])
 
         elif options['pending']:
             self._reindex_pending(target_user)
@@ -79,7 +101,6 @@ class Command(BaseCommand):
 
     def _reindex_single(self, file_id: int):
         from apps.upload.models import UploadedFile
-        from apps.indexer.models import InvertedIndex
 
         try:
             f = UploadedFile.objects.get(pk=file_id)
@@ -88,10 +109,9 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Re-indexing file id={file_id} ({f.original_filename}) …')
 
-        # Reset + clear for a clean rebuild
+        # Reset for a clean rebuild (index_document replaces the old entries)
         f.status = 'pending'
         f.save(update_fields=['status'])
-        InvertedIndex.objects.filter(document=f).delete()
 
         ok = index_document(file_id)
         if ok:
@@ -99,14 +119,17 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.ERROR(f'✗ File {file_id} indexing failed.'))
 
-    def _reindex_all(self, target_user=None):
+    def _reindex_all(self, target_user=None, rebuild: bool = False, workers: int | None = None):
         users = [target_user] if target_user else list(User.objects.filter(is_active=True))
         self.stdout.write(f'Full corpus re-score for {len(users)} user(s) …')
 
         total_ok = total_fail = 0
         for user in users:
             self.stdout.write(f'  User: {user.username}')
-            stats = reindex_user_corpus(user)
+            if rebuild:
+                stats = rebuild_user_corpus(user, workers=workers)
+            else:
+                stats = reindex_user_corpus(user)
             total_ok += stats['reindexed']
             total_fail += stats['failed']
             self.stdout.write(
@@ -0,0 +1,85 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Func, IntegerField, Sum
+
+
+def backfill_corpus_statistics(apps, schema_editor):
+    InvertedIndex = apps.get_model('indexer', 'InvertedIndex')
+    CorpusStatistic = apps.get_model('indexer', 'CorpusStatistic')
+    TermStatistic = apps.get_model('indexer', 'TermStatistic')
+
+    totals = (
+        InvertedIndex.objects
+        .values('document__uploaded_by')
+        .annotate(
+            docs=Count('document', distinct=True),
+            tokens=Sum(Func(F('positions'), function='jsonb_array_length', output_field=IntegerField())),
+        )
+    )
+    CorpusStatistic.objects.bulk_create(
+        [
+            CorpusStatistic(
+                user_id=row['document__uploaded_by'],
+                total_documents=row['docs'],
+                total_tokens=row['tokens'] or 0,
+            )
+            for row in totals
+        ],
+        batch_size=1000,
+    )
+
+    per_term = (
+        InvertedIndex.objects
+        .values('document__uploaded_by', 'term')
+        .annotate(df=Count('document', distinct=True))
+        .iterator()
+    )
+    batch = []
+    for row in per_term:
+        batch.append(TermStatistic(
+            user_id=row['document__uploaded_by'],
+            term=row['term'],
+            document_frequency=row['df'],
+        ))
+        if len(batch) >= 1000:
+            TermStatistic.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TermStatistic.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0003_add_document_phrase'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorpusStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_documents', models.PositiveIntegerField(default=0, help_text="Number of indexed documents in the user's corpus.")),
+                ('total_tokens', models.PositiveBigIntegerField(default=0, help_text="Total number of indexed tokens across the user's corpus.")),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='corpus_statistic', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TermStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(help_text='Normalized (lowercased, stemmed) token.', max_length=100)),
+                ('document_frequency', models.PositiveIntegerField(default=0, help_text="Number of documents in the user's corpus that contain this term.")),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_statistics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'term')},
+            },
+        ),
+        migrations.RunPython(backfill_corpus_statistics, migrations.RunPython.noop),
+    ]
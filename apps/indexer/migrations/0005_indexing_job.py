@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def enqueue_unindexed_files(apps, schema_editor):
+    # Files left pending/failed by the old in-process indexing threads would
+    # otherwise never be picked up by a worker.
+    UploadedFile = apps.get_model('upload', 'UploadedFile')
+    IndexingJob = apps.get_model('indexer', 'IndexingJob')
+
+    file_ids = UploadedFile.objects.filter(
+        status__in=['pending', 'failed'],
+        deleted_at=None,
+    ).values_list('id', flat=True)
+    IndexingJob.objects.bulk_create(
+        [IndexingJob(document_id=file_id) for file_id in file_ids],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0004_corpus_statistics'),
+        ('upload', '0004_uploadedfile_add_txt_file_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of times a worker has claimed this job.')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time the job may be claimed (used for retry backoff).')),
+                ('locked_by', models.CharField(blank=True, default='', help_text='Identifier of the worker currently holding the job.', max_length=255)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.ForeignKey(help_text='The file to index.', on_delete=django.db.models.deletion.CASCADE, related_name='indexing_jobs', to='upload.uploadedfile')),
+            ],
+            options={
+                'ordering': ['run_after', 'id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='indexer_ind_status_58a819_idx')],
+            },
+        ),
+        migrations.RunPython(enqueue_unindexed_files, migrations.RunPython.noop),
+    ]
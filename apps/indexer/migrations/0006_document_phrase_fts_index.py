@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:11
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0005_indexing_job'),
+        ('upload', '0004_uploadedfile_add_txt_file_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentphrase',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('phrase', config='english'), name='indexer_doc_phrase_fts_idx'),
+        ),
+    ]
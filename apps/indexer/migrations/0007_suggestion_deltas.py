@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0006_document_phrase_fts_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='corpusstatistic',
+            name='suggestion_version',
+            field=models.PositiveBigIntegerField(default=0, help_text="Version of the user's autocomplete phrase set."),
+        ),
+        migrations.CreateModel(
+            name='SuggestionDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField()),
+                ('added', models.JSONField(default=list, help_text='[[phrase, weight], ...] inserted into the trie.')),
+                ('removed', models.JSONField(default=list, help_text='[phrase, ...] removed from the trie.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestion_deltas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['version'],
+                'unique_together': {('user', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Func, IntegerField, Sum
+
+
+def backfill_vocabulary(apps, schema_editor):
+    InvertedIndex = apps.get_model('indexer', 'InvertedIndex')
+    VocabularyTerm = apps.get_model('indexer', 'VocabularyTerm')
+
+    per_word = (
+        InvertedIndex.objects
+        .exclude(original_term='')
+        .values('document__uploaded_by', 'original_term')
+        .annotate(
+            df=Count('document', distinct=True),
+            occurrences=Sum(Func(F('positions'), function='jsonb_array_length', output_field=IntegerField())),
+        )
+        .iterator()
+    )
+    batch = []
+    for row in per_word:
+        batch.append(VocabularyTerm(
+            user_id=row['document__uploaded_by'],
+            word=row['original_term'],
+            document_frequency=row['df'],
+            occurrences=row['occurrences'] or 0,
+        ))
+        if len(batch) >= 1000:
+            VocabularyTerm.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        VocabularyTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0007_suggestion_deltas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VocabularyTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(help_text='Lowercased, pre-stem word form.', max_length=100)),
+                ('document_frequency', models.PositiveIntegerField(default=0, help_text="Number of documents in the user's corpus that contain this word.")),
+                ('occurrences', models.PositiveBigIntegerField(default=0, help_text="Total occurrences of this word across the user's corpus.")),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vocabulary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'word'], name='indexer_vocab_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops'])],
+                'unique_together': {('user', 'word')},
+            },
+        ),
+        migrations.RunPython(backfill_vocabulary, migrations.RunPython.noop),
+    ]
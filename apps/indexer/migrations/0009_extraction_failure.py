@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0008_vocabulary'),
+        ('upload', '0004_uploadedfile_add_txt_file_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.PositiveIntegerField(blank=True, help_text='1-based page number; empty when the whole document failed.', null=True)),
+                ('reason', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(help_text='The document that was only partially extracted.', on_delete=django.db.models.deletion.CASCADE, related_name='extraction_failures', to='upload.uploadedfile')),
+            ],
+            options={
+                'ordering': ['document', 'page'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0009_extraction_failure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(help_text='SHA-256 (hex) of the stored file.', max_length=64)),
+                ('file_type', models.CharField(max_length=10)),
+                ('extractor_version', models.PositiveIntegerField()),
+                ('text', models.BinaryField(help_text='gzip-compressed, length-prefixed UTF-8 text chunks.')),
+                ('text_length', models.PositiveBigIntegerField(default=0, help_text='Length of the uncompressed text in characters.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'file_type', 'extractor_version')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:58
+
+from django.db import migrations
+
+import apps.indexer.postings
+
+BATCH_SIZE = 2000
+
+
+def pack_positions(apps, schema_editor):
+    InvertedIndex = apps.get_model('indexer', 'InvertedIndex')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            InvertedIndex.objects
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'positions')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for row in batch:
+            row.packed_positions = row.positions
+        InvertedIndex.objects.bulk_update(batch, ['packed_positions'])
+        last_pk = batch[-1].pk
+
+
+def unpack_positions(apps, schema_editor):
+    InvertedIndex = apps.get_model('indexer', 'InvertedIndex')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            InvertedIndex.objects
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'packed_positions')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for row in batch:
+            row.positions = list(row.packed_positions)
+        InvertedIndex.objects.bulk_update(batch, ['positions'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0010_extracted_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invertedindex',
+            name='packed_positions',
+            field=apps.indexer.postings.PositionsField(default=b'\x01'),
+        ),
+        migrations.RunPython(pack_positions, unpack_positions),
+        migrations.RemoveField(
+            model_name='invertedindex',
+            name='positions',
+        ),
+        migrations.RenameField(
+            model_name='invertedindex',
+            old_name='packed_positions',
+            new_name='positions',
+        ),
+        migrations.AlterField(
+            model_name='invertedindex',
+            name='positions',
+            field=apps.indexer.postings.PositionsField(help_text="Token-offset positions (0-based) of this term in the document, packed by apps/indexer/postings.py; loaded as array('I')."),
+        ),
+    ]
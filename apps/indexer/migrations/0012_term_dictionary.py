@@ -0,0 +1,118 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 5000
+
+
+def build_dictionary(apps, schema_editor):
+    InvertedIndex = apps.get_model('indexer', 'InvertedIndex')
+    Term = apps.get_model('indexer', 'Term')
+
+    texts = set(InvertedIndex.objects.values_list('term', flat=True).distinct())
+    texts.update(
+        InvertedIndex.objects.exclude(original_term='').values_list('original_term', flat=True).distinct()
+    )
+    Term.objects.bulk_create([Term(text=text) for text in texts], batch_size=BATCH_SIZE)
+
+    InvertedIndex.objects.update(
+        term_ref=Subquery(Term.objects.filter(text=OuterRef('term')).values('pk')[:1]),
+        original_ref=Subquery(Term.objects.filter(text=OuterRef('original_term')).values('pk')[:1]),
+    )
+    _check_constraints_now(schema_editor)
+
+
+def restore_strings(apps, schema_editor):
+    InvertedIndex = apps.get_model('indexer', 'InvertedIndex')
+    Term = apps.get_model('indexer', 'Term')
+
+    InvertedIndex.objects.update(
+        term=Subquery(Term.objects.filter(pk=OuterRef('term_ref')).values('text')[:1]),
+    )
+    InvertedIndex.objects.filter(original_ref__isnull=False).update(
+        original_term=Subquery(Term.objects.filter(pk=OuterRef('original_ref')).values('text')[:1]),
+    )
+    _check_constraints_now(schema_editor)
+
+
+def _check_constraints_now(schema_editor):
+    # Run the deferred foreign-key checks queued by the UPDATEs, or the
+    # ALTER TABLEs that follow in this transaction refuse to run.
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0011_packed_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Term',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('text', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='invertedindex',
+            name='term_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='indexer.term'),
+        ),
+        migrations.AddField(
+            model_name='invertedindex',
+            name='original_ref',
+            field=models.ForeignKey(null=True, db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='indexer.term'),
+        ),
+        # Nullable while the strings are dropped, so the reverse migration
+        # can re-add the column before refilling it.
+        migrations.AlterField(
+            model_name='invertedindex',
+            name='term',
+            field=models.CharField(db_index=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(build_dictionary, restore_strings),
+        migrations.AlterUniqueTogether(
+            name='invertedindex',
+            unique_together=set(),
+        ),
+        migrations.RemoveIndex(
+            model_name='invertedindex',
+            name='indexer_inv_term_807fa6_idx',
+        ),
+        migrations.RemoveField(
+            model_name='invertedindex',
+            name='term',
+        ),
+        migrations.RemoveField(
+            model_name='invertedindex',
+            name='original_term',
+        ),
+        migrations.RenameField(
+            model_name='invertedindex',
+            old_name='term_ref',
+            new_name='term',
+        ),
+        migrations.RenameField(
+            model_name='invertedindex',
+            old_name='original_ref',
+            new_name='original_term',
+        ),
+        migrations.AlterField(
+            model_name='invertedindex',
+            name='term',
+            field=models.ForeignKey(help_text='Normalized (lowercased, stemmed) token.', on_delete=django.db.models.deletion.PROTECT, related_name='postings', to='indexer.term'),
+        ),
+        migrations.AlterField(
+            model_name='invertedindex',
+            name='original_term',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Original (lowercased, pre-stem) word for human-readable suggestions.', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='indexer.term'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='invertedindex',
+            unique_together={('document', 'term')},
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery
+
+
+def copy_owner_and_deleted(apps, schema_editor):
+    UploadedFile = apps.get_model('upload', 'UploadedFile')
+
+    for name in ('InvertedIndex', 'DocumentPhrase'):
+        apps.get_model('indexer', name).objects.update(
+            user=Subquery(UploadedFile.objects.filter(pk=OuterRef('document')).values('uploaded_by')[:1]),
+            deleted=Exists(UploadedFile.objects.filter(pk=OuterRef('document'), deleted_at__isnull=False)),
+        )
+    # Run the deferred foreign-key checks queued by the UPDATEs, or the
+    # ALTER TABLEs that follow in this transaction refuse to run.
+    schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0012_term_dictionary'),
+        ('upload', '0005_uploadedfile_content_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invertedindex',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='invertedindex',
+            name='deleted',
+            field=models.BooleanField(default=False, help_text='The document is soft-deleted (denormalized from document.deleted_at).'),
+        ),
+        migrations.AddField(
+            model_name='documentphrase',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='documentphrase',
+            name='deleted',
+            field=models.BooleanField(default=False, help_text='The document is soft-deleted (denormalized from document.deleted_at).'),
+        ),
+        migrations.RunPython(copy_owner_and_deleted, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='invertedindex',
+            name='user',
+            field=models.ForeignKey(db_index=False, help_text='Owner of the document (denormalized from document.uploaded_by).', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='documentphrase',
+            name='user',
+            field=models.ForeignKey(db_index=False, help_text='Owner of the document (denormalized from document.uploaded_by).', on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='invertedindex',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['user', 'term'], include=('document', 'term_frequency', 'tf_idf'), name='indexer_inv_user_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentphrase',
+            index=models.Index(condition=models.Q(('deleted', False)), fields=['user', 'document'], name='indexer_doc_user_live_idx'),
+        ),
+    ]
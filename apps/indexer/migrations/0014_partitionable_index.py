@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:12
+
+from django.conf import settings
+from django.db import migrations
+
+
+def apply_layout(apps, schema_editor):
+    from apps.indexer import partitions
+
+    hash_partitions = getattr(settings, 'INDEXER_PARTITIONS', 0)
+    if hash_partitions and not partitions.is_partitioned():
+        partitions.partition(hash_partitions)
+
+
+def restore_single_table(apps, schema_editor):
+    from apps.indexer import partitions
+
+    if partitions.is_partitioned():
+        partitions.unpartition()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('indexer', '0013_denormalized_owner'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='invertedindex',
+            unique_together={('document', 'term', 'user')},
+        ),
+        migrations.RunPython(apply_layout, restore_single_table),
+    ]
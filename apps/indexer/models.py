@@ -1,18 +1,48 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from apps.indexer.postings import PositionsField
+
+
+class Term(models.Model):
+    """
+    Global term dictionary: every distinct stemmed term and original word
+    stored once, under a 4-byte integer id.
+
+    InvertedIndex rows reference terms by id instead of repeating the
+    strings, which keeps its heap and its (document, term) / term indexes
+    small.  Terms are shared by all users and never deleted; see
+    `apps/indexer/lexicon.py`.
+    """
+
+    id = models.AutoField(primary_key=True)
+    text = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.text
 
 
 class InvertedIndex(models.Model):
     """
     Single-table inverted index storing one row per (document, term) pair.
 
-    User isolation is enforced implicitly: every query must filter through
-    document__uploaded_by=<user>, following the FK chain from this table
-    → UploadedFile → User.
+    `user` and `deleted` copy the document's owner and soft-delete state, so
+    queries filter on user=<user>, deleted=False without joining
+    UploadedFile; the pipeline and `pipeline.sync_deleted_flag()` keep them
+    in step.  Search is an index-only scan of the covering
+    (user, term) INCLUDE (document, term_frequency, tf_idf) index.
 
-    TF-IDF is computed at index time for the new document only (eventual
-    consistency). Run `manage.py reindex --all` to recompute the full corpus
-    scores after many documents have been indexed.
+    `term` and `original_term` are ids in the Term dictionary; search
+    resolves the query's terms to ids once and filters on `term_id`.
+
+    `term_frequency` is fixed once the document is indexed.  By default
+    search combines it with IDF computed at query time from the live corpus
+    statistics; `document_frequency` and `tf_idf` are an index-time snapshot
+    used only when INDEXER_SCORING_MODE='index_time' (refresh it with
+    `manage.py reindex --all`).
     """
 
     document = models.ForeignKey(
@@ -21,14 +51,31 @@ class InvertedIndex(models.Model):
         related_name='index_entries',
         help_text='The source document this term was extracted from.',
     )
-    term = models.CharField(
-        max_length=100,
-        db_index=True,
+    # Rows go with their document (CASCADE above); no per-user delete scan.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_index=False,
+        related_name='+',
+        help_text='Owner of the document (denormalized from document.uploaded_by).',
+    )
+    deleted = models.BooleanField(
+        default=False,
+        help_text='The document is soft-deleted (denormalized from document.deleted_at).',
+    )
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.PROTECT,
+        related_name='postings',
         help_text='Normalized (lowercased, stemmed) token.',
     )
-    original_term = models.CharField(
-        max_length=100,
-        default='',
+    original_term = models.ForeignKey(
+        Term,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='+',
         help_text='Original (lowercased, pre-stem) word for human-readable suggestions.',
     )
     term_frequency = models.FloatField(
@@ -41,17 +88,24 @@ class InvertedIndex(models.Model):
     tf_idf = models.FloatField(
         help_text='Precomputed TF-IDF score at index time.',
     )
-    positions = models.JSONField(
-        default=list,
-        help_text='List of token-offset positions (0-based) of this term in the document.',
+    positions = PositionsField(
+        help_text='Token-offset positions (0-based) of this term in the document, packed '
+                  'by apps/indexer/postings.py; loaded as array(\'I\').',
     )
     indexed_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = [('document', 'term')]
+        # `user` is redundant here (a document has one owner) but lets the
+        # constraint hold on the partitioned layout (see partitions.py).
+        unique_together = [('document', 'term', 'user')]
         indexes = [
-            models.Index(fields=['term']),
             models.Index(fields=['document']),
+            models.Index(
+                fields=['user', 'term'],
+                include=['document', 'term_frequency', 'tf_idf'],
+                condition=models.Q(deleted=False),
+                name='indexer_inv_user_term_idx',
+            ),
         ]
         ordering = ['-tf_idf']
 
@@ -65,9 +119,10 @@ class DocumentPhrase(models.Model):
     time.  Used by autocomplete to suggest human-readable sentence fragments
     rather than isolated stemmed tokens.
 
-    Each row is one sentence (via NLTK sent_tokenize), cleaned and capped at
-    MAX_PHRASE_LENGTH characters.  User isolation follows the same FK chain:
-    document → UploadedFile → User.
+    Each row is one sentence, as reported by `tokenizer.StreamAnalyzer`
+    (sentence spans found in the same pass as the terms), cleaned and
+    capped at MAX_PHRASE_LENGTH characters.  `user` and `deleted` are denormalized
+    from the document, as on InvertedIndex.
     """
 
     MAX_PHRASE_LENGTH = 200
@@ -78,6 +133,17 @@ class DocumentPhrase(models.Model):
         related_name='phrases',
         help_text='The source document this phrase was extracted from.',
     )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_index=False,
+        related_name='+',
+        help_text='Owner of the document (denormalized from document.uploaded_by).',
+    )
+    deleted = models.BooleanField(
+        default=False,
+        help_text='The document is soft-deleted (denormalized from document.deleted_at).',
+    )
     phrase = models.CharField(
         max_length=MAX_PHRASE_LENGTH,
         help_text='A sentence or phrase from the document content.',
@@ -91,6 +157,17 @@ class DocumentPhrase(models.Model):
         indexes = [
             models.Index(fields=['phrase']),
             models.Index(fields=['document']),
+            models.Index(
+                fields=['user', 'document'],
+                condition=models.Q(deleted=False),
+                name='indexer_doc_user_live_idx',
+            ),
+            # Full-text index used by SnippetService; the expression must
+            # match the SearchVector used at query time.
+            GinIndex(
+                SearchVector('phrase', config='english'),
+                name='indexer_doc_phrase_fts_idx',
+            ),
         ]
         ordering = ['position']
 
@@ -98,3 +175,265 @@ class DocumentPhrase(models.Model):
         return f'{self.phrase[:60]}… (doc={self.document_id})'
 
 
+class CorpusStatistic(models.Model):
+    """
+    Per-user corpus totals, maintained incrementally by the indexing pipeline
+    and the delete paths (see `apps/indexer/corpus.py`).
+
+    `total_documents` counts documents that currently have InvertedIndex rows;
+    `total_tokens` is the summed token length of those documents.
+    `suggestion_version` is bumped on every change to the user's autocomplete
+    phrases (see SuggestionDelta).
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='corpus_statistic',
+    )
+    total_documents = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of indexed documents in the user\'s corpus.',
+    )
+    total_tokens = models.PositiveBigIntegerField(
+        default=0,
+        help_text='Total number of indexed tokens across the user\'s corpus.',
+    )
+    suggestion_version = models.PositiveBigIntegerField(
+        default=0,
+        help_text='Version of the user\'s autocomplete phrase set.',
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user} — {self.total_documents} docs, {self.total_tokens} tokens'
+
+
+class TermStatistic(models.Model):
+    """
+    Per-user document frequency for a single stemmed term.
+
+    Replaces the COUNT(DISTINCT document) aggregate over InvertedIndex with a
+    single key lookup on (user, term).  Rows whose frequency drops to zero are
+    removed.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='term_statistics',
+    )
+    term = models.CharField(
+        max_length=100,
+        help_text='Normalized (lowercased, stemmed) token.',
+    )
+    document_frequency = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of documents in the user\'s corpus that contain this term.',
+    )
+
+    class Meta:
+        unique_together = [('user', 'term')]
+
+    def __str__(self):
+        return f'"{self.term}" df={self.document_frequency} ({self.user})'
+
+
+class VocabularyTerm(models.Model):
+    """
+    Per-user vocabulary of original (pre-stem) words, for single-word
+    autocomplete.
+
+    Built from InvertedIndex.original_term and maintained incrementally
+    alongside TermStatistic.  `occurrences` is the word's summed raw term
+    count across the user's documents; completions rank by
+    (document_frequency, occurrences).
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='vocabulary',
+    )
+    word = models.CharField(
+        max_length=100,
+        help_text='Lowercased, pre-stem word form.',
+    )
+    document_frequency = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of documents in the user\'s corpus that contain this word.',
+    )
+    occurrences = models.PositiveBigIntegerField(
+        default=0,
+        help_text='Total occurrences of this word across the user\'s corpus.',
+    )
+
+    class Meta:
+        unique_together = [('user', 'word')]
+        indexes = [
+            # Serves `word LIKE 'prefix%'` range scans regardless of collation.
+            models.Index(
+                fields=['user', 'word'],
+                name='indexer_vocab_prefix_idx',
+                opclasses=['int4_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+
+    def __str__(self):
+        return f'"{self.word}" df={self.document_frequency} ({self.user})'
+
+
+class SuggestionDelta(models.Model):
+    """
+    One change to a user's autocomplete phrase set, numbered by the
+    CorpusStatistic.suggestion_version it produced.
+
+    Processes holding a cached PrefixTrie at version v replay the deltas
+    v+1 … current instead of rebuilding (see `apps/indexer/suggest_cache.py`).
+    Only the most recent RETAIN deltas per user are kept; a cache older than
+    that rebuilds from scratch.
+    """
+
+    RETAIN = 200
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='suggestion_deltas',
+    )
+    version = models.PositiveBigIntegerField()
+    added = models.JSONField(
+        default=list,
+        help_text='[[phrase, weight], ...] inserted into the trie.',
+    )
+    removed = models.JSONField(
+        default=list,
+        help_text='[phrase, ...] removed from the trie.',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [('user', 'version')]
+        ordering = ['version']
+
+    def __str__(self):
+        return f'{self.user} v{self.version} (+{len(self.added)} / -{len(self.removed)})'
+
+
+class IndexingJob(models.Model):
+    """
+    Durable indexing work item.  Uploads enqueue one job per file; the
+    `index_worker` management command claims jobs with
+    SELECT … FOR UPDATE SKIP LOCKED so any number of worker processes, on any
+    number of hosts, can drain the same queue (see `apps/indexer/jobs.py`).
+
+    The worker renews `locked_at` while the job runs.  A `running` job whose
+    `locked_at` is older than the worker's visibility timeout is considered
+    abandoned (crashed worker) and becomes claimable again.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    document = models.ForeignKey(
+        'upload.UploadedFile',
+        on_delete=models.CASCADE,
+        related_name='indexing_jobs',
+        help_text='The file to index.',
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of times a worker has claimed this job.',
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        help_text='Earliest time the job may be claimed (used for retry backoff).',
+    )
+    locked_by = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        help_text='Identifier of the worker currently holding the job.',
+    )
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+        ordering = ['run_after', 'id']
+
+    def __str__(self):
+        return f'Job {self.pk} — file {self.document_id} ({self.status})'
+
+
+class ExtractionFailure(models.Model):
+    """
+    Part of a document whose text could not be extracted in its latest
+    indexing run — a PDF page that raised, crashed its worker or exceeded
+    PDF_PAGE_TIMEOUT / PDF_DOCUMENT_TIMEOUT, or the whole document
+    (`page` empty).  The text that was extracted is still indexed.  Rows are
+    replaced on every indexing run of the document.
+    """
+
+    document = models.ForeignKey(
+        'upload.UploadedFile',
+        on_delete=models.CASCADE,
+        related_name='extraction_failures',
+        help_text='The document that was only partially extracted.',
+    )
+    page = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='1-based page number; empty when the whole document failed.',
+    )
+    reason = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['document', 'page']
+
+    def __str__(self):
+        where = f'page {self.page}' if self.page is not None else 'document'
+        return f'File {self.document_id} {where}: {self.reason}'
+
+
+class ExtractedText(models.Model):
+    """
+    Text extracted from a file (as the extractor's chunks), gzip-compressed
+    and keyed by the SHA-256 of the stored file, its file type and
+    `extractor.EXTRACTOR_VERSION`.
+
+    Lets re-indexing (and re-uploads of the same file) skip PDF/DOCX
+    extraction — see `apps/indexer/text_cache.py`.  Only complete
+    extractions are stored; rows for older extractor versions are dropped
+    when a newer one is written or an index worker starts, and a file's row
+    when the last live file with those bytes is deleted.
+    """
+
+    content_hash = models.CharField(
+        max_length=64,
+        help_text='SHA-256 (hex) of the stored file.',
+    )
+    file_type = models.CharField(max_length=10)
+    extractor_version = models.PositiveIntegerField()
+    text = models.BinaryField(help_text='gzip-compressed, length-prefixed UTF-8 text chunks.')
+    text_length = models.PositiveBigIntegerField(
+        default=0,
+        help_text='Length of the uncompressed text in characters.',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [('content_hash', 'file_type', 'extractor_version')]
+
+    def __str__(self):
+        return f'{self.content_hash[:12]}… ({self.file_type}, v{self.extractor_version})'
@@ -0,0 +1,253 @@
+"""
+OCR for PNG/JPG images.
+
+`image_to_text(file_path)` prepares the image before handing it to
+Tesseract, because OCR time grows with the pixel count:
+
+  - images scanned above OCR_TARGET_DPI are downscaled to it (Tesseract is
+    told the resulting DPI), and converted to greyscale
+  - with OCR_BINARIZE, pixels are thresholded to black and white (Otsu's
+    method), which also makes the image handed to Tesseract far smaller
+  - images larger than OCR_TILE_PIXELS are cut into horizontal strips, each
+    cut placed on the whitest row near the boundary so no text line is
+    split, and the strips are OCR'd by up to OCR_WORKERS Tesseract
+    processes at once
+
+Results are cached on disk in OCR_CACHE_DIR, keyed by the SHA-256 of the
+image file and a digest of the engine configuration (Tesseract version,
+language and the settings above), so re-uploads and reindexing never OCR
+the same image twice.  The cache is kept within OCR_CACHE_MAX_BYTES by
+evicting the least recently used entries (by mtime, refreshed on every
+hit) after each write.
+
+Requires the Tesseract binary on the host (OCR_TESSERACT_CMD):
+  - Debian/Ubuntu: apt install tesseract-ocr
+  - Fedora:        dnf install tesseract
+  - Docker:        add RUN apt-get install -y tesseract-ocr to Dockerfile
+
+If Tesseract or pytesseract/Pillow is not available, a warning is logged
+and '' is returned.
+"""
+
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Fraction of a tile's height searched on either side of a nominal cut for
+# the whitest row.
+_CUT_SEARCH = 0.125
+
+
+def image_to_text(file_path: str) -> str:
+    """OCR the image at `file_path`, served from the result cache when possible."""
+    try:
+        import pytesseract
+        from PIL import Image
+    except ImportError:
+        logger.warning(
+            'pytesseract/Pillow not available — skipping OCR for image %s.',
+            file_path,
+        )
+        return ''
+
+    cmd = getattr(settings, 'OCR_TESSERACT_CMD', 'tesseract')
+    try:
+        engine = _engine_version(cmd)
+    except OSError:
+        logger.warning(
+            'Tesseract not found - skipping OCR for image %s. '
+            'Install tesseract-ocr to enable image indexing.',
+            file_path,
+        )
+        return ''
+
+    config = _config()
+    cache_path = _cache_path(file_path, engine, config)
+    if cache_path is not None:
+        try:
+            text = cache_path.read_text(encoding='utf-8')
+            os.utime(cache_path)  # recently used: evicted last
+            return text
+        except OSError:
+            pass
+
+    pytesseract.pytesseract.tesseract_cmd = cmd
+    with Image.open(file_path) as image:
+        tiles, dpi = preprocess(image, config)
+    options = f'--dpi {dpi}' if dpi else ''
+
+    def ocr(tile) -> str:
+        return pytesseract.image_to_string(tile, lang=config['lang'], config=options).strip()
+
+    workers = min(config['workers'], len(tiles))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            texts = list(pool.map(ocr, tiles))
+    else:
+        texts = [ocr(tile) for tile in tiles]
+    text = '\n'.join(t for t in texts if t)
+
+    if cache_path is not None:
+        _write_cache(cache_path, text)
+    return text
+
+
+def preprocess(image, config: dict) -> tuple[list, int]:
+    """
+    Downscale, greyscale/binarize and tile `image` (a PIL Image) per
+    `config`.  Returns `(tiles, dpi)`; dpi is 0 when the image has none.
+    """
+    from PIL import Image
+
+    dpi = int(round(image.info.get('dpi', (0, 0))[0] or 0))
+    target = config['target_dpi']
+    image = image.convert('L')
+    if target and dpi > target:
+        scale = target / dpi
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+        dpi = target
+
+    if config['binarize']:
+        threshold = _otsu_threshold(image.histogram())
+        image = image.point(lambda p: 255 if p > threshold else 0, mode='1')
+
+    return _tiles(image, config['tile_pixels']), dpi
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+def _config() -> dict:
+    return {
+        'lang': getattr(settings, 'OCR_LANG', 'eng'),
+        'target_dpi': getattr(settings, 'OCR_TARGET_DPI', 300),
+        'binarize': getattr(settings, 'OCR_BINARIZE', True),
+        'tile_pixels': getattr(settings, 'OCR_TILE_PIXELS', 6_000_000),
+        'workers': max(1, getattr(settings, 'OCR_WORKERS', 2)),
+    }
+
+
+@lru_cache(maxsize=8)
+def _engine_version(cmd: str) -> str:
+    """First line of `tesseract --version`; OSError if the binary is missing."""
+    output = subprocess.run(
+        [cmd, '--version'], capture_output=True, stdin=subprocess.DEVNULL, check=False,
+    )
+    lines = (output.stdout or output.stderr).decode('utf-8', 'replace').splitlines()
+    return lines[0].strip() if lines else ''
+
+
+def _otsu_threshold(histogram: list[int]) -> int:
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    best, threshold = -1.0, 127
+    below = weighted_below = 0
+    for level, count in enumerate(histogram):
+        below += count
+        if not below:
+            continue
+        above = total - below
+        if not above:
+            break
+        weighted_below += level * count
+        mean_below = weighted_below / below
+        mean_above = (weighted_total - weighted_below) / above
+        variance = below * above * (mean_below - mean_above) ** 2
+        if variance > best:
+            best, threshold = variance, level
+    return threshold
+
+
+def _tiles(image, tile_pixels: int) -> list:
+    width, height = image.size
+    if not tile_pixels or width * height <= tile_pixels:
+        return [image]
+
+    from PIL import Image
+
+    step = max(1, tile_pixels // width)
+    search = max(1, int(step * _CUT_SEARCH))
+    tiles, top = [], 0
+    while height - top > step:
+        low, high = top + step - search, min(height - 1, top + step + search)
+        # Average every row of the search band down to a single pixel and
+        # cut on the brightest (emptiest) one.
+        band = image.crop((0, low, width, high)).convert('L').resize((1, high - low), Image.BOX)
+        rows = list(band.getdata())
+        cut = low + rows.index(max(rows))
+        tiles.append(image.crop((0, top, width, cut)))
+        top = cut
+    tiles.append(image.crop((0, top, width, height)))
+    return tiles
+
+
+def _cache_path(file_path: str, engine: str, config: dict) -> Path | None:
+    root = getattr(settings, 'OCR_CACHE_DIR', '')
+    if not root:
+        return None
+    with open(file_path, 'rb') as fh:
+        content = hashlib.file_digest(fh, 'sha256').hexdigest()
+    key = repr((engine, sorted((k, v) for k, v in config.items() if k != 'workers')))
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return Path(root) / content[:2] / f'{content}-{digest}.txt'
+
+
+def _write_cache(path: Path, text: str):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            fh.write(text)
+        os.replace(tmp, path)
+    except OSError as exc:
+        logger.warning('ocr: could not write cache entry %s: %s', path, exc)
+        return
+    _prune_cache(path.parent.parent, getattr(settings, 'OCR_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+
+def _prune_cache(root: Path, max_bytes: int) -> int:
+    """
+    Delete the least recently used entries (oldest mtime; hits touch it)
+    until the cache under `root` fits in `max_bytes`.  Returns the number
+    of entries deleted.  One directory scan per OCR'd image, which is cheap
+    next to the OCR itself.
+    """
+    if max_bytes <= 0:
+        return 0
+    entries = []
+    total = 0
+    for path in root.glob('*/*.txt'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # deleted by a concurrent prune
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    deleted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning('ocr: could not evict cache entry %s: %s', path, exc)
+            continue
+        total -= size
+        deleted += 1
+    if deleted:
+        logger.info('ocr: evicted %d cache entries to stay within %d bytes', deleted, max_bytes)
+    return deleted
@@ -0,0 +1,228 @@
+"""
+Optional partitioned layout of the InvertedIndex table.
+
+By default `indexer_invertedindex` is one table for every user.  Converted
+with `partition()` (or `manage.py partition_index --partitions N`, or
+INDEXER_PARTITIONS at migrate time) it becomes:
+
+    indexer_invertedindex               PARTITION BY LIST (user_id)
+    ├── indexer_invertedindex_u<id>     FOR VALUES IN (<id>)   — dedicated
+    └── indexer_invertedindex_shared    DEFAULT, PARTITION BY HASH (user_id)
+        ├── indexer_invertedindex_h0    MODULUS N, REMAINDER 0
+        └── …
+
+Every user starts out in one of the N hash partitions.  `dedicate(user_id)`
+moves a large tenant into a partition of their own.  Its vacuum and index
+maintenance then stay off the other users' tables.  A full rebuild of that
+user (`reindex --all --user`) truncates the partition (`truncate_user`)
+instead of deleting row by row.  Searches always filter on user_id, so
+PostgreSQL prunes them to the one partition that can match.
+
+Partitioned tables need the partition key in every unique constraint:
+the primary key becomes (id, user_id), and the model's (document, term,
+user) unique constraint already includes it.  PostgreSQL before 17 has no
+identity columns on partitioned tables, so `id` takes its values from a
+plain sequence.  The ORM sees the same columns and index names in either
+layout.  `unpartition()` converts back.
+"""
+
+import logging
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'indexer_invertedindex'
+SHARED = f'{TABLE}_shared'
+
+
+def is_partitioned() -> bool:
+    with connection.cursor() as cursor:
+        return _is_partitioned(cursor)
+
+
+def partition(hash_partitions: int) -> None:
+    """Convert the monolithic table into the partitioned layout."""
+    if hash_partitions < 1:
+        raise ValueError('hash_partitions must be at least 1.')
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if _is_partitioned(cursor):
+            raise ValueError(f'{TABLE} is already partitioned.')
+
+        def create(cursor, old):
+            cursor.execute(
+                f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS INCLUDING STORAGE) '
+                f'PARTITION BY LIST (user_id)'
+            )
+            cursor.execute(f'CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+            cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+            cursor.execute(f'CREATE TABLE {SHARED} PARTITION OF {TABLE} DEFAULT PARTITION BY HASH (user_id)')
+            for remainder in range(hash_partitions):
+                cursor.execute(
+                    f'CREATE TABLE {TABLE}_h{remainder} PARTITION OF {SHARED} '
+                    f'FOR VALUES WITH (MODULUS {hash_partitions}, REMAINDER {remainder})'
+                )
+
+        _rebuild(cursor, create, primary_key=['id', 'user_id'])
+    logger.info('partitions: %s split into %d hash partitions', TABLE, hash_partitions)
+
+
+def unpartition() -> None:
+    """Convert the partitioned layout back into one table."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            raise ValueError(f'{TABLE} is not partitioned.')
+
+        def create(cursor, old):
+            cursor.execute(f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING STORAGE)')
+            cursor.execute(f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+
+        _rebuild(cursor, create, primary_key=['id'])
+    logger.info('partitions: %s is a single table again', TABLE)
+
+
+def dedicate(user_id: int) -> str:
+    """
+    Move `user_id`'s rows out of the shared hash partitions into a partition
+    of their own, and return its name.  A no-op if it already exists.
+    """
+    user_id = int(user_id)
+    name = f'{TABLE}_u{user_id}'
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            raise ValueError(f'{TABLE} is not partitioned.')
+        if _exists(cursor, name):
+            return name
+
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING STORAGE)')
+        cursor.execute(f'INSERT INTO {name} SELECT * FROM {SHARED} WHERE user_id = %s', [user_id])
+        cursor.execute(f'DELETE FROM {SHARED} WHERE user_id = %s', [user_id])
+        # Indexes and foreign keys are cloned from the parent on attach.
+        cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES IN ({user_id})')
+    logger.info('partitions: user %s moved to %s', user_id, name)
+    return name
+
+
+def truncate_user(user_id: int) -> bool:
+    """
+    Empty `user_id`'s dedicated partition.  Returns False (and does nothing)
+    when the user has none.
+    """
+    name = f'{TABLE}_u{int(user_id)}'
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not _exists(cursor, name):
+            return False
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'TRUNCATE {name}')
+    return True
+
+
+def lock_user(user_id: int) -> bool:
+    """
+    Block writes to `user_id`'s dedicated partition until the current
+    transaction ends; searches still read it.  Returns False (and locks
+    nothing) when the user has none.
+    """
+    name = f'{TABLE}_u{int(user_id)}'
+    with connection.cursor() as cursor:
+        if not _exists(cursor, name):
+            return False
+        # Self-conflicting, so two rebuilds of one user queue up rather than
+        # deadlock when either escalates to TRUNCATE.
+        cursor.execute(f'LOCK TABLE {name} IN SHARE ROW EXCLUSIVE MODE')
+    return True
+
+
+def describe() -> list[dict]:
+    """
+    The leaf tables holding postings: `name`, `bound` (partition bound,
+    empty for the monolithic table), `rows` (planner estimate) and `bytes`.
+    """
+    with connection.cursor() as cursor:
+        # pg_partition_tree() is empty for a table that is not partitioned.
+        leaves = (
+            'SELECT relid FROM pg_partition_tree(%s) WHERE isleaf'
+            if _is_partitioned(cursor) else 'SELECT %s::regclass'
+        )
+        cursor.execute(
+            'SELECT c.relname, coalesce(pg_get_expr(c.relpartbound, c.oid), %s), '
+            '       greatest(c.reltuples, 0)::bigint, pg_total_relation_size(c.oid) '
+            f'FROM pg_class c WHERE c.oid IN ({leaves}) ORDER BY c.relname',
+            ['', TABLE],
+        )
+        return [
+            {'name': name, 'bound': bound, 'rows': rows, 'bytes': size}
+            for name, bound, rows, size in cursor.fetchall()
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+def _is_partitioned(cursor) -> bool:
+    cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [TABLE])
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def _exists(cursor, name: str) -> bool:
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+    return cursor.fetchone()[0]
+
+
+def _rebuild(cursor, create, primary_key: list[str]):
+    """
+    Swap TABLE for a new table made by `create(cursor, old_name)`, copying
+    the rows, the id sequence position, and every constraint and index
+    under its current name.
+    """
+    old = f'{TABLE}_old'
+    # Deferred foreign-key checks must fire before the ALTER TABLEs.
+    cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    constraints, indexes = _definitions(cursor)
+
+    cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [old, 'id'])
+    (sequence,) = cursor.fetchone()
+    if sequence:
+        cursor.execute(f'ALTER SEQUENCE {sequence} RENAME TO {old}_id_seq')
+    create(cursor, old)
+
+    cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {old}')
+    cursor.execute(f'DROP TABLE {old}')
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM {TABLE}",
+        [TABLE],
+    )
+
+    # Build indexes after the bulk copy; unique constraints keep their
+    # columns, the primary key gains or loses the partition key.
+    for name, kind, definition in constraints:
+        if kind == 'p':
+            definition = f'PRIMARY KEY ({", ".join(primary_key)})'
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+    for definition in indexes:
+        cursor.execute(definition)
+
+
+def _definitions(cursor) -> tuple[list[tuple[str, str, str]], list[str]]:
+    """TABLE's constraints as (name, type, definition) and its other indexes' DDL."""
+    cursor.execute(
+        'SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint '
+        'WHERE conrelid = %s::regclass AND contype IN (%s, %s, %s, %s) '
+        # Primary key and unique constraints before the foreign keys.
+        'ORDER BY contype = %s, conname',
+        [TABLE, 'p', 'u', 'c', 'f', 'f'],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i '
+        'WHERE i.indrelid = %s::regclass '
+        'AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid) '
+        'ORDER BY i.indexrelid',
+        [TABLE],
+    )
+    return constraints, [row[0] for row in cursor.fetchall()]
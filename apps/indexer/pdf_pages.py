@@ -0,0 +1,215 @@
+"""
+Parallel, time-bounded PDF page extraction.
+
+PyPDF2's `page.extract_text()` is CPU-bound and, on a malformed page, can run
+for ever.  `iter_pages()` hands pages out one at a time to a small set of
+worker processes, each with its own PdfReader on the file, and yields the
+page texts in page order as they complete:
+
+  - a page still running after `page_timeout` seconds has its worker killed
+    and replaced; the page is recorded as failed
+  - a page whose extraction raises (or whose worker dies) is recorded as
+    failed
+  - once `document_timeout` seconds have passed, every worker is killed and
+    all pages not yet extracted are recorded as failed
+
+Failed pages yield '' so the text of the healthy pages is still indexed.
+Failures are appended to the caller's `failures` list as
+`(page_number, reason)` with 1-based page numbers.
+
+Even counting the pages parses the whole page tree, so the first worker
+does it, within the same limits: if the count times out, fails or the
+worker dies, the whole document is recorded as `(None, reason)`.
+
+Workers run under the extraction sandbox limits (see `sandbox.py`): an
+address-space cap, and a CPU-time allowance re-armed for opening the file,
+for the page count and for every page.  Timeouts, out-of-memory exits and
+crashes are counted under 'pdf' in `sandbox.stats()`.
+"""
+
+import logging
+import os
+import time
+from collections.abc import Iterator
+from multiprocessing.connection import wait
+
+from apps.indexer import sandbox
+
+logger = logging.getLogger(__name__)
+
+# Request for the number of pages, sent to a worker instead of a page index.
+_COUNT_PAGES = 'count'
+
+
+def iter_pages(
+    file_path: str,
+    failures: list,
+    workers: int,
+    page_timeout: float,
+    document_timeout: float,
+    memory_bytes: int = 0,
+    cpu_seconds: int = 0,
+) -> Iterator[str]:
+    """Yield the text of every page of the PDF at `file_path`, in order."""
+    context = sandbox.get_context()
+    sandbox.record('pdf', 'jobs')
+
+    deadline = time.monotonic() + document_timeout
+    slots: dict = {}            # connection → [process, page, started_at]
+    results: dict[int, str] = {}
+    page_count = 0
+    next_page = 0
+    emitted = 0
+
+    def fail_document(outcome: str | None, reason: str):
+        if outcome:
+            sandbox.record('pdf', outcome)
+        failures.append((None, reason[:255]))
+        logger.warning('pdf_pages: %s failed: %s', file_path, reason)
+
+    def fail(page: int, reason: str):
+        results[page] = ''
+        failures.append((page + 1, reason[:255]))
+        logger.warning('pdf_pages: %s page %d failed: %s', file_path, page + 1, reason)
+
+    def assign(conn):
+        nonlocal next_page
+        slot = slots[conn]
+        if next_page < page_count:
+            conn.send(next_page)
+            slot[1], slot[2] = next_page, time.monotonic()
+            next_page += 1
+        else:
+            conn.send(None)
+            retire(conn, kill=False)
+
+    def start():
+        conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=_page_worker, args=(file_path, child_conn, memory_bytes, cpu_seconds), daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        slots[conn] = [process, None, None]
+        return conn
+
+    def spawn():
+        assign(start())
+
+    def retire(conn, kill: bool):
+        process = slots.pop(conn)[0]
+        conn.close()
+        if kill:
+            process.kill()
+        process.join(timeout=1)
+
+    try:
+        # The page count parses the whole page tree, so it is asked of the
+        # first worker, within the page and document time limits.
+        conn = start()
+        conn.send(_COUNT_PAGES)
+        timeout = max(0.0, min(page_timeout, deadline - time.monotonic()))
+        if not conn.poll(timeout):
+            fail_document('timeouts', f'page count timed out after {timeout:g}s')
+            return
+        try:
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            fail_document(*sandbox.classify_exit(slots[conn][0], cpu_seconds))
+            return
+        if status != 'ok':
+            fail_document(None, payload)
+            return
+        page_count = payload
+
+        assign(conn)
+        for _ in range(min(max(1, workers), page_count) - 1):
+            spawn()
+
+        while emitted < page_count:
+            while emitted in results:
+                yield results.pop(emitted)
+                emitted += 1
+            if emitted >= page_count:
+                break
+
+            now = time.monotonic()
+            if now >= deadline:
+                sandbox.record('pdf', 'timeouts')
+                for conn in list(slots):
+                    retire(conn, kill=True)
+                for page in range(emitted, page_count):
+                    if page not in results:
+                        fail(page, f'document timed out after {document_timeout:g}s')
+                continue
+
+            wake = min([deadline] + [s[2] + page_timeout for s in slots.values() if s[1] is not None])
+            for conn in wait(list(slots), timeout=max(0.0, wake - now)):
+                page = slots[conn][1]
+                try:
+                    status, payload = conn.recv()
+                except (EOFError, OSError):
+                    outcome, reason = sandbox.classify_exit(slots[conn][0], cpu_seconds)
+                    sandbox.record('pdf', outcome)
+                    retire(conn, kill=True)
+                    fail(page, reason)
+                    if next_page < page_count:
+                        spawn()
+                    continue
+                if status == 'ok':
+                    results[page] = payload
+                else:
+                    fail(page, payload)
+                assign(conn)
+
+            now = time.monotonic()
+            for conn, (_, page, started_at) in list(slots.items()):
+                if page is not None and now - started_at > page_timeout:
+                    sandbox.record('pdf', 'timeouts')
+                    retire(conn, kill=True)
+                    fail(page, f'timed out after {page_timeout:g}s')
+                    if next_page < page_count:
+                        spawn()
+    finally:
+        for conn in list(slots):
+            retire(conn, kill=True)
+
+
+def _page_worker(file_path: str, conn, memory_bytes: int, cpu_seconds: int):
+    """
+    Answer the parent's requests — the page count, or the text of a page
+    (by index) — until it sends None.
+    """
+    import PyPDF2
+
+    sandbox.limit_memory(memory_bytes)
+    sandbox.arm_cpu_limit(cpu_seconds)
+    try:
+        fh = open(file_path, 'rb')
+        reader = PyPDF2.PdfReader(fh)
+    except MemoryError:
+        os._exit(sandbox.EXIT_OUT_OF_MEMORY)
+    except Exception as exc:
+        reader = None
+        open_error = f'{type(exc).__name__}: {exc}'
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        if reader is None:
+            conn.send(('error', open_error))
+            continue
+        sandbox.arm_cpu_limit(cpu_seconds)
+        try:
+            if request == _COUNT_PAGES:
+                conn.send(('ok', len(reader.pages)))
+            else:
+                conn.send(('ok', reader.pages[request].extract_text() or ''))
+        except MemoryError:
+            os._exit(sandbox.EXIT_OUT_OF_MEMORY)
+        except Exception as exc:
+            conn.send(('error', f'{type(exc).__name__}: {exc}'))
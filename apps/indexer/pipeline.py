@@ -2,23 +2,31 @@
 Indexing pipeline.
 
 `index_document(uploaded_file_id)` is the single entry-point used both by the
-upload trigger (background thread) and the `reindex` management command.
-
-TF-IDF strategy — eventual consistency
----------------------------------------
-When a new document is indexed, only its own rows are written with TF-IDF
-scores computed against the user's corpus *at that moment*.  Existing rows for
-other documents in the corpus are NOT updated (eventual consistency).
-
-To recompute accurate TF-IDF scores across the entire corpus run:
+job queue — an upload enqueues an IndexingJob (`jobs.enqueue`) that a
+`manage.py index_worker` process claims and runs — and by the `reindex`
+management command.
+
+TF-IDF strategy
+---------------
+Every row stores its term frequency (occurrences / document length), which
+never changes once the document is indexed.  Corpus-dependent IDF is kept out
+of the ranking path by default: with INDEXER_SCORING_MODE='query_time',
+`IndexerService.search` computes IDF per search from the live
+CorpusStatistic / TermStatistic tables, so rankings stay correct as documents
+are added and removed without rebuilding anything.
+
+The `tf_idf` and `document_frequency` columns are still written, as a
+snapshot of the corpus *at index time*.  They are only used for ranking in
+INDEXER_SCORING_MODE='index_time', where scores drift as the corpus grows
+until the snapshot is refreshed with:
     python manage.py reindex --all --user <username>
 """
 
 import logging
-import math
 
-from django.db import transaction
-from django.db.models import Count
+from django.db import connection, transaction
+
+from apps.indexer import bulk_load, corpus, lexicon
 
 logger = logging.getLogger(__name__)
 
@@ -28,12 +36,18 @@ def index_document(uploaded_file_id: int) -> bool:
     Full indexing pipeline for a single UploadedFile.
 
     1. Load the UploadedFile; bail out if status is not 'pending' or 'failed'.
-    2. Extract text.
-    3. Tokenize with positions.
+       If the owner already has an identical, fully indexed file, take its
+       terms, positions and phrases and skip to step 4.
+    2. Extract text as a stream of chunks (e.g. one per PDF page), or replay
+       it from the extracted-text cache when the file's bytes were seen
+       before.
+    3. Tokenize each chunk as it arrives, with positions carried over, and
+       collect its sentences.
     4. Compute TF per term.
-    5. Fetch corpus document_frequency for each term from the user's corpus.
-    6. Compute TF-IDF.
-    7. Bulk-upsert InvertedIndex rows.
+    5. Look up document_frequency for each term in the user's corpus statistics.
+    6. Compute TF-IDF; resolve terms and original words to Term ids.
+    7. Bulk-upsert InvertedIndex rows (COPY, see bulk_load.py) and update the
+       corpus statistics.
     8. Set status → 'processed'.
 
     Returns True on success, False on failure.
@@ -41,8 +55,9 @@ def index_document(uploaded_file_id: int) -> bool:
     # Import here to avoid circular imports at module load time
     from apps.upload.models import UploadedFile
     from apps.indexer.models import InvertedIndex, DocumentPhrase
-    from apps.indexer.extractor import extract_text
-    from apps.indexer.tokenizer import tokenize_with_positions
+    from apps.indexer.text_cache import iter_text
+    from apps.indexer.tokenizer import StreamAnalyzer
+    from apps.indexer.services import AutocompleteService
 
     try:
         uploaded_file = UploadedFile.objects.get(pk=uploaded_file_id)
@@ -65,34 +80,47 @@ def index_document(uploaded_file_id: int) -> bool:
     )
 
     try:
-        # ------------------------------------------------------------------ #
-        # Step 1: Extract text
-        # ------------------------------------------------------------------ #
-        raw_text = extract_text(uploaded_file)
-
-        if not raw_text.strip():
-            logger.warning(
-                'index_document: no text extracted from file id=%s (type=%s) — '
-                'marking as processed with 0 terms.',
-                uploaded_file_id, uploaded_file.file_type,
+        failures: list[tuple[int | None, str]] = []
+        source = _duplicate_source(uploaded_file)
+        uploaded_file.duplicate_of = source
+        if source is not None:
+            # -------------------------------------------------------------- #
+            # Step 1b: Re-upload of a file the user already has — copy
+            # -------------------------------------------------------------- #
+            term_data, phrase_rows = _copy_index(source, uploaded_file)
+            total_terms = sum(len(d['positions']) for d in term_data.values())
+            logger.info(
+                'index_document: file id=%s is identical to file id=%s — copying its index.',
+                uploaded_file_id, source.pk,
             )
-            _mark_status(uploaded_file, 'processed')
-            return True
-
-        # ------------------------------------------------------------------ #
-        # Step 2: Tokenize with positions
-        # ------------------------------------------------------------------ #
-        term_data: dict[str, dict] = tokenize_with_positions(raw_text)
+        else:
+            # -------------------------------------------------------------- #
+            # Steps 1-2: Extract text and tokenize with positions, streaming
+            # -------------------------------------------------------------- #
+            # Only the current chunk of text is held; sentences are turned
+            # into DocumentPhrase rows as they go by.
+            # Pages that fail or time out are skipped and recorded.
+            phrases = _PhraseCollector(uploaded_file)
+            analyzer = StreamAnalyzer(on_sentences=phrases.add)
+            for chunk in iter_text(uploaded_file, failures):
+                analyzer.feed(chunk)
+            analysis = analyzer.close()
+            term_data: dict[str, dict] = analysis.terms
+            total_terms = analysis.token_count
+            phrase_rows = phrases.rows
 
         if not term_data:
             logger.warning(
-                'index_document: no tokens produced for file id=%s', uploaded_file_id
+                'index_document: no text or tokens extracted from file id=%s (type=%s) — '
+                'marking as processed with 0 terms.',
+                uploaded_file_id, uploaded_file.file_type,
             )
-            _mark_status(uploaded_file, 'processed')
+            with transaction.atomic():
+                clear_document_index(uploaded_file)
+                _record_extraction_failures(uploaded_file, failures)
+                _mark_status(uploaded_file, 'processed')
             return True
 
-        total_terms = sum(len(d['positions']) for d in term_data.values())
-
         # ------------------------------------------------------------------ #
         # Step 3: Compute term frequencies
         # ------------------------------------------------------------------ #
@@ -105,76 +133,69 @@ def index_document(uploaded_file_id: int) -> bool:
         # ------------------------------------------------------------------ #
         # Step 4: Fetch corpus document frequencies (user-scoped)
         # ------------------------------------------------------------------ #
-        # For each term in this document, count how many of the user's
-        # *other* documents (already indexed) contain that term.
-        # We add 1 (the current document itself) to get the true DF.
+        # DF and the document count come from the incrementally maintained
+        # CorpusStatistic / TermStatistic tables — a key lookup per term
+        # rather than an aggregate over the user's whole InvertedIndex.
+        # Rows left behind by a previous run of this document are cleared
+        # first so it is never counted twice — in the same transaction as
+        # the new rows (steps 4-6), so a failure leaves the old index intact.
         user = uploaded_file.uploaded_by
         terms = list(term_data.keys())
 
-        existing_df_qs = (
-            InvertedIndex.objects
-            .filter(document__uploaded_by=user, term__in=terms)
-            .exclude(document_id=uploaded_file_id)
-            .values('term')
-            .annotate(df=Count('document', distinct=True))
-        )
-        existing_df: dict[str, int] = {row['term']: row['df'] for row in existing_df_qs}
-
-        # Total number of unique documents the user has indexed so far
-        # (excluding the current one being indexed now)
-        total_docs = (
-            InvertedIndex.objects
-            .filter(document__uploaded_by=user)
-            .exclude(document_id=uploaded_file_id)
-            .values('document')
-            .distinct()
-            .count()
-        ) + 1  # +1 for the current document
+        # Terms and original words are stored as Term dictionary ids.  New
+        # terms are added outside the write transaction (see lexicon.py), so
+        # concurrent workers never wait on each other's document.
+        term_ids = lexicon.resolve([*terms, *(d['original'] for d in term_data.values() if d['original'])])
 
-        # ------------------------------------------------------------------ #
-        # Step 5: Compute TF-IDF and build rows
-        # ------------------------------------------------------------------ #
-        index_rows = []
-        for term, data in term_data.items():
-            tf = term_tf[term]
-            df = existing_df.get(term, 0) + 1   # +1 for the current doc
-            idf = math.log((total_docs + 1) / (df + 1)) + 1   # smoothed IDF
-            tf_idf = tf * idf
-
-            index_rows.append(
-                InvertedIndex(
-                    document=uploaded_file,
-                    term=term,
-                    original_term=data['original'],
-                    term_frequency=tf,
-                    document_frequency=df,
-                    tf_idf=tf_idf,
-                    positions=data['positions'],
+        with transaction.atomic():
+            clear_document_index(uploaded_file)
+
+            total_docs, existing_df = corpus.lookup(user, terms)
+            total_docs += 1  # +1 for the current document
+
+            # -------------------------------------------------------------- #
+            # Step 5: Compute TF-IDF and build rows
+            # -------------------------------------------------------------- #
+            index_rows = []
+            for term, data in term_data.items():
+                tf = term_tf[term]
+                df = existing_df.get(term, 0) + 1   # +1 for the current doc
+                idf = corpus.smoothed_idf(df, total_docs)
+                tf_idf = tf * idf
+
+                index_rows.append(
+                    InvertedIndex(
+                        document=uploaded_file,
+                        user_id=uploaded_file.uploaded_by_id,
+                        deleted=uploaded_file.deleted_at is not None,
+                        term_id=term_ids[term],
+                        original_term_id=term_ids.get(data['original']),
+                        term_frequency=tf,
+                        document_frequency=df,
+                        tf_idf=tf_idf,
+                        positions=data['positions'],
+                    )
                 )
-            )
 
-        # ------------------------------------------------------------------ #
-        # Step 6: Bulk upsert within a transaction
-        # ------------------------------------------------------------------ #
-        # Also extract and store real sentences for autocomplete
-        phrase_rows = _extract_sentences(uploaded_file, raw_text)
-
-        with transaction.atomic():
-            InvertedIndex.objects.bulk_create(
-                index_rows,
-                update_conflicts=True,
-                unique_fields=['document', 'term'],
-                update_fields=['term_frequency', 'document_frequency', 'tf_idf', 'positions', 'original_term'],
-            )
+            # -------------------------------------------------------------- #
+            # Step 6: Bulk upsert, with the real sentences for autocomplete
+            # -------------------------------------------------------------- #
+            # COPY through a staging table, merged in one statement
+            bulk_load.load_postings(index_rows)
             # Replace old phrases with freshly extracted ones
             DocumentPhrase.objects.filter(document=uploaded_file).delete()
             if phrase_rows:
-                DocumentPhrase.objects.bulk_create(phrase_rows)
+                bulk_load.load_phrases(phrase_rows)
+                AutocompleteService.record_content_added(
+                    uploaded_file, [row.phrase for row in phrase_rows],
+                )
+            corpus.add_document(user, terms, total_terms, words=_word_counts(term_data))
+            _record_extraction_failures(uploaded_file, failures)
             _mark_status(uploaded_file, 'processed')
 
         logger.info(
-            'index_document: completed — id=%s terms=%d',
-            uploaded_file_id, len(index_rows),
+            'index_document: completed — id=%s terms=%d failed_pages=%d',
+            uploaded_file_id, len(index_rows), len(failures),
         )
         return True
 
@@ -200,25 +221,30 @@ def reindex_user_corpus(user) -> dict[str, int]:
 
     Returns a summary dict: {'reindexed': N, 'failed': M}.
     """
+    from apps.indexer import partitions
     from apps.upload.models import UploadedFile
 
+    # A user with a dedicated InvertedIndex partition is rebuilt from empty:
+    # truncating it leaves no dead rows behind, unlike per-document deletes.
+    with transaction.atomic():
+        if partitions.truncate_user(user.pk):
+            corpus.reset(user)
+
+    # Oldest first, so a re-uploaded copy is rebuilt from its freshly
+    # re-indexed original.
     files = UploadedFile.objects.filter(
         uploaded_by=user,
         status='processed',
         deleted_at=None,
-    )
+    ).order_by('pk')
 
     stats = {'reindexed': 0, 'failed': 0}
     for f in files:
-        # Reset to pending so index_document doesn't skip it
+        # Reset to pending so index_document doesn't skip it; it replaces
+        # the existing index entries in the same transaction as the new ones.
         f.status = 'pending'
         f.save(update_fields=['status'])
 
-        # Clear existing index entries for a clean rebuild
-        from apps.indexer.models import InvertedIndex, DocumentPhrase
-        InvertedIndex.objects.filter(document=f).delete()
-        DocumentPhrase.objects.filter(document=f).delete()
-
         ok = index_document(f.pk)
         if ok:
             stats['reindexed'] += 1
@@ -228,79 +254,425 @@ def reindex_user_corpus(user) -> dict[str, int]:
     return stats
 
 
+def rebuild_user_corpus(user, workers: int | None = None) -> dict[str, int]:
+    """
+    Rebuild ALL of `user`'s indexed documents in two phases, with exact
+    corpus statistics (`reindex --all --rebuild`).
+
+    1. Extract and tokenize every processed document in `workers` threads
+       (default INDEXER_REBUILD_WORKERS), keeping each document's terms as
+       packed positions in memory.  Files with the same content hash and
+       type are analyzed once.  Counting the documents each term occurs in
+       gives the exact corpus DF.
+    2. In one transaction, replace the user's postings, phrases and corpus
+       statistics.  Every posting is streamed with its final TF-IDF through
+       one COPY (see bulk_load.py).
+
+    `reindex_user_corpus` instead discounts, deletes, re-reads DF and
+    re-adds one document at a time; after a partition truncation it scores
+    the first documents against the few rebuilt before them.  Here DF is
+    never read back mid-rebuild: the statistics and every stored tf_idf
+    come from the complete corpus, and phase 2 is a handful of bulk
+    statements however many documents there are.  Only the analyzed
+    documents' rows are replaced: a file that fails phase 1 keeps its
+    existing rows (and is counted in `failed`), as does a document indexed
+    while phase 1 runs, and both count towards the new statistics.
+
+    Returns a summary dict: {'reindexed': N, 'failed': M}.
+    """
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.conf import settings
+
+    from apps.indexer import partitions
+    from apps.indexer.models import DocumentPhrase, ExtractionFailure, InvertedIndex
+    from apps.indexer.services import AutocompleteService
+    from apps.upload.models import UploadedFile
+
+    if workers is None:
+        workers = getattr(settings, 'INDEXER_REBUILD_WORKERS', 4)
+    files = list(
+        UploadedFile.objects
+        .filter(uploaded_by=user, status='processed', deleted_at=None)
+        .select_related('uploaded_by')
+        .order_by('pk')
+    )
+
+    # ------------------------------------------------------------------ #
+    # Phase 1: analyze every document, in parallel
+    # ------------------------------------------------------------------ #
+    sources = {}
+    for f in files:
+        sources.setdefault(_content_key(f), f)
+    unique = list(sources.values())
+    if workers > 1 and len(unique) > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rebuild') as pool:
+            analyzed = dict(zip((f.pk for f in unique), pool.map(_analyze_in_worker, unique)))
+    else:
+        analyzed = {f.pk: _analyze_for_rebuild(f) for f in unique}
+
+    documents = []
+    failed = []
+    for f in files:
+        document = analyzed[sources[_content_key(f)].pk]
+        if document is None:
+            failed.append(f)
+        else:
+            documents.append((f, document))
+
+    # Exact corpus statistics over the analyzed documents
+    document_frequency: Counter[str] = Counter()
+    words: dict[str, list[int]] = {}
+    total_documents = total_tokens = 0
+    for _, document in documents:
+        if not document.terms:
+            continue
+        total_documents += 1
+        total_tokens += document.token_count
+        document_frequency.update(document.terms.keys())
+        for word, count in document.word_counts().items():
+            stats = words.setdefault(word, [0, 0])
+            stats[0] += 1
+            stats[1] += count
+
+    term_ids = lexicon.resolve([*document_frequency, *words])
+    idf: dict[str, float] = {}
+
+    def postings():
+        for f, document in documents:
+            for term, (original, positions, count) in document.terms.items():
+                tf = count / document.token_count
+                yield InvertedIndex(
+                    document=f,
+                    user_id=f.uploaded_by_id,
+                    deleted=False,
+                    term_id=term_ids[term],
+                    original_term_id=term_ids.get(original),
+                    term_frequency=tf,
+                    document_frequency=document_frequency[term],
+                    tf_idf=tf * idf[term],
+                    positions=positions,
+                )
+
+    phrase_rows = [
+        DocumentPhrase(document=f, user_id=f.uploaded_by_id, deleted=False, phrase=phrase, position=position)
+        for f, document in documents
+        for phrase, position in document.phrases
+    ]
+
+    # ------------------------------------------------------------------ #
+    # Phase 2: replace the analyzed documents' rows in one bulk pass
+    # ------------------------------------------------------------------ #
+    rebuilt = [f.pk for f, _ in documents]
+    with transaction.atomic():
+        old_phrases = list(
+            DocumentPhrase.objects
+            .filter(document__in=rebuilt, deleted=False)
+            .values_list('phrase', flat=True)
+        )
+        # Rows of failed files, and of documents indexed while phase 1 ran,
+        # are kept.  A dedicated partition holding nothing else is truncated;
+        # the lock keeps new rows out of it until the rebuild commits.
+        kept = InvertedIndex.objects.filter(user=user).exclude(document__in=rebuilt)
+        if partitions.lock_user(user.pk) and not kept.exists():
+            partitions.truncate_user(user.pk)
+        else:
+            InvertedIndex.objects.filter(document__in=rebuilt).delete()
+        DocumentPhrase.objects.filter(document__in=rebuilt).delete()
+
+        # The kept rows count towards the corpus like the rebuilt ones.
+        kept_documents, kept_tokens, kept_df, kept_words = corpus.tally(kept)
+        total_documents += kept_documents
+        total_tokens += kept_tokens
+        document_frequency.update(kept_df)
+        for word, (df, occurrences) in kept_words.items():
+            stats = words.setdefault(word, [0, 0])
+            stats[0] += df
+            stats[1] += occurrences
+        idf.update(
+            (term, corpus.smoothed_idf(document_frequency[term], total_documents))
+            for _, document in documents
+            for term in document.terms
+        )
+
+        corpus.replace(
+            user, total_documents, total_tokens, document_frequency,
+            {word: tuple(stats) for word, stats in words.items()},
+        )
+        written = bulk_load.load_postings(postings())
+        bulk_load.load_phrases(phrase_rows)
+
+        ExtractionFailure.objects.filter(document__in=rebuilt).delete()
+        ExtractionFailure.objects.bulk_create(
+            ExtractionFailure(document=f, page=page, reason=reason)
+            for f, document in documents
+            for page, reason in document.failures
+        )
+        AutocompleteService.record_content_rebuilt(user, old_phrases, [row.phrase for row in phrase_rows])
+
+    logger.info(
+        'rebuild_user_corpus: user=%s documents=%d postings=%d failed=%d',
+        user.username, total_documents, written, len(failed),
+    )
+    return {'reindexed': len(documents), 'failed': len(failed)}
+
+
+def clear_document_index(uploaded_file) -> int:
+    """
+    Delete every InvertedIndex and DocumentPhrase row for `uploaded_file`,
+    discount it from the owner's corpus statistics and retract its phrases
+    from cached autocomplete tries, atomically.
+
+    Returns the number of InvertedIndex rows deleted.
+    """
+    from apps.indexer.models import InvertedIndex, DocumentPhrase
+    from apps.indexer.services import AutocompleteService
+
+    with transaction.atomic():
+        corpus.remove_document(uploaded_file.uploaded_by, uploaded_file.pk)
+        deleted, _ = InvertedIndex.objects.filter(document=uploaded_file).delete()
+
+        phrases = DocumentPhrase.objects.filter(document=uploaded_file)
+        phrase_texts = list(phrases.values_list('phrase', flat=True))
+        if phrase_texts:
+            AutocompleteService.record_content_removed(uploaded_file, phrase_texts)
+            phrases.delete()
+    return deleted
+
+
+def sync_deleted_flag(uploaded_file) -> None:
+    """
+    Copy the soft-delete state of `uploaded_file` (`deleted_at`) onto its
+    InvertedIndex and DocumentPhrase rows, which search and autocomplete
+    filter on instead of joining UploadedFile.
+    """
+    from apps.indexer.models import InvertedIndex, DocumentPhrase
+
+    deleted = uploaded_file.deleted_at is not None
+    with transaction.atomic():
+        for model in (InvertedIndex, DocumentPhrase):
+            model.objects.filter(document=uploaded_file).exclude(deleted=deleted).update(deleted=deleted)
+
+
 # ---------------------------------------------------------------------------
 # Private helpers
 # ---------------------------------------------------------------------------
 
 def _mark_status(uploaded_file, status: str):
     uploaded_file.status = status
-    uploaded_file.save(update_fields=['status', 'updated_at'])
+    uploaded_file.save(update_fields=['status', 'duplicate_of', 'updated_at'])
 
 
-def _extract_sentences(uploaded_file, raw_text: str) -> list:
+def _duplicate_source(uploaded_file):
     """
-    Split raw document text into cleaned sentences and return a list of
-    DocumentPhrase model instances ready for bulk_create.
+    Another file of the same owner with identical bytes that is fully
+    indexed (processed, not deleted, nothing failed to extract), or None.
+    """
+    from apps.upload.models import UploadedFile
 
-    Uses NLTK sent_tokenize for proper sentence boundary detection.
-    Each sentence is cleaned: collapsed whitespace, stripped, and capped at
-    MAX_PHRASE_LENGTH.  Very short fragments (< 8 chars or < 3 words) are
-    dropped.  At most MAX_SENTENCES are kept per document to keep the table
-    manageable.
+    if not uploaded_file.content_hash:
+        return None
+    return (
+        UploadedFile.objects
+        .filter(
+            uploaded_by_id=uploaded_file.uploaded_by_id,
+            content_hash=uploaded_file.content_hash,
+            file_type=uploaded_file.file_type,
+            status='processed',
+            deleted_at=None,
+            extraction_failures__isnull=True,
+        )
+        .exclude(pk=uploaded_file.pk)
+        .order_by('pk')
+        .first()
+    )
+
+
+def _copy_index(source, uploaded_file) -> tuple[dict[str, dict], list]:
     """
-    import re
-    from apps.indexer.models import DocumentPhrase
+    `source`'s terms (in `tokenizer.analyze()` form) and its phrases as
+    unsaved DocumentPhrase rows for `uploaded_file`.
+    """
+    from apps.indexer.models import DocumentPhrase, InvertedIndex
+
+    term_data = {
+        term: {'positions': positions, 'original': original or ''}
+        for term, original, positions in (
+            InvertedIndex.objects
+            .filter(document=source)
+            .values_list('term__text', 'original_term__text', 'positions')
+            .iterator(chunk_size=2000)
+        )
+    }
+    phrase_rows = [
+        DocumentPhrase(
+            document=uploaded_file,
+            user_id=uploaded_file.uploaded_by_id,
+            deleted=uploaded_file.deleted_at is not None,
+            phrase=phrase,
+            position=position,
+        )
+        for phrase, position in (
+            DocumentPhrase.objects
+            .filter(document=source)
+            .order_by('position')
+            .values_list('phrase', 'position')
+        )
+    ]
+    return term_data, phrase_rows
+
+
+def _record_extraction_failures(uploaded_file, failures: list[tuple[int | None, str]]):
+    """Replace the document's ExtractionFailure rows with `failures`."""
+    from apps.indexer.models import ExtractionFailure
+
+    ExtractionFailure.objects.filter(document=uploaded_file).delete()
+    if failures:
+        ExtractionFailure.objects.bulk_create(
+            ExtractionFailure(document=uploaded_file, page=page, reason=reason)
+            for page, reason in failures
+        )
 
-    MAX_SENTENCES = 500
-    MIN_CHARS     = 8
-    MIN_WORDS     = 3
-    MAX_CHARS     = DocumentPhrase.MAX_PHRASE_LENGTH
 
-    if not raw_text or not raw_text.strip():
-        return []
+def _content_key(uploaded_file):
+    """Files with equal keys have identical bytes and are analyzed once."""
+    if uploaded_file.content_hash:
+        return uploaded_file.content_hash, uploaded_file.file_type
+    return uploaded_file.pk
 
-    # Strip NUL bytes — PostgreSQL text fields cannot contain \x00
-    raw_text = raw_text.replace('\x00', '')
+
+class _RebuiltDocument:
+    """
+    One document's analysis held in memory by `rebuild_user_corpus`:
+    `terms` maps each term to (original word, packed positions, count).
+    """
+
+    __slots__ = ('terms', 'token_count', 'phrases', 'failures')
+
+    def __init__(
+        self,
+        terms: dict[str, tuple[str, bytes, int]],
+        token_count: int,
+        phrases: list[tuple[str, int]],
+        failures: list[tuple[int | None, str]],
+    ):
+        self.terms = terms
+        self.token_count = token_count
+        self.phrases = phrases
+        self.failures = failures
+
+    def word_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for word, _, count in self.terms.values():
+            if word:
+                counts[word] = counts.get(word, 0) + count
+        return counts
+
+
+def _analyze_for_rebuild(uploaded_file) -> _RebuiltDocument | None:
+    """Steps 1-2 of `index_document` for one file; None if it fails."""
+    from apps.indexer.postings import encode_positions
+    from apps.indexer.text_cache import iter_text
+    from apps.indexer.tokenizer import StreamAnalyzer
 
     try:
-        from nltk.tokenize import sent_tokenize
-        raw_sentences = sent_tokenize(raw_text)
-    except LookupError:
-        import nltk
-        nltk.download('punkt_tab', quiet=True)
-        from nltk.tokenize import sent_tokenize
-        raw_sentences = sent_tokenize(raw_text)
-
-    rows = []
-    seen: set[str] = set()
-
-    for i, sentence in enumerate(raw_sentences):
-        if len(rows) >= MAX_SENTENCES:
-            break
-
-        # Clean: collapse whitespace, strip
-        cleaned = re.sub(r'\s+', ' ', sentence).strip()
-        if len(cleaned) < MIN_CHARS:
-            continue
-        if len(cleaned.split()) < MIN_WORDS:
-            continue
+        failures: list[tuple[int | None, str]] = []
+        phrases = _PhraseCollector(uploaded_file)
+        analyzer = StreamAnalyzer(on_sentences=phrases.add)
+        for chunk in iter_text(uploaded_file, failures):
+            analyzer.feed(chunk)
+        analysis = analyzer.close()
+    except Exception as exc:
+        logger.error(
+            'rebuild_user_corpus: FAILED for file id=%s: %s',
+            uploaded_file.pk, exc, exc_info=True,
+        )
+        return None
+
+    return _RebuiltDocument(
+        terms={
+            term: (data['original'], encode_positions(data['positions']), len(data['positions']))
+            for term, data in analysis.terms.items()
+        },
+        token_count=analysis.token_count,
+        phrases=[(row.phrase, row.position) for row in phrases.rows],
+        failures=failures,
+    )
 
-        # Truncate long sentences
-        if len(cleaned) > MAX_CHARS:
-            cleaned = cleaned[:MAX_CHARS - 1] + '…'
 
-        # Deduplicate
-        key = cleaned.lower()
-        if key in seen:
-            continue
-        seen.add(key)
+def _analyze_in_worker(uploaded_file) -> _RebuiltDocument | None:
+    try:
+        return _analyze_for_rebuild(uploaded_file)
+    finally:
+        # Worker threads each open their own database connection.
+        connection.close()
 
-        rows.append(DocumentPhrase(
-            document=uploaded_file,
-            phrase=cleaned,
-            position=i,
-        ))
 
-    return rows
+class _PhraseCollector:
+    """
+    Turns the sentences reported by `tokenizer.StreamAnalyzer` into cleaned
+    DocumentPhrase model instances ready for bulk_create (`rows`).
 
+    Each sentence is cleaned: collapsed whitespace, stripped, and capped at
+    MAX_PHRASE_LENGTH.  Very short fragments (< 8 chars or < 3 words) are
+    dropped.  At most MAX_SENTENCES are kept per document to keep the table
+    manageable.
+    """
+
+    MAX_SENTENCES = 500
+    MIN_CHARS     = 8
+    MIN_WORDS     = 3
 
+    def __init__(self, uploaded_file):
+        self.uploaded_file = uploaded_file
+        self.rows = []
+        self._seen: set[str] = set()
+        self._index = 0
+
+    def add(self, chunk: str, sentences: list[tuple[int, int, int]]):
+        from apps.indexer.models import DocumentPhrase
+
+        max_chars = DocumentPhrase.MAX_PHRASE_LENGTH
+        for start, end, _ in sentences:
+            i = self._index
+            self._index += 1
+            if len(self.rows) >= self.MAX_SENTENCES:
+                continue
+
+            # Clean: collapse whitespace, strip; drop NUL bytes — PostgreSQL
+            # text fields cannot contain \x00
+            words = chunk[start:end].replace('\x00', '').split()
+            if len(words) < self.MIN_WORDS:
+                continue
+            cleaned = ' '.join(words)
+            if len(cleaned) < self.MIN_CHARS:
+                continue
+
+            # Truncate long sentences
+            if len(cleaned) > max_chars:
+                cleaned = cleaned[:max_chars - 1] + '…'
+
+            # Deduplicate
+            key = cleaned.lower()
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+
+            self.rows.append(DocumentPhrase(
+                document=self.uploaded_file,
+                user_id=self.uploaded_file.uploaded_by_id,
+                deleted=self.uploaded_file.deleted_at is not None,
+                phrase=cleaned,
+                position=i,
+            ))
+
+
+def _word_counts(term_data: dict[str, dict]) -> dict[str, int]:
+    """Occurrences per original (pre-stem) word, for the completion vocabulary."""
+    counts: dict[str, int] = {}
+    for data in term_data.values():
+        word = data['original']
+        if word:
+            counts[word] = counts.get(word, 0) + len(data['positions'])
+    return counts
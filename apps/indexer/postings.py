@@ -0,0 +1,89 @@
+"""
+Compact binary encoding of InvertedIndex.positions.
+
+A term's positions (ascending token offsets) are stored as the gaps between
+them — the first gap measured from 0 — packed as fixed-width unsigned
+little-endian integers, prefixed by one byte giving that width:
+
+    width (1, 2 or 4)   gap 0   gap 1   …
+
+The width is the smallest that fits the row's largest gap, so the positions
+of a frequent term (small gaps) cost one byte each.  Decoding is
+`array.frombytes` plus `itertools.accumulate`, both in C.
+
+The number of positions is `(octet_length - 1) / width`, which
+`PositionCount` computes in SQL without decoding anything.
+
+`PositionsField` stores a list / array of ints in this format and loads it
+back as an `array('I')`.
+"""
+
+import sys
+from array import array
+from base64 import b64encode
+from itertools import accumulate
+
+from django.db import models
+
+_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}
+
+
+def encode_positions(positions) -> bytes:
+    """Pack ascending token offsets (any iterable of ints) into bytes."""
+    gaps = [b - a for a, b in zip([0, *positions], positions)]
+    largest = max(gaps, default=0)
+    width = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+    packed = array(_TYPECODES[width], gaps)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return bytes([width]) + packed.tobytes()
+
+
+def decode_positions(data: bytes) -> array:
+    """The token offsets packed in `data`, as an `array('I')`."""
+    data = memoryview(data).cast('B')
+    gaps = array(_TYPECODES[data[0]])
+    gaps.frombytes(data[1:])
+    if sys.byteorder == 'big':
+        gaps.byteswap()
+    return array('I', accumulate(gaps))
+
+
+def count_positions(data: bytes) -> int:
+    """Number of positions packed in `data`, without decoding them."""
+    data = memoryview(data).cast('B')
+    return (len(data) - 1) // data[0]
+
+
+class PositionCount(models.Func):
+    """SQL: number of positions in a PositionsField column (an integer)."""
+
+    template = '((octet_length(%(expressions)s) - 1) / get_byte(%(expressions)s, 0))'
+    output_field = models.IntegerField()
+
+
+class PositionsField(models.BinaryField):
+    """
+    Token positions in the `encode_positions` format.  Accepts a list, tuple
+    or array of ints (or already-encoded bytes); reads back `array('I')`.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return decode_positions(value)
+
+    def get_prep_value(self, value):
+        if isinstance(value, (list, tuple, array)):
+            return encode_positions(value)
+        return super().get_prep_value(value)
+
+    def to_python(self, value):
+        # Deserialization hands over base64 text; BinaryField decodes it.
+        value = super().to_python(value)
+        if isinstance(value, (bytes, memoryview)):
+            return decode_positions(value)
+        return value
+
+    def value_to_string(self, obj):
+        return b64encode(self.get_prep_value(self.value_from_object(obj))).decode('ascii')
@@ -0,0 +1,215 @@
+"""
+Sandboxed text extraction.
+
+`run(file_type, file_path, failures)` extracts a document in a separate
+worker process rather than in the caller's, and yields its text chunks as
+the worker produces them.  Each worker process:
+
+  - caps its address space at EXTRACTOR_MEMORY_LIMIT_MB (RLIMIT_AS, also
+    inherited by the tesseract binary it runs), so a pathological file
+    fails with MemoryError instead of exhausting the host
+  - arms RLIMIT_CPU before every job, allowing EXTRACTOR_CPU_LIMIT more
+    CPU seconds, so a runaway parser is stopped by SIGXCPU
+  - is killed by the parent once a job has kept it waiting for
+    EXTRACTOR_TIMEOUT seconds (wall clock — also covers a parser that is
+    blocked rather than busy)
+
+Workers are reused from job to job (one per concurrent caller), so the
+process start-up cost is paid once; a worker that ran out of memory, was
+killed or crashed is replaced by a fresh one on the next job.
+
+PDF pages extracted by `pdf_pages.py`, and the page count before them,
+get the same limits in its own worker processes.  Outcomes are counted per
+file_type — see `stats()`; `index_worker` prints them on exit.
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections.abc import Iterator
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('jobs', 'timeouts', 'oom', 'crashes')
+
+# Exit status of a worker that hit its memory limit.
+EXIT_OUT_OF_MEMORY = 86
+
+_idle: list['_Worker'] = []
+_stats: dict[str, dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def run(file_type: str, file_path: str, failures: list) -> Iterator[str]:
+    """
+    Yield the text chunks of the file at `file_path`, extracted in a
+    sandboxed worker.  If the worker times out, runs out of memory or
+    crashes, the chunks already yielded stand, a `(None, reason)` failure is
+    appended to `failures` and iteration ends.
+    """
+    from django.conf import settings
+
+    timeout = getattr(settings, 'EXTRACTOR_TIMEOUT', 300)
+    cpu_seconds = getattr(settings, 'EXTRACTOR_CPU_LIMIT', 120)
+
+    worker = _acquire(memory_limit())
+    record(file_type, 'jobs')
+    reusable = False
+    try:
+        worker.conn.send((file_type, file_path, cpu_seconds))
+        waited = 0.0
+        while True:
+            started = time.monotonic()
+            ready = worker.conn.poll(max(0.0, timeout - waited))
+            waited += time.monotonic() - started
+            if not ready:
+                _fail(file_type, file_path, failures, 'timeouts', f'extraction timed out after {timeout:g}s')
+                return
+            try:
+                kind, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                _fail(file_type, file_path, failures, *classify_exit(worker.process, cpu_seconds))
+                return
+            if kind == 'chunk':
+                yield payload
+            else:
+                failures.extend(payload)
+                reusable = True
+                return
+    finally:
+        if reusable:
+            with _lock:
+                _idle.append(worker)
+        else:
+            worker.kill()
+
+
+def record(file_type: str, outcome: str):
+    """Count one `outcome` (see OUTCOMES) for `file_type`."""
+    with _lock:
+        counts = _stats.setdefault(file_type, dict.fromkeys(OUTCOMES, 0))
+        counts[outcome] += 1
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """{file_type: {'jobs': n, 'timeouts': n, 'oom': n, 'crashes': n}} for this process."""
+    with _lock:
+        return {file_type: dict(counts) for file_type, counts in _stats.items()}
+
+
+def memory_limit() -> int:
+    """EXTRACTOR_MEMORY_LIMIT_MB in bytes (0 = unlimited)."""
+    from django.conf import settings
+
+    return getattr(settings, 'EXTRACTOR_MEMORY_LIMIT_MB', 1024) * 1024 * 1024
+
+
+def limit_memory(memory_bytes: int):
+    """Cap this process's address space; a no-op where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return
+    if memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def arm_cpu_limit(cpu_seconds: int):
+    """Allow this process `cpu_seconds` more CPU time before SIGXCPU."""
+    try:
+        import resource
+    except ImportError:
+        return
+    if cpu_seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + 1 + cpu_seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def classify_exit(process, cpu_seconds: int) -> tuple[str, str]:
+    """`(outcome, reason)` for a worker process that exited unexpectedly."""
+    process.join(timeout=1)
+    code = process.exitcode
+    if code == -signal.SIGXCPU:
+        return 'timeouts', f'CPU limit of {cpu_seconds}s exceeded'
+    if code == EXIT_OUT_OF_MEMORY:
+        return 'oom', 'memory limit exceeded'
+    if code == -signal.SIGKILL:
+        return 'oom', 'worker killed (out of memory)'
+    return 'crashes', f'worker exited with status {code}'
+
+
+def get_context():
+    # forkserver/spawn: forking the multi-threaded index worker is unsafe.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+class _Worker:
+    __slots__ = ('conn', 'process')
+
+    def __init__(self, memory_bytes: int):
+        context = get_context()
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(child_conn, memory_bytes), name='extractor-sandbox', daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+
+def _acquire(memory_bytes: int) -> _Worker:
+    with _lock:
+        while _idle:
+            worker = _idle.pop()
+            if worker.process.is_alive():
+                return worker
+            worker.kill()
+    return _Worker(memory_bytes)
+
+
+def _fail(file_type: str, file_path: str, failures: list, outcome: str, reason: str):
+    record(file_type, outcome)
+    failures.append((None, reason))
+    logger.warning('sandbox: %s extraction of %s failed (%s): %s', file_type, file_path, outcome, reason)
+
+
+def _serve(conn, memory_bytes: int):
+    """Worker main loop: extract each `(file_type, file_path, cpu_seconds)` job."""
+    from apps.indexer.extractor import iter_text_in_process
+
+    limit_memory(memory_bytes)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        file_type, file_path, cpu_seconds = job
+        arm_cpu_limit(cpu_seconds)
+
+        failures: list = []
+        try:
+            for chunk in iter_text_in_process(file_type, file_path, failures):
+                conn.send(('chunk', chunk))
+        except MemoryError:
+            os._exit(EXIT_OUT_OF_MEMORY)
+        except Exception as exc:
+            failures.append((None, f'{type(exc).__name__}: {exc}'[:255]))
+        conn.send(('done', failures))
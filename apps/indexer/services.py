@@ -1,13 +1,15 @@
 """
 IndexerService — user-scoped query helpers for the InvertedIndex table.
 
-All methods enforce user isolation by filtering through
-document__uploaded_by=user, so no cross-user data can leak.
+All methods enforce user isolation by filtering on the rows' denormalized
+owner (user=user, copied from document.uploaded_by), so no cross-user data
+can leak.
 """
 
 import logging
 import re
 
+from . import lexicon
 from .models import InvertedIndex
 from .trie import PrefixTrie
 
@@ -15,6 +17,7 @@ logger = logging.getLogger(__name__)
 
 
 _WS_RE = re.compile(r'\s+')
+_WORD_RE = re.compile(r'[a-z]+')
 
 
 class IndexerService:
@@ -37,10 +40,12 @@ class IndexerService:
             ]
 
         Ranking: sum of TF-IDF scores for each matched term per document,
-        sorted descending.
+        sorted descending.  With INDEXER_SCORING_MODE='query_time' (the
+        default) IDF is taken from the live corpus statistics at query time;
+        with 'index_time' the tf_idf snapshot stored on each row is used.
         """
         from apps.indexer.tokenizer import tokenize
-        from apps.indexer.models import DocumentPhrase
+        from apps.upload.models import UploadedFile
 
         if not query.strip():
             return []
@@ -49,51 +54,101 @@ class IndexerService:
         if not query_terms:
             return []
 
-        # Fetch matching index entries for user's corpus
-        entries = (
-            InvertedIndex.objects
-            .filter(document__uploaded_by=user, term__in=query_terms)
-            .select_related('document')
-        )
+        # Postings reference the term dictionary: resolve the query terms to
+        # ids once.  A term no one has indexed cannot match.
+        term_ids = lexicon.lookup(query_terms)
+        if not term_ids:
+            return []
+
+        query_idf = IndexerService._query_idf(user, list(term_ids))
+        ranked = list(IndexerService._ranking_queryset(user, term_ids, query_idf)[:limit])
+
+        docs = UploadedFile.objects.in_bulk([row['document_id'] for row in ranked])
 
-        # Aggregate scores per document
         doc_scores: dict[int, dict] = {}
-        for entry in entries:
-            doc = entry.document
-            if doc.deleted_at is not None:
-                continue  # skip soft-deleted files
-            if doc.pk not in doc_scores:
-                if request is not None:
-                    file_url = request.build_absolute_uri(doc.file.url)
-                else:
-                    file_url = doc.file.url
-                doc_scores[doc.pk] = {
-                    'file_id': doc.pk,
-                    'original_filename': doc.original_filename,
-                    'file_type': doc.file_type,
-                    'file_url': file_url,
-                    'score': 0.0,
-                    'matched_phrases': set(),
-                }
-            doc_scores[doc.pk]['score'] += entry.tf_idf
-
-        # For each document, fetch matching phrases
-        for doc_id in doc_scores.keys():
-            phrases = DocumentPhrase.objects.filter(
-                document_id=doc_id,
-                phrase__icontains=query
-            ).values_list('phrase', flat=True)[:5]  # limit to 5 phrases per doc
-            doc_scores[doc_id]['matched_phrases'] = list(phrases)
-
-        # Convert sets to lists for JSON serialization
+        for row in ranked:
+            doc = docs[row['document_id']]
+            if request is not None:
+                file_url = request.build_absolute_uri(doc.file.url)
+            else:
+                file_url = doc.file.url
+            doc_scores[doc.pk] = {
+                'file_id': doc.pk,
+                'original_filename': doc.original_filename,
+                'file_type': doc.file_type,
+                'file_url': file_url,
+                'score': row['score'],
+                'matched_phrases': [],
+            }
+
+        # Snippets for the final page only, in a single query
+        snippets = SnippetService.get_snippets(list(doc_scores.keys()), query)
+        for doc_id, phrases in snippets.items():
+            doc_scores[doc_id]['matched_phrases'] = phrases
+
         for doc_data in doc_scores.values():
             if not doc_data['matched_phrases']:
                 # Fallback: show filename-based phrase if no content phrases
                 doc_data['matched_phrases'] = [doc_data['original_filename']]
 
-        # Sort by score descending
-        results = sorted(doc_scores.values(), key=lambda x: x['score'], reverse=True)
-        return results[:limit]
+        # Already in rank order (dicts preserve insertion order)
+        return list(doc_scores.values())
+
+    @staticmethod
+    def _ranking_queryset(user, term_ids: dict[str, int], query_idf: dict[str, float] | None):
+        """
+        `{'document_id', 'score'}` rows, best first.
+
+        Scored, filtered and ranked in the database: one grouped SUM per
+        document, soft-deleted files excluded, ORDER BY … LIMIT applied in
+        SQL so only the top documents ever leave PostgreSQL.  Owner and
+        soft-delete state are read from the row itself, so this is an
+        index-only scan of indexer_inv_user_term_idx with no join.
+        """
+        return (
+            InvertedIndex.objects
+            .filter(user=user, deleted=False, term_id__in=term_ids.values())
+            .values('document_id')
+            .annotate(score=IndexerService._score_expression(query_idf, term_ids))
+            .order_by('-score', 'document_id')
+        )
+
+    @staticmethod
+    def _query_idf(user, query_terms: list[str]) -> dict[str, float] | None:
+        """
+        Return {term: idf} computed from the user's live corpus statistics,
+        or None when the stored index-time tf_idf should be used instead.
+        """
+        from django.conf import settings
+        from apps.indexer import corpus
+
+        if getattr(settings, 'INDEXER_SCORING_MODE', 'query_time') != 'query_time':
+            return None
+
+        total_docs, df = corpus.lookup(user, query_terms)
+        return {
+            term: corpus.smoothed_idf(df.get(term, 0), total_docs)
+            for term in query_terms
+        }
+
+    @staticmethod
+    def _score_expression(query_idf: dict[str, float] | None, term_ids: dict[str, int]):
+        """
+        Per-document score aggregate: SUM(tf_idf) in index_time mode,
+        otherwise SUM(term_frequency * <query-time idf of the row's term>),
+        the row's term being matched by its dictionary id (`term_ids`).
+        """
+        from django.db.models import Case, F, FloatField, Sum, Value, When
+
+        if query_idf is None:
+            return Sum('tf_idf')
+
+        idf = Case(
+            *[When(term_id=term_ids[term], then=Value(value)) for term, value in query_idf.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return Sum(F('term_frequency') * idf, output_field=FloatField())
 
     @staticmethod
     def get_document_index(user, file_id: int) -> list[InvertedIndex]:
@@ -103,7 +158,7 @@ class IndexerService:
         """
         entries = InvertedIndex.objects.filter(
             document_id=file_id,
-            document__uploaded_by=user,
+            user=user,
         ).order_by('-tf_idf')
 
         return list(entries)
@@ -116,7 +171,7 @@ class IndexerService:
         from django.db.models import Count
 
         stats = InvertedIndex.objects.filter(
-            document__uploaded_by=user
+            user=user,
         ).aggregate(
             total_entries=Count('id'),
             unique_terms=Count('term', distinct=True),
@@ -127,31 +182,300 @@ class IndexerService:
     @staticmethod
     def delete_document_index(user, file_id: int) -> int:
         """
-        Delete all index entries for a document owned by user.
+        Delete all index entries for a document owned by user and discount
+        the document from the user's corpus statistics.
         Returns the number of deleted rows.
         """
-        deleted_count, _ = InvertedIndex.objects.filter(
-            document_id=file_id,
-            document__uploaded_by=user,
-        ).delete()
+        from django.db import transaction
+        from apps.indexer import corpus
+
+        with transaction.atomic():
+            entries = InvertedIndex.objects.filter(
+                document_id=file_id,
+                user=user,
+            )
+            if entries.exists():
+                corpus.remove_document(user, file_id)
+            deleted_count, _ = entries.delete()
         return deleted_count
 
 
+class SnippetService:
+    """
+    Picks the sentences shown under each search result.
+
+    Runs once per search, for the final page of results only: one query over
+    DocumentPhrase, served by the full-text GIN index on `phrase`, returns at
+    most `per_document` phrases per document ranked by how many of the query
+    words they contain.
+    """
+
+    SEARCH_CONFIG = 'english'
+
+    @staticmethod
+    def get_snippets(doc_ids: list[int], query: str, per_document: int = 5) -> dict[int, list[str]]:
+        from functools import reduce
+        from operator import add, or_
+
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+        from django.db.models import Case, F, IntegerField, Value, When, Window
+        from django.db.models.functions import RowNumber
+
+        from apps.indexer.models import DocumentPhrase
+
+        words = list(dict.fromkeys(_WORD_RE.findall((query or '').lower())))
+        if not doc_ids or not words:
+            return {}
+
+        config = SnippetService.SEARCH_CONFIG
+        word_queries = [SearchQuery(w, config=config) for w in words]
+        coverage = reduce(add, [
+            Case(When(search=q, then=Value(1)), default=Value(0), output_field=IntegerField())
+            for q in word_queries
+        ])
+
+        rows = (
+            DocumentPhrase.objects
+            .annotate(search=SearchVector('phrase', config=config))
+            .filter(document_id__in=doc_ids, search=reduce(or_, word_queries))
+            .annotate(coverage=coverage)
+            .annotate(rank=Window(
+                RowNumber(),
+                partition_by=F('document_id'),
+                order_by=[F('coverage').desc(), F('position').asc()],
+            ))
+            .filter(rank__lte=per_document)
+            .order_by('document_id', 'rank')
+            .values_list('document_id', 'phrase')
+        )
+
+        snippets: dict[int, list[str]] = {}
+        for doc_id, phrase in rows:
+            snippets.setdefault(doc_id, []).append(phrase)
+        return snippets
+
+
 class AutocompleteService:
-    """Prefix autocomplete built on top of an in-memory Trie."""
+    """
+    Prefix autocomplete built on top of an in-memory Trie.
+
+    Tries are cached per process by `suggest_cache` and kept current through
+    the `record_*` hooks, which the indexing pipeline and FileUploadService
+    call whenever a user's filenames or content phrases change.
+    """
 
     MAX_FILENAME_WORDS = 7
     MAX_CONTENT_PHRASES = 2500
+    MAX_FALLBACK_FILES = 200
+    FILENAME_WEIGHT = 3.0
+    CONTENT_WEIGHT = 2.0
 
     @staticmethod
-    def get_suggestions(user, query: str, limit: int = 8) -> list[str]:
+    def get_suggestions(user, query: str, limit: int = 8, timeout: float | None = None) -> list[str]:
+        """
+        Return up to `limit` phrases starting with `query`.
+
+        Served from the user's cached Trie — a pure in-memory prefix walk.
+        With `timeout` (seconds) the call never waits longer than that for a
+        cold Trie to be built: it answers with partial, filename-only
+        suggestions from the most recent uploads while the build finishes in
+        the background.
+        """
+        from apps.indexer import suggest_cache
+
         normalized_query = AutocompleteService._normalize_query(query)
         if not user or not normalized_query:
             return []
 
-        trie = AutocompleteService._build_user_trie(user)
+        trie = suggest_cache.get_cache().get(
+            user, AutocompleteService._build_user_trie, timeout=timeout,
+        )
+        if trie is None:
+            return AutocompleteService._recent_filename_suggestions(user, normalized_query, limit)
         return trie.suggest(normalized_query, limit=limit)
 
+    @staticmethod
+    def get_word_completions(user, query: str, limit: int = 8) -> list[str]:
+        """
+        Complete the last word of `query` from the user's indexed vocabulary.
+
+        Candidates come from VocabularyTerm — a prefix range scan on
+        (user, word) — ranked by document frequency, then total occurrences.
+        Earlier words of the query are kept, so 'machine lea' completes to
+        'machine learning'.
+        """
+        from apps.indexer.models import VocabularyTerm
+
+        normalized_query = AutocompleteService._normalize_query(query)
+        head, _, prefix = normalized_query.rpartition(' ')
+        if not user or not _WORD_RE.fullmatch(prefix or ''):
+            return []
+
+        words = (
+            VocabularyTerm.objects
+            .filter(user=user, word__startswith=prefix)
+            .order_by('-document_frequency', '-occurrences', 'word')
+            .values_list('word', flat=True)[:limit]
+        )
+        return [f'{head} {word}' if head else word for word in words]
+
+    @staticmethod
+    def _recent_filename_suggestions(user, normalized_query: str, limit: int) -> list[str]:
+        """Partial answer while the Trie is cold: prefix-match recent filenames."""
+        from apps.upload.models import UploadedFile
+
+        files = (
+            UploadedFile.objects
+            .filter(uploaded_by=user, deleted_at=None)
+            .order_by('-uploaded_at')
+            .values_list('original_filename', flat=True)[:AutocompleteService.MAX_FALLBACK_FILES]
+        )
+        matches: list[str] = []
+        for filename in files:
+            for phrase in AutocompleteService._filename_phrases(filename):
+                if PrefixTrie._normalize(phrase).startswith(normalized_query):
+                    matches.append(phrase)
+        return list(dict.fromkeys(matches))[:limit]
+
+    # ------------------------------------------------------------------ #
+    # Change hooks — publish incremental updates to cached tries
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def record_file_added(uploaded_file):
+        """A new file's name became suggestible."""
+        AutocompleteService._publish(
+            uploaded_file,
+            added=AutocompleteService._filename_phrases(uploaded_file.original_filename),
+            added_weight=AutocompleteService.FILENAME_WEIGHT,
+        )
+
+    @staticmethod
+    def record_content_added(uploaded_file, phrases: list[str]):
+        """Freshly extracted content phrases for `uploaded_file`."""
+        AutocompleteService._publish(
+            uploaded_file,
+            added=phrases,
+            added_weight=AutocompleteService.CONTENT_WEIGHT,
+            rebuild=AutocompleteService._over_content_cap(uploaded_file.uploaded_by),
+        )
+
+    @staticmethod
+    def record_content_removed(uploaded_file, phrases: list[str]):
+        """Content phrases of `uploaded_file` are about to be deleted."""
+        AutocompleteService._publish(uploaded_file, removed=phrases)
+
+    @staticmethod
+    def record_file_removed(uploaded_file):
+        """`uploaded_file` was deleted: drop its name and content phrases."""
+        from apps.indexer.models import DocumentPhrase
+
+        phrases = list(
+            DocumentPhrase.objects
+            .filter(document=uploaded_file)
+            .values_list('phrase', flat=True)
+        )
+        AutocompleteService._publish(
+            uploaded_file,
+            removed=AutocompleteService._filename_phrases(uploaded_file.original_filename) + phrases,
+        )
+
+    @staticmethod
+    def record_file_renamed(uploaded_file, old_filename: str):
+        AutocompleteService._publish(
+            uploaded_file,
+            added=AutocompleteService._filename_phrases(uploaded_file.original_filename),
+            added_weight=AutocompleteService.FILENAME_WEIGHT,
+            removed=AutocompleteService._filename_phrases(old_filename),
+        )
+
+    @staticmethod
+    def record_content_rebuilt(user, old_phrases: list[str], new_phrases: list[str]):
+        """
+        All of `user`'s content phrases were replaced at once
+        (`pipeline.rebuild_user_corpus`): publish only the net change.
+        """
+        from apps.indexer import suggest_cache
+
+        old_keys = {PrefixTrie._normalize(p) for p in old_phrases}
+        new_keys = {PrefixTrie._normalize(p) for p in new_phrases}
+        added = [p for p in dict.fromkeys(new_phrases) if PrefixTrie._normalize(p) not in old_keys]
+        removed = [p for p in dict.fromkeys(old_phrases) if PrefixTrie._normalize(p) not in new_keys]
+        if removed:
+            still_used = AutocompleteService._phrases_still_suggested(user, removed, exclude_file_id=None)
+            removed = [p for p in removed if PrefixTrie._normalize(p) not in still_used]
+
+        suggest_cache.publish(
+            user,
+            added=[(p, AutocompleteService.CONTENT_WEIGHT) for p in added],
+            removed=removed,
+            rebuild=bool(added) and AutocompleteService._over_content_cap(user),
+        )
+
+    @staticmethod
+    def _publish(uploaded_file, added=(), added_weight: float = 0.0, removed=(), rebuild: bool = False):
+        """
+        Publish a delta for the file's owner.  Removed phrases that are also
+        being added, or that another live file of the user still provides,
+        are kept.
+        """
+        from apps.indexer import suggest_cache
+
+        user = uploaded_file.uploaded_by
+        added_keys = {PrefixTrie._normalize(p) for p in added}
+        removed = [p for p in dict.fromkeys(removed) if PrefixTrie._normalize(p) not in added_keys]
+        if removed:
+            still_used = AutocompleteService._phrases_still_suggested(user, removed, uploaded_file.pk)
+            removed = [p for p in removed if PrefixTrie._normalize(p) not in still_used]
+
+        suggest_cache.publish(
+            user,
+            added=[(p, added_weight) for p in dict.fromkeys(added)],
+            removed=removed,
+            rebuild=rebuild,
+        )
+
+    @staticmethod
+    def _over_content_cap(user) -> bool:
+        """
+        Whether the user has more live content phrases than a built trie
+        holds (MAX_CONTENT_PHRASES).  Added ones are then published as a
+        rebuild: replayed, they would grow cached tries past the cap.
+        """
+        from apps.indexer.models import DocumentPhrase
+
+        live = DocumentPhrase.objects.filter(user=user, deleted=False).count()
+        return live > AutocompleteService.MAX_CONTENT_PHRASES
+
+    @staticmethod
+    def _phrases_still_suggested(user, phrases: list[str], exclude_file_id: int | None) -> set[str]:
+        """Normalized keys among `phrases` that other live files still provide."""
+        from apps.indexer.models import DocumentPhrase
+        from apps.upload.models import UploadedFile
+
+        keys = {PrefixTrie._normalize(p) for p in phrases}
+
+        filenames = (
+            UploadedFile.objects
+            .filter(uploaded_by=user, deleted_at=None)
+            .exclude(pk=exclude_file_id)
+            .values_list('original_filename', flat=True)
+        )
+        used = {
+            PrefixTrie._normalize(p)
+            for filename in filenames
+            for p in AutocompleteService._filename_phrases(filename)
+        }
+
+        content = (
+            DocumentPhrase.objects
+            .filter(user=user, deleted=False, phrase__in=phrases)
+            .exclude(document_id=exclude_file_id)
+            .values_list('phrase', flat=True)
+        )
+        used.update(PrefixTrie._normalize(p) for p in content)
+        return keys & used
+
     @staticmethod
     def _normalize_query(query: str) -> str:
         return _WS_RE.sub(' ', (query or '').strip().lower())
@@ -202,18 +526,18 @@ class AutocompleteService:
         ).order_by('-uploaded_at').values_list('original_filename', flat=True)
 
         for rank, filename in enumerate(files):
-            weight = 3.0 - (rank * 0.001)
+            weight = AutocompleteService.FILENAME_WEIGHT - (rank * 0.001)
             for phrase in AutocompleteService._filename_phrases(filename):
                 trie.insert(phrase, weight=weight)
 
         content_phrases = (
             DocumentPhrase.objects
-            .filter(document__uploaded_by=user, document__deleted_at=None)
+            .filter(user=user, deleted=False)
             .order_by('-document__uploaded_at', 'position')
             .values_list('phrase', flat=True)[:AutocompleteService.MAX_CONTENT_PHRASES]
         )
         for rank, phrase in enumerate(content_phrases):
-            weight = 2.0 - (rank * 0.0005)
+            weight = AutocompleteService.CONTENT_WEIGHT - (rank * 0.0005)
             trie.insert(phrase, weight=weight)
 
         return trie
@@ -0,0 +1,285 @@
+"""
+Shared autocomplete trie cache.
+
+Each process keeps built PrefixTries in an LRU cache bounded by
+AUTOCOMPLETE_CACHE_MAX_BYTES.  Entries are tagged with the user's
+CorpusStatistic.suggestion_version:
+
+  - Writers (`publish()`) bump the version and record what changed as a
+    SuggestionDelta row, in the caller's transaction.
+  - Readers (`TrieCache.get()`) compare their cached version with the database at
+    most once every AUTOCOMPLETE_VERSION_CHECK_INTERVAL seconds, and replay
+    the missing deltas onto a copy of the cached trie, which then replaces
+    it — a trie handed out is never modified, so it can be read unlocked.
+  - A process without a cached trie maps the user's on-disk snapshot (see
+    `apps/indexer/trie_store.py`) and replays any newer deltas onto it.
+    Only when neither is possible is the trie rebuilt from the database, and
+    the rebuild is written back as the new snapshot.
+
+Because the version and deltas live in PostgreSQL, every worker process —
+web or indexer, on any host — sees the same sequence of changes.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('version', 'trie', 'size', 'checked_at')
+
+    def __init__(self, version: int, trie, checked_at: float):
+        self.version = version
+        self.trie = trie
+        self.size = trie.estimated_size()
+        self.checked_at = checked_at
+
+
+class TrieCache:
+    """Per-process LRU of user tries, kept current through SuggestionDelta."""
+
+    def __init__(self):
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._building: dict[int, threading.Event] = {}
+
+    def get(self, user, build, timeout: float | None = None):
+        """
+        Return an up-to-date PrefixTrie for `user`, calling `build(user)` only
+        when it cannot be brought up to date from the delta log.
+
+        With `timeout` (seconds), a needed rebuild runs on a background
+        thread and the call waits at most that long for it.  If the build
+        has not finished, the stale cached trie is returned when there is
+        one, otherwise None; the build keeps running and lands in the cache
+        for the next call.
+        """
+        now = time.monotonic()
+        interval = getattr(settings, 'AUTOCOMPLETE_VERSION_CHECK_INTERVAL', 1.0)
+
+        with self._lock:
+            entry = self._entries.get(user.pk)
+            if entry is not None:
+                self._entries.move_to_end(user.pk)
+                if now - entry.checked_at < interval:
+                    return entry.trie
+
+        version = current_version(user.pk)
+
+        if entry is not None:
+            if entry.version == version:
+                entry.checked_at = now
+                return entry.trie
+            if self._catch_up(user.pk, entry, version):
+                entry.checked_at = now
+                return entry.trie
+
+        # Read the version *before* building so a change that lands during
+        # the build is replayed on the next check rather than missed.
+        if timeout is None:
+            fresh = self._load(user, build, version)
+            self._store(user.pk, fresh)
+            return fresh.trie
+
+        done = self._build_in_background(user, build, version)
+        if done.wait(timeout):
+            with self._lock:
+                fresh = self._entries.get(user.pk)
+            if fresh is not None:
+                return fresh.trie
+        return entry.trie if entry is not None else None
+
+    def mark_stale(self, user_id: int):
+        """Force the next get() for `user_id` to check the database version."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry.checked_at = float('-inf')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    # ------------------------------------------------------------------ #
+
+    def _build_in_background(self, user, build, version: int) -> threading.Event:
+        """Start (or join) the single in-flight build for `user`."""
+        from django.db import connection
+
+        with self._lock:
+            done = self._building.get(user.pk)
+            if done is not None:
+                return done
+            done = self._building[user.pk] = threading.Event()
+
+        def _run():
+            try:
+                self._store(user.pk, self._load(user, build, version))
+            except Exception as exc:
+                logger.error('suggest_cache: build failed for user=%s: %s', user.pk, exc, exc_info=True)
+            finally:
+                with self._lock:
+                    self._building.pop(user.pk, None)
+                done.set()
+                connection.close()
+
+        threading.Thread(target=_run, name=f'trie-build-{user.pk}', daemon=True).start()
+        return done
+
+    def _load(self, user, build, version: int) -> _Entry:
+        """
+        Produce an entry at `version`: map the user's snapshot when it is
+        current, replay deltas onto an older one, or build from the database
+        and write a fresh snapshot.
+        """
+        from apps.indexer import trie_store
+
+        now = time.monotonic()
+        snapshot = trie_store.open_latest(user.pk, version)
+        if snapshot is not None:
+            entry = _Entry(snapshot.version, snapshot, now)
+            if snapshot.version == version:
+                return entry
+            if self._catch_up(user.pk, entry, version):
+                if version - snapshot.version >= trie_store.RESNAPSHOT_AFTER:
+                    trie_store.save(user.pk, version, entry.trie.items())
+                return entry
+
+        trie = build(user)
+        trie_store.save(user.pk, version, trie.items())
+        return _Entry(version, trie, now)
+
+    def _catch_up(self, user_id: int, entry: _Entry, version: int) -> bool:
+        from apps.indexer import trie_store
+        from apps.indexer.models import SuggestionDelta
+        from apps.indexer.trie import PrefixTrie
+
+        with self._lock:
+            base_version, base = entry.version, entry.trie
+        if version < base_version:
+            return False
+
+        deltas = list(
+            SuggestionDelta.objects
+            .filter(user_id=user_id, version__gt=base_version, version__lte=version)
+            .order_by('version')
+            .values_list('removed', 'added')
+        )
+        if len(deltas) != version - base_version:
+            return False  # older deltas already pruned
+
+        # Readers walk the cached trie without the lock, so it is never
+        # edited in place: the deltas are replayed onto a copy (a mapped
+        # snapshot is read-only anyway) that then replaces it.
+        trie = base.copy() if isinstance(base, PrefixTrie) else trie_store.thaw(base)
+        for removed, added in deltas:
+            for phrase in removed:
+                trie.remove(phrase)
+            for phrase, weight in added:
+                trie.insert(phrase, weight=weight)
+
+        with self._lock:
+            if entry.version < version:  # else another thread got further
+                entry.trie, entry.version = trie, version
+                if self._entries.get(user_id) is entry:
+                    self._resize(entry)
+                else:
+                    entry.size = entry.trie.estimated_size()
+        return True
+
+    def _store(self, user_id: int, entry: _Entry):
+        with self._lock:
+            old = self._entries.pop(user_id, None)
+            if old is not None:
+                self._total_bytes -= old.size
+            self._entries[user_id] = entry
+            self._total_bytes += entry.size
+            self._evict()
+
+    def _resize(self, entry: _Entry):
+        self._total_bytes -= entry.size
+        entry.size = entry.trie.estimated_size()
+        self._total_bytes += entry.size
+        self._evict()
+
+    def _evict(self):
+        budget = getattr(settings, 'AUTOCOMPLETE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        # Always keep the most recently used entry, even if it alone is
+        # over budget — otherwise every request would rebuild.
+        while self._total_bytes > budget and len(self._entries) > 1:
+            user_id, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted.size
+            logger.debug('suggest_cache: evicted user=%s (%d bytes)', user_id, evicted.size)
+
+
+_cache = TrieCache()
+
+
+def get_cache() -> TrieCache:
+    return _cache
+
+
+def current_version(user_id: int) -> int:
+    from apps.indexer.models import CorpusStatistic
+
+    return (
+        CorpusStatistic.objects
+        .filter(user_id=user_id)
+        .values_list('suggestion_version', flat=True)
+        .first()
+    ) or 0
+
+
+def publish(user, added: list[tuple[str, float]], removed: list[str], rebuild: bool = False) -> int | None:
+    """
+    Record a change to `user`'s phrase set and return the new version.
+
+    Runs in (or joins) the caller's transaction, so the delta becomes visible
+    to other processes exactly when the underlying rows do.  Returns None if
+    there is nothing to publish.
+
+    With `rebuild`, the version is bumped but no delta is recorded, so every
+    older trie fails to catch up and is rebuilt — for changes that replaying
+    would get wrong.
+    """
+    from apps.indexer.models import CorpusStatistic, SuggestionDelta
+
+    if not added and not removed:
+        return None
+
+    with transaction.atomic():
+        CorpusStatistic.objects.get_or_create(user=user)
+        CorpusStatistic.objects.filter(user=user).update(
+            suggestion_version=F('suggestion_version') + 1,
+        )
+        version = current_version(user.pk)
+        if not rebuild:
+            SuggestionDelta.objects.create(
+                user=user,
+                version=version,
+                added=[[phrase, weight] for phrase, weight in added],
+                removed=list(removed),
+            )
+        SuggestionDelta.objects.filter(
+            user=user,
+            version__lte=version - SuggestionDelta.RETAIN,
+        ).delete()
+
+    _cache.mark_stale(user.pk)
+    return version
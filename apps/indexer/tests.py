@@ -1,9 +1,11 @@
 import os
 import tempfile
+from io import StringIO
 from types import SimpleNamespace
 
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase
 from rest_framework.test import APITestCase, APIClient
 
 User = get_user_model()
@@ -23,6 +25,13 @@ class IndexerTestCase(APITestCase):
         self.token, _ = Token.objects.get_or_create(user=self.user)
         self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
 
+        from django.test import override_settings
+        snapshots = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshots.cleanup)
+        snapshot_settings = override_settings(AUTOCOMPLETE_SNAPSHOT_DIR=snapshots.name)
+        snapshot_settings.enable()
+        self.addCleanup(snapshot_settings.disable)
+
     def test_tokenizer_basic(self):
         from apps.indexer.tokenizer import tokenize
         tokens = tokenize('The quick brown fox jumps over the lazy dog')
@@ -88,6 +97,7 @@ class IndexerTestCase(APITestCase):
         )
         DocumentPhrase.objects.create(
             document=uploaded,
+            user=self.user,
             phrase='machine learning from first principles',
             position=0,
         )
@@ -113,3 +123,1038 @@ class IndexerTestCase(APITestCase):
         if response.json()['suggestions']:
             self.assertIn('phrase', response.json()['suggestions'][0])
 
+    def _create_indexed_file(self, name: str, content: bytes, file_type: str = 'txt'):
+        from apps.upload.models import UploadedFile
+        from apps.indexer.pipeline import index_document
+
+        uploaded = UploadedFile.objects.create(
+            file=SimpleUploadedFile(name, content),
+            original_filename=name,
+            file_type=file_type,
+            file_size=len(content),
+            uploaded_by=self.user,
+            status='pending',
+        )
+        self.assertTrue(index_document(uploaded.pk))
+        uploaded.refresh_from_db()
+        return uploaded
+
+    def test_corpus_statistics_follow_index_and_delete(self):
+        from apps.indexer.models import CorpusStatistic, TermStatistic
+        from apps.indexer.tokenizer import tokenize
+        from apps.upload.services import FileUploadService
+
+        first = self._create_indexed_file('rivers.txt', b'rivers flow into oceans')
+        self._create_indexed_file('oceans.txt', b'oceans hold whales')
+
+        ocean = tokenize('oceans')[0]
+        river = tokenize('rivers')[0]
+        stats = CorpusStatistic.objects.get(user=self.user)
+        self.assertEqual(stats.total_documents, 2)
+        self.assertEqual(stats.total_tokens, 6)
+        self.assertEqual(TermStatistic.objects.get(user=self.user, term=ocean).document_frequency, 2)
+
+        FileUploadService.delete_file(first)
+
+        stats.refresh_from_db()
+        self.assertEqual(stats.total_documents, 1)
+        self.assertEqual(stats.total_tokens, 3)
+        self.assertEqual(TermStatistic.objects.get(user=self.user, term=ocean).document_frequency, 1)
+        self.assertFalse(TermStatistic.objects.filter(user=self.user, term=river).exists())
+
+    def test_query_time_scoring_tracks_corpus_growth(self):
+        import math
+        from django.test import override_settings
+        from apps.indexer.services import IndexerService
+
+        first = self._create_indexed_file('whales.txt', b'whales swim')
+        self._create_indexed_file('cats.txt', b'cats purr')
+
+        # whales: tf=0.5, df=1, N=2 → smoothed idf = log(3/2) + 1
+        with override_settings(INDEXER_SCORING_MODE='query_time'):
+            results = IndexerService.search(self.user, 'whales')
+        self.assertEqual(results[0]['file_id'], first.pk)
+        self.assertAlmostEqual(results[0]['score'], 0.5 * (math.log(3 / 2) + 1))
+
+        # The stored snapshot was computed when `whales.txt` was alone (N=1).
+        with override_settings(INDEXER_SCORING_MODE='index_time'):
+            results = IndexerService.search(self.user, 'whales')
+        self.assertAlmostEqual(results[0]['score'], 0.5)
+
+    def test_job_queue_retries_with_backoff_then_fails(self):
+        from apps.upload.models import UploadedFile
+        from apps.indexer import jobs
+
+        uploaded = UploadedFile.objects.create(
+            file=SimpleUploadedFile('queued.txt', b'queued text'),
+            original_filename='queued.txt',
+            file_type='txt',
+            file_size=11,
+            uploaded_by=self.user,
+        )
+        job = jobs.enqueue(uploaded.pk)
+
+        claimed = jobs.claim('w1', visibility_timeout=60, max_attempts=2)
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 1)
+        self.assertIsNone(jobs.claim('w2', visibility_timeout=60, max_attempts=2))
+
+        jobs.retry_or_fail(claimed, 'w1', 'boom', max_attempts=2, backoff=30)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'queued')
+        # Backoff keeps it out of reach until run_after passes.
+        self.assertIsNone(jobs.claim('w2', visibility_timeout=60, max_attempts=2))
+
+        type(claimed).objects.filter(pk=claimed.pk).update(run_after=claimed.created_at)
+        claimed = jobs.claim('w2', visibility_timeout=60, max_attempts=2)
+        self.assertEqual(claimed.attempts, 2)
+        jobs.retry_or_fail(claimed, 'w2', 'boom', max_attempts=2, backoff=30)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, 'failed')
+
+    def test_search_ranks_top_k_in_sql_and_skips_deleted(self):
+        from django.utils import timezone
+        from apps.indexer.pipeline import sync_deleted_flag
+        from apps.indexer.services import IndexerService
+
+        dense = self._create_indexed_file('dense.txt', b'comet comet comet tail')
+        sparse = self._create_indexed_file('sparse.txt', b'comet dust ice rock')
+        gone = self._create_indexed_file('gone.txt', b'comet comet comet comet')
+        gone.deleted_at = timezone.now()
+        gone.save(update_fields=['deleted_at'])
+        sync_deleted_flag(gone)
+
+        results = IndexerService.search(self.user, 'comet', limit=1)
+        self.assertEqual([r['file_id'] for r in results], [dense.pk])
+
+        results = IndexerService.search(self.user, 'comet', limit=10)
+        self.assertEqual([r['file_id'] for r in results], [dense.pk, sparse.pk])
+
+    def test_snippets_ranked_by_query_word_coverage(self):
+        from apps.indexer.models import DocumentPhrase
+        from apps.indexer.services import SnippetService
+        from apps.upload.models import UploadedFile
+
+        uploaded = UploadedFile.objects.create(
+            file=SimpleUploadedFile('stars.txt', b'stars'),
+            original_filename='stars.txt',
+            file_type='txt',
+            file_size=5,
+            uploaded_by=self.user,
+            status='processed',
+        )
+        DocumentPhrase.objects.bulk_create([
+            DocumentPhrase(document=uploaded, user=self.user, phrase='Stars are born in nebulae.', position=0),
+            DocumentPhrase(document=uploaded, user=self.user, phrase='Nothing relevant in this one.', position=1),
+            DocumentPhrase(document=uploaded, user=self.user, phrase='Neutron stars collapse from giant stars.', position=2),
+        ])
+
+        snippets = SnippetService.get_snippets([uploaded.pk], 'neutron star', per_document=5)
+        self.assertEqual(snippets[uploaded.pk], [
+            'Neutron stars collapse from giant stars.',
+            'Stars are born in nebulae.',
+        ])
+
+    def test_autocomplete_cache_applies_deltas_incrementally(self):
+        from unittest import mock
+        from django.test import override_settings
+        from apps.indexer import suggest_cache
+        from apps.indexer.pipeline import index_document
+        from apps.indexer.services import AutocompleteService
+        from apps.upload.services import FileUploadService
+
+        cache = suggest_cache.get_cache()
+        with override_settings(AUTOCOMPLETE_VERSION_CHECK_INTERVAL=0), \
+                mock.patch.object(
+                    AutocompleteService, '_build_user_trie', wraps=AutocompleteService._build_user_trie,
+                ) as build:
+            self.assertEqual(AutocompleteService.get_suggestions(self.user, 'gal'), [])
+            trie = cache.get(self.user, AutocompleteService._build_user_trie)
+
+            galaxy = FileUploadService.save_file(
+                self.user, SimpleUploadedFile('galaxy-survey.txt', b'Galaxy clusters bend light strongly.'),
+            )
+            self.assertTrue(index_document(galaxy.pk))
+            galaxy.refresh_from_db()
+            suggestions = AutocompleteService.get_suggestions(self.user, 'gal')
+            self.assertIn('galaxy survey', suggestions)
+            self.assertIn('Galaxy clusters bend light strongly.', suggestions)
+
+            FileUploadService.rename_file(galaxy, 'nebula-atlas.txt')
+            self.assertEqual(
+                AutocompleteService.get_suggestions(self.user, 'gal'),
+                ['Galaxy clusters bend light strongly.'],
+            )
+            self.assertEqual(AutocompleteService.get_suggestions(self.user, 'neb'), ['nebula atlas'])
+
+            FileUploadService.delete_file(galaxy)
+            self.assertEqual(AutocompleteService.get_suggestions(self.user, 'gal'), [])
+            self.assertEqual(AutocompleteService.get_suggestions(self.user, 'neb'), [])
+
+            # Every change was replayed from the delta log — no rebuild — onto
+            # copies, so the trie handed out first never changed under its reader.
+            self.assertIsNot(cache.get(self.user, AutocompleteService._build_user_trie), trie)
+            self.assertEqual(build.call_count, 1)
+            self.assertEqual(trie.suggest('gal'), [])
+
+    def test_autocomplete_cache_rebuilds_instead_of_replaying_past_the_phrase_cap(self):
+        from unittest import mock
+        from django.test import override_settings
+        from apps.indexer.pipeline import index_document
+        from apps.indexer.services import AutocompleteService
+        from apps.upload.services import FileUploadService
+
+        def content_phrases():
+            return [p for p in AutocompleteService.get_suggestions(self.user, 'comet', limit=20) if p.endswith('.')]
+
+        with override_settings(AUTOCOMPLETE_VERSION_CHECK_INTERVAL=0), \
+                mock.patch.object(AutocompleteService, 'MAX_CONTENT_PHRASES', 2), \
+                mock.patch.object(
+                    AutocompleteService, '_build_user_trie', wraps=AutocompleteService._build_user_trie,
+                ) as build:
+            first = FileUploadService.save_file(
+                self.user, SimpleUploadedFile('first.txt', b'Comet tails point away from the sun.'),
+            )
+            self.assertTrue(index_document(first.pk))
+            self.assertEqual(content_phrases(), ['Comet tails point away from the sun.'])
+            self.assertEqual(build.call_count, 1)
+
+            second = FileUploadService.save_file(
+                self.user, SimpleUploadedFile('second.txt', b'Comets shed dust near perihelion. Comet nuclei are icy.'),
+            )
+            self.assertTrue(index_document(second.pk))
+            # Three live phrases, two allowed: rebuilt, not replayed.
+            self.assertEqual(len(content_phrases()), 2)
+            self.assertEqual(build.call_count, 2)
+
+    def test_trie_cache_evicts_least_recently_used(self):
+        from django.test import override_settings
+        from apps.indexer.suggest_cache import TrieCache
+        from apps.indexer.trie import PrefixTrie
+
+        def build(user):
+            trie = PrefixTrie()
+            trie.insert(f'phrase for {user.username}')
+            return trie
+
+        other = User.objects.create_user(username='other', password='TestPass123!')
+        cache = TrieCache()
+        one_trie = build(self.user).estimated_size()
+        with override_settings(AUTOCOMPLETE_CACHE_MAX_BYTES=one_trie + 10):
+            cache.get(self.user, build)
+            cache.get(other, build)
+        self.assertNotIn(self.user.pk, cache)
+        self.assertIn(other.pk, cache)
+        self.assertLessEqual(cache.total_bytes, one_trie + 10)
+
+    def test_autocomplete_answers_partially_while_trie_builds(self):
+        import threading
+        from unittest import mock
+        from apps.indexer import suggest_cache
+        from apps.indexer.services import AutocompleteService
+        from apps.indexer.trie import PrefixTrie
+        from apps.upload.models import UploadedFile
+
+        UploadedFile.objects.create(
+            uploaded_by=self.user,
+            file=SimpleUploadedFile('orbit-notes.txt', b'x'),
+            original_filename='orbit-notes.txt',
+            file_type='txt',
+            file_size=1,
+        )
+        release = threading.Event()
+
+        def slow_build(user):
+            release.wait(5)
+            trie = PrefixTrie()
+            trie.insert('orbital mechanics primer', weight=2.0)
+            return trie
+
+        cache = suggest_cache.TrieCache()
+        with mock.patch.object(suggest_cache, '_cache', cache), \
+                mock.patch.object(AutocompleteService, '_build_user_trie', staticmethod(slow_build)):
+            partial = AutocompleteService.get_suggestions(self.user, 'orb', timeout=0.01)
+            self.assertEqual(partial, ['orbit notes'])
+
+            release.set()
+            full = AutocompleteService.get_suggestions(self.user, 'orb', timeout=5)
+            self.assertEqual(full, ['orbital mechanics primer'])
+
+    def test_compact_trie_matches_prefix_trie(self):
+        from apps.indexer.trie import CompactTrie, PrefixTrie
+
+        phrases = [
+            ('Machine Learning', 3.0), ('machine vision', 2.0), ('macro economics', 2.0),
+            ('map reduce', 1.0), ('ma', 5.0), ('machine learning', 1.0), ('x', 9.0),
+        ]
+        prefix_trie = PrefixTrie(max_node_suggestions=3)
+        for phrase, weight in phrases:
+            prefix_trie.insert(phrase, weight=weight)
+        compact = CompactTrie.from_phrases(phrases, max_node_suggestions=3)
+
+        self.assertEqual(len(compact), 5)
+        for prefix in ('m', 'ma', 'mac', 'machine ', 'machine l', 'map', 'mx', 'macro economicsx'):
+            self.assertEqual(
+                [p.lower() for p in compact.suggest(prefix)],
+                [p.lower() for p in prefix_trie.suggest(prefix)],
+                prefix,
+            )
+        self.assertEqual(compact.suggest('mach', limit=1), ['Machine Learning'])
+
+    def test_cold_cache_maps_snapshot_and_replays_deltas(self):
+        from django.test import override_settings
+        from apps.indexer import trie_store
+        from apps.indexer.services import AutocompleteService
+        from apps.indexer.suggest_cache import TrieCache
+        from apps.upload.services import FileUploadService
+
+        def no_rebuild(user):
+            raise AssertionError('cold cache should not rebuild from the database')
+
+        uploaded = FileUploadService.save_file(
+            self.user, SimpleUploadedFile('comet-tails.txt', b'Comet tails point away.'),
+        )
+        with override_settings(AUTOCOMPLETE_VERSION_CHECK_INTERVAL=0):
+            warm = TrieCache()
+            warm.get(self.user, AutocompleteService._build_user_trie)
+
+            cold = TrieCache()
+            mapped = cold.get(self.user, no_rebuild)
+            self.assertIsInstance(mapped, trie_store.MappedTrie)
+            self.assertEqual(mapped.suggest('com'), ['comet tails'])
+
+            FileUploadService.rename_file(uploaded, 'asteroid-belt.txt')
+            trie = cold.get(self.user, no_rebuild)
+            self.assertEqual(trie.suggest('ast'), ['asteroid belt'])
+            self.assertEqual(trie.suggest('com'), [])
+
+    def test_word_completions_follow_indexed_vocabulary(self):
+        from apps.indexer.models import VocabularyTerm
+        from apps.indexer.services import AutocompleteService, IndexerService
+
+        first = self._create_indexed_file('planets.txt', b'Planets orbit planets. Planetary rings shimmer.')
+        self._create_indexed_file('moons.txt', b'Moons orbit planets quietly.')
+
+        planets = VocabularyTerm.objects.get(user=self.user, word='planets')
+        self.assertEqual((planets.document_frequency, planets.occurrences), (2, 3))
+        self.assertEqual(
+            AutocompleteService.get_word_completions(self.user, 'pla'),
+            ['planets', 'planetary'],
+        )
+        self.assertEqual(
+            AutocompleteService.get_word_completions(self.user, 'moons orb'),
+            ['moons orbit'],
+        )
+
+        IndexerService.delete_document_index(self.user, first.pk)
+        self.assertEqual(AutocompleteService.get_word_completions(self.user, 'pla'), ['planets'])
+        planets.refresh_from_db()
+        self.assertEqual((planets.document_frequency, planets.occurrences), (1, 1))
+
+    def test_parallel_tokenization_matches_serial(self):
+        from django.test import override_settings
+        from apps.indexer import tokenizer
+
+        paragraphs = [
+            f'Paragraph {i}: indexing engines rank running documents. '
+            f'Searchers searched and searching {"quickly " * (i % 3)}again.'
+            for i in range(40)
+        ]
+        text = '\n\n'.join(paragraphs)
+
+        spans = tokenizer._split_spans(text, 7)
+        self.assertEqual(''.join(spans), text)
+        self.assertGreater(len(spans), 1)
+
+        serial = tokenizer.tokenize_with_positions(text)
+        with override_settings(TOKENIZER_WORKERS=2, TOKENIZER_PARALLEL_MIN_CHARS=0):
+            parallel = tokenizer.tokenize_with_positions(text)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(serial['search']['original'], 'searched')
+
+    def test_regex_tokenizer_matches_nltk(self):
+        import random
+        from django.test import override_settings
+        from apps.indexer import tokenizer
+
+        samples = [
+            "It's 3.5 p.m. -- Dr. Smith can't (or won't) say \"why\"; gonna ask?",
+            'Mr. Jones arrived.\n\'Really?\' she said. "Yes."\t[See e.g. U.S. law.]',
+            "State-of-the-art naïve café «résumés» — l'hôtel, rock'n'roll, y'all.",
+            'The end. "',
+        ]
+        pieces = [
+            'end.', 'dr.', "isn't", 'cannot', 'wanna', '"', "'", "''", '``', '(',
+            ')', '.)', '."', '...', '--', '”', '’', '«', '»', 'a.b', 'x-ray', '3rd',
+        ]
+        rng = random.Random(0)
+        for _ in range(300):
+            samples.append(''.join(
+                rng.choice(pieces + ['word', 'Zed']) + rng.choice([' ', ' ', '\n', '', '\t'])
+                for _ in range(rng.randint(1, 15))
+            ))
+
+        for text in samples:
+            with override_settings(TOKENIZER_BACKEND='nltk'):
+                expected = tokenizer.tokenize_with_positions(text)
+            with override_settings(TOKENIZER_BACKEND='regex'):
+                self.assertEqual(tokenizer.tokenize_with_positions(text), expected, text)
+
+    def test_analyze_returns_terms_and_sentence_offsets(self):
+        from django.test import override_settings
+        from nltk.tokenize import sent_tokenize
+        from apps.indexer import tokenizer
+
+        text = '\n\n'.join(
+            f'Chapter {i} opens here.  The indexer reads   every page.\n'
+            f'Searchers searched the "corpus" quickly. Done.'
+            for i in range(30)
+        )
+
+        analysis = tokenizer.analyze(text)
+        self.assertEqual(analysis.terms, tokenizer.tokenize_with_positions(text))
+        self.assertEqual(analysis.token_count, sum(len(d['positions']) for d in analysis.terms.values()))
+        self.assertEqual([text[start:end] for start, end, _ in analysis.sentences], sent_tokenize(text))
+
+        # Each sentence's first token position counts the tokens before it.
+        start, end, first = analysis.sentences[5]
+        self.assertEqual(first, len(tokenizer.tokenize(text[:start])))
+
+        with override_settings(TOKENIZER_WORKERS=2, TOKENIZER_PARALLEL_MIN_CHARS=0):
+            parallel = tokenizer.analyze(text)
+        self.assertEqual(parallel.terms, analysis.terms)
+        self.assertEqual(parallel.sentences, analysis.sentences)
+        self.assertEqual(parallel.token_count, analysis.token_count)
+
+    def test_streamed_text_file_analysis_matches_whole_text(self):
+        from unittest import mock
+        from django.test import override_settings
+        from apps.indexer import extractor, tokenizer
+
+        text = '\n\n'.join(
+            f'Section {i} describes indexing. Searchers searched {"every " * (i % 4)}page again.'
+            for i in range(200)
+        )
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as tmp:
+            tmp.write(text)
+            tmp_path = tmp.name
+
+        try:
+            uploaded_file = SimpleNamespace(id=1, file_type='txt', file=SimpleNamespace(path=tmp_path))
+            # In-process, so the patched chunk size applies.
+            with mock.patch.object(extractor, 'TEXT_CHUNK_CHARS', 1000), \
+                    override_settings(EXTRACTOR_SANDBOX=False):
+                chunks = list(extractor.iter_text(uploaded_file))
+        finally:
+            os.remove(tmp_path)
+
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(chunk) <= 2000 for chunk in chunks))
+        self.assertEqual(''.join(chunks), text)
+
+        streamed_sentences = []
+        analyzer = tokenizer.StreamAnalyzer(
+            on_sentences=lambda chunk, sentences: streamed_sentences.extend(
+                (chunk[start:end], first) for start, end, first in sentences
+            ),
+        )
+        for chunk in chunks:
+            analyzer.feed(chunk)
+        streamed = analyzer.close()
+
+        whole = tokenizer.analyze(text)
+        self.assertEqual(streamed.terms, whole.terms)
+        self.assertEqual(streamed.token_count, whole.token_count)
+        self.assertEqual(
+            streamed_sentences,
+            [(text[start:end], first) for start, end, first in whole.sentences],
+        )
+
+    def test_pdf_pages_that_fail_are_recorded_and_the_rest_indexed(self):
+        from django.test import override_settings
+        from apps.indexer import sandbox
+        from apps.indexer.models import ExtractionFailure, InvertedIndex
+        from apps.indexer.tokenizer import tokenize
+
+        pdf = _make_pdf(['Glaciers carve valleys slowly.', None, 'Volcanoes build islands.'])
+        expected = {tokenize('glaciers')[0], tokenize('volcanoes')[0]}
+
+        for workers in (0, 2):
+            with self.subTest(workers=workers), override_settings(PDF_EXTRACT_WORKERS=workers):
+                uploaded = self._create_indexed_file(f'survey{workers}.pdf', pdf, file_type='pdf')
+                terms = set(InvertedIndex.objects.filter(document=uploaded).values_list('term__text', flat=True))
+                self.assertTrue(expected <= terms)
+                failures = ExtractionFailure.objects.filter(document=uploaded)
+                self.assertEqual([f.page for f in failures], [2])
+
+        # Out of time before even the page count (which runs in a worker,
+        # under the same limits): the whole document is given up on, counted
+        # as a timeout, and the file is still processed.
+        timeouts = sandbox.stats().get('pdf', {}).get('timeouts', 0)
+        with override_settings(PDF_EXTRACT_WORKERS=2, PDF_DOCUMENT_TIMEOUT=0):
+            uploaded = self._create_indexed_file('late.pdf', pdf, file_type='pdf')
+        self.assertEqual(uploaded.status, 'processed')
+        self.assertFalse(InvertedIndex.objects.filter(document=uploaded).exists())
+        failures = ExtractionFailure.objects.filter(document=uploaded)
+        self.assertEqual([f.page for f in failures], [None])
+        self.assertIn('page count timed out', failures[0].reason)
+        self.assertEqual(sandbox.stats()['pdf']['timeouts'] - timeouts, 1)
+
+    def test_sandboxed_extraction_matches_in_process_and_counts_outcomes(self):
+        from django.test import override_settings
+        from apps.indexer import extractor, sandbox
+
+        text = '\n\n'.join(f'Paragraph {i} about sandboxed extraction.' for i in range(50))
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as tmp:
+            tmp.write(text)
+            tmp_path = tmp.name
+        uploaded_file = SimpleNamespace(id=1, file_type='txt', file=SimpleNamespace(path=tmp_path))
+
+        try:
+            before = sandbox.stats().get('txt', dict.fromkeys(sandbox.OUTCOMES, 0))
+            failures = []
+            with override_settings(EXTRACTOR_SANDBOX=True):
+                # Twice: the second job reuses the worker.
+                for _ in range(2):
+                    self.assertEqual(''.join(extractor.iter_text(uploaded_file, failures)), text)
+            self.assertEqual(failures, [])
+            with override_settings(EXTRACTOR_SANDBOX=False):
+                self.assertEqual(extractor.extract_text(uploaded_file), text)
+        finally:
+            os.remove(tmp_path)
+
+        after = sandbox.stats()['txt']
+        self.assertEqual(after['jobs'] - before['jobs'], 2)
+        self.assertEqual(after['crashes'], before['crashes'])
+
+        # A worker blocked for longer than EXTRACTOR_TIMEOUT (here: opening a
+        # FIFO nobody writes to) is killed and the document recorded as failed.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fifo = os.path.join(tmp_dir, 'blocked.txt')
+            os.mkfifo(fifo)
+            blocked = SimpleNamespace(id=2, file_type='txt', file=SimpleNamespace(path=fifo))
+            failures = []
+            with override_settings(EXTRACTOR_SANDBOX=True, EXTRACTOR_TIMEOUT=0.5):
+                self.assertEqual(list(extractor.iter_text(blocked, failures)), [])
+        self.assertEqual(len(failures), 1)
+        self.assertIsNone(failures[0][0])
+        self.assertIn('timed out', failures[0][1])
+        self.assertEqual(sandbox.stats()['txt']['timeouts'] - before['timeouts'], 1)
+
+    def test_ocr_preprocesses_tiles_and_caches_results(self):
+        import sys
+        from pathlib import Path
+        from django.test import override_settings
+        from PIL import Image, ImageDraw
+        from apps.indexer import extractor
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Stand-in for the tesseract binary: logs the size and options of
+            # every image it is given.
+            calls_log = os.path.join(tmp_dir, 'calls.log')
+            fake = os.path.join(tmp_dir, 'tesseract')
+            with open(fake, 'w') as fh:
+                fh.write(
+                    f'#!{sys.executable}\n'
+                    'import sys\n'
+                    'from PIL import Image\n'
+                    'if sys.argv[1] == "--version":\n'
+                    '    print("tesseract 5.3.0-fake"); sys.exit()\n'
+                    'image = Image.open(sys.argv[1])\n'
+                    f'with open({calls_log!r}, "a") as log:\n'
+                    '    log.write(f"{image.width}x{image.height} {image.mode} {sys.argv[3:]}\\n")\n'
+                    'with open(sys.argv[2] + ".txt", "w") as out:\n'
+                    '    out.write("Lighthouse keepers record tides\\n")\n'
+                )
+            os.chmod(fake, 0o755)
+
+            def calls():
+                if not os.path.exists(calls_log):
+                    return []
+                with open(calls_log) as fh:
+                    return fh.read().splitlines()
+
+            # 600 dpi scan with three text bands separated by white space.
+            path = os.path.join(tmp_dir, 'scan.png')
+            image = Image.new('RGB', (400, 600), 'white')
+            draw = ImageDraw.Draw(image)
+            for top in (40, 240, 440):
+                draw.rectangle((20, top, 380, top + 100), fill='black')
+            image.save(path, dpi=(600, 600))
+            uploaded_file = SimpleNamespace(id=1, file_type='png', file=SimpleNamespace(path=path))
+
+            ocr_settings = dict(
+                EXTRACTOR_SANDBOX=False,
+                OCR_TESSERACT_CMD=fake,
+                OCR_CACHE_DIR=os.path.join(tmp_dir, 'cache'),
+                OCR_TARGET_DPI=300,
+                OCR_TILE_PIXELS=20_000,
+                OCR_WORKERS=2,
+            )
+            with override_settings(**ocr_settings):
+                text = extractor.extract_text(uploaded_file)
+            self.assertIn('Lighthouse keepers record tides', text)
+
+            # Downscaled to 200×300 at 300 dpi, binarized, cut into strips
+            # on blank rows (the strips' heights add up to the image's).
+            first = calls()
+            self.assertGreater(len(first), 1)
+            self.assertEqual(sum(int(line.split()[0].split('x')[1]) for line in first), 300)
+            self.assertTrue(all(line.startswith('200x') and ' 1 ' in line for line in first))
+            self.assertTrue(all("'--dpi', '300'" in line for line in first))
+
+            # Same image again (a re-upload or reindex): served from the cache.
+            with override_settings(**ocr_settings):
+                self.assertEqual(extractor.extract_text(uploaded_file), text)
+            self.assertEqual(calls(), first)
+
+            # A different engine configuration OCRs afresh.
+            with override_settings(**ocr_settings, OCR_BINARIZE=False):
+                extractor.extract_text(uploaded_file)
+            self.assertGreater(len(calls()), len(first))
+
+            # Past OCR_CACHE_MAX_BYTES the least recently used entries go.
+            def entries():
+                return sorted(Path(ocr_settings['OCR_CACHE_DIR']).glob('*/*.txt'))
+
+            self.assertEqual(len(entries()), 2)
+            budget = max(path.stat().st_size for path in entries())
+            with override_settings(**ocr_settings, OCR_LANG='deu', OCR_CACHE_MAX_BYTES=budget):
+                extractor.extract_text(uploaded_file)
+            self.assertEqual(len(entries()), 1)
+            self.assertIn("'deu'", calls()[-1])
+
+    def test_reindex_replays_cached_extraction(self):
+        from unittest import mock
+        from apps.indexer import extractor, text_cache
+        from apps.indexer.models import DocumentPhrase, ExtractedText, InvertedIndex
+        from apps.indexer.pipeline import reindex_user_corpus
+        from apps.upload.services import FileUploadService
+
+        def snapshot(uploaded):
+            return (
+                sorted(InvertedIndex.objects.filter(document=uploaded).values_list('term__text', 'positions')),
+                list(DocumentPhrase.objects.filter(document=uploaded).values_list('phrase', flat=True)),
+            )
+
+        pdf = _make_pdf(['Glaciers carve valleys', 'slowly over millennia.', 'Volcanoes build islands.'])
+        uploaded = self._create_indexed_file('glaciers.pdf', pdf, file_type='pdf')
+        indexed = snapshot(uploaded)
+        cached = ExtractedText.objects.get()
+        self.assertEqual(cached.file_type, 'pdf')
+        self.assertEqual(cached.extractor_version, extractor.EXTRACTOR_VERSION)
+
+        # Same bytes uploaded again, then the whole corpus re-scored: no
+        # extraction runs, and the index is identical.
+        with mock.patch.object(extractor, 'iter_text', side_effect=AssertionError('extracted')):
+            copy = self._create_indexed_file('glaciers-copy.pdf', pdf, file_type='pdf')
+            self.assertEqual(reindex_user_corpus(self.user), {'reindexed': 2, 'failed': 0})
+        self.assertEqual(snapshot(uploaded), indexed)
+        self.assertEqual(snapshot(copy), indexed)
+
+        # Partial extractions are not cached.
+        self._create_indexed_file('broken.pdf', _make_pdf(['Fjords.', None]), file_type='pdf')
+        self.assertEqual(ExtractedText.objects.count(), 1)
+
+        # The entry goes with the last live file holding those bytes...
+        type(uploaded).objects.filter(pk__in=[uploaded.pk, copy.pk]).update(content_hash=cached.content_hash)
+        uploaded.refresh_from_db()
+        copy.refresh_from_db()
+        FileUploadService.delete_file(uploaded)
+        self.assertTrue(ExtractedText.objects.exists())
+        FileUploadService.delete_file(copy)
+        self.assertFalse(ExtractedText.objects.exists())
+
+        # ...and entries of older extractor versions are pruned.
+        ExtractedText.objects.create(
+            content_hash=cached.content_hash, file_type='pdf',
+            extractor_version=extractor.EXTRACTOR_VERSION - 1, text=cached.text,
+        )
+        self.assertEqual(text_cache.prune_stale(), 1)
+
+    def test_reupload_copies_the_index_of_the_identical_file(self):
+        from unittest import mock
+        from django.core.management import call_command
+        from apps.indexer import text_cache
+        from apps.indexer.models import DocumentPhrase, InvertedIndex, TermStatistic
+        from apps.indexer.pipeline import index_document
+        from apps.upload.services import FileUploadService
+
+        content = b'Lighthouses guide ships home. Keepers trim the lamps every night.'
+        original = FileUploadService.save_file(self.user, SimpleUploadedFile('light.txt', content))
+        self.assertTrue(index_document(original.pk))
+
+        copy = FileUploadService.save_file(self.user, SimpleUploadedFile('light-again.txt', content))
+        self.assertEqual(copy.content_hash, original.content_hash)
+        with mock.patch.object(text_cache, 'iter_text', side_effect=AssertionError('extracted')):
+            self.assertTrue(index_document(copy.pk))
+        copy.refresh_from_db()
+        self.assertEqual(copy.duplicate_of, original)
+
+        def postings(uploaded):
+            return sorted(
+                InvertedIndex.objects.filter(document=uploaded)
+                .values_list('term', 'original_term', 'term_frequency', 'positions')
+            )
+
+        self.assertEqual(postings(copy), postings(original))
+        self.assertEqual(
+            list(DocumentPhrase.objects.filter(document=copy).values_list('phrase', 'position')),
+            list(DocumentPhrase.objects.filter(document=original).values_list('phrase', 'position')),
+        )
+        self.assertEqual(
+            set(TermStatistic.objects.filter(user=self.user).values_list('document_frequency', flat=True)),
+            {2},
+        )
+
+        out = StringIO()
+        call_command('dedup_stats', '--user', self.user.username, stdout=out)
+        total = out.getvalue().splitlines()[-1].split()
+        self.assertEqual(total[:4], ['total', '2', '1', '50.0%'])
+
+    def test_positions_are_stored_packed(self):
+        from array import array
+        from django.db import connection
+        from apps.indexer.models import InvertedIndex
+        from apps.indexer.postings import PositionCount, count_positions, decode_positions, encode_positions
+
+        for positions in ([], [0], [3, 7, 255], [1, 300, 301], [5, 70_000, 70_001], list(range(0, 10**6, 997))):
+            packed = encode_positions(positions)
+            self.assertEqual(decode_positions(packed), array('I', positions))
+            self.assertEqual(count_positions(packed), len(positions))
+        self.assertEqual(len(encode_positions([3, 7, 255])), 4)  # one byte per gap
+
+        uploaded = self._create_indexed_file('tides.txt', b'Tides rise. Tides fall. Tides rise again and again.')
+        row = (
+            InvertedIndex.objects.filter(document=uploaded, term__text='tide')
+            .annotate(n=PositionCount('positions')).get()
+        )
+        self.assertEqual(row.positions, array('I', [0, 2, 4]))
+        self.assertEqual(row.n, 3)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT octet_length(positions) FROM indexer_invertedindex WHERE id = %s', [row.pk])
+            self.assertEqual(cursor.fetchone()[0], 4)
+
+    def test_postings_reference_the_term_dictionary(self):
+        from apps.indexer import lexicon
+        from apps.indexer.models import InvertedIndex, Term
+        from apps.indexer.services import IndexerService
+
+        first = self._create_indexed_file('comets.txt', b'Comets orbit the sun.')
+        second = self._create_indexed_file('orbits.txt', b'Planets orbit the sun too.')
+
+        # One dictionary row per distinct string, shared by both documents.
+        self.assertEqual(Term.objects.filter(text='orbit').count(), 1)
+        self.assertEqual(
+            InvertedIndex.objects.filter(term__text='orbit').values('term_id').distinct().count(), 1,
+        )
+        row = InvertedIndex.objects.select_related('term', 'original_term').get(document=first, term__text='comet')
+        self.assertEqual(row.original_term.text, 'comets')
+
+        orbit = Term.objects.get(text='orbit').pk
+        self.assertEqual(lexicon.lookup(['orbit', 'nebula']), {'orbit': orbit})
+        ids = lexicon.resolve(['orbit', 'nebula'])
+        self.assertEqual(ids['orbit'], orbit)
+        self.assertTrue(Term.objects.filter(pk=ids['nebula'], text='nebula').exists())
+
+        results = IndexerService.search(self.user, 'orbiting sun', limit=10)
+        self.assertEqual({r['file_id'] for r in results}, {first.pk, second.pk})
+        # An unknown term is answered from the dictionary alone.
+        with self.assertNumQueries(1):
+            self.assertEqual(IndexerService.search(self.user, 'quasar'), [])
+
+    def test_search_is_an_index_only_scan_without_join(self):
+        from django.db import connection
+        from apps.indexer import lexicon
+        from apps.indexer.models import DocumentPhrase, InvertedIndex
+        from apps.indexer.services import IndexerService
+        from apps.indexer.pipeline import sync_deleted_flag
+        from apps.upload.services import FileUploadService
+
+        kept = self._create_indexed_file('kept.txt', b'Meteors streak across the night sky.')
+        gone = self._create_indexed_file('gone.txt', b'Meteors burn up in the atmosphere.')
+        self.assertEqual(
+            set(InvertedIndex.objects.filter(document=kept).values_list('user_id', 'deleted')),
+            {(self.user.pk, False)},
+        )
+
+        FileUploadService.delete_file(gone)
+        self.assertFalse(DocumentPhrase.objects.filter(document=gone, deleted=False).exists())
+        self.assertEqual([r['file_id'] for r in IndexerService.search(self.user, 'meteor')], [kept.pk])
+        gone.deleted_at = None
+        sync_deleted_flag(gone)
+        self.assertTrue(DocumentPhrase.objects.filter(document=gone, deleted=False).exists())
+
+        term_ids = lexicon.lookup(['meteor', 'sky'])
+        for query_idf in ({'meteor': 1.0, 'sky': 2.0}, None):
+            with self.subTest(query_idf=query_idf):
+                # Test tables are tiny; make the planner show its indexed plan.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('SET LOCAL enable_bitmapscan = off')
+                plan = IndexerService._ranking_queryset(self.user, term_ids, query_idf).explain()
+                self.assertIn('Index Only Scan using indexer_inv_user_term_idx', plan)
+                self.assertNotIn('upload_uploadedfile', plan)
+
+    def test_partitioned_index_rebuilds_a_dedicated_user_by_truncation(self):
+        from unittest import mock
+        from apps.indexer import partitions
+        from apps.indexer.models import CorpusStatistic, InvertedIndex, TermStatistic
+        from apps.indexer.pipeline import reindex_user_corpus
+        from apps.indexer.services import IndexerService
+
+        partitions.partition(2)
+        self.assertTrue(partitions.is_partitioned())
+        self.assertEqual(len(partitions.describe()), 2)
+
+        first = self._create_indexed_file('moons.txt', b'Moons orbit planets. Moons are cold.')
+        second = self._create_indexed_file('rings.txt', b'Rings orbit planets too.')
+        other_user = User.objects.create_user(username='otherindexer', password='TestPass123!')
+        owner, self.user = self.user, other_user
+        self._create_indexed_file('other.txt', b'Moons of other planets.')
+        self.user = owner
+
+        before = IndexerService.search(self.user, 'moon orbit')
+        stats = (CorpusStatistic.objects.get(user=self.user).total_documents,
+                 dict(TermStatistic.objects.filter(user=self.user).values_list('term', 'document_frequency')))
+
+        name = partitions.dedicate(self.user.pk)
+        self.assertIn(name, [leaf['name'] for leaf in partitions.describe()])
+        with mock.patch.object(partitions, 'truncate_user', wraps=partitions.truncate_user) as truncate:
+            self.assertEqual(reindex_user_corpus(self.user), {'reindexed': 2, 'failed': 0})
+        truncate.assert_called_once_with(self.user.pk)
+        self.assertFalse(partitions.truncate_user(other_user.pk))  # hash-partitioned: not truncated
+
+        self.assertEqual(
+            (CorpusStatistic.objects.get(user=self.user).total_documents,
+             dict(TermStatistic.objects.filter(user=self.user).values_list('term', 'document_frequency'))),
+            stats,
+        )
+        self.assertEqual(IndexerService.search(self.user, 'moon orbit'), before)
+        self.assertEqual(
+            {r['file_id'] for r in IndexerService.search(other_user, 'moon')},
+            set(InvertedIndex.objects.filter(user=other_user).values_list('document_id', flat=True)),
+        )
+
+        rows = InvertedIndex.objects.count()
+        partitions.unpartition()
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(InvertedIndex.objects.count(), rows)
+        self.assertEqual([r['file_id'] for r in IndexerService.search(self.user, 'moon')], [first.pk])
+        self.assertTrue(InvertedIndex.objects.filter(document=second).exists())
+
+    def test_copy_loader_matches_bulk_create_and_upserts(self):
+        from django.test import override_settings
+        from apps.indexer import bulk_load
+        from apps.indexer.models import DocumentPhrase, InvertedIndex
+
+        text = b'Glaciers carve valleys. Glaciers retreat slowly, carving fjords.'
+        copied = self._create_indexed_file('copy.txt', text)
+        with override_settings(INDEXER_COPY_LOADER=False):
+            created = self._create_indexed_file('orm.txt', text + b' ')
+
+        def postings(document):
+            return sorted(
+                (r.term_id, r.original_term_id, r.term_frequency, r.document_frequency > 0,
+                 list(r.positions), r.user_id, r.deleted)
+                for r in InvertedIndex.objects.filter(document=document)
+            )
+
+        self.assertTrue(postings(copied))
+        self.assertEqual(postings(copied), postings(created))
+
+        # Loading the same (document, term) again updates the row in place.
+        row = InvertedIndex.objects.filter(document=copied).first()
+        row.term_frequency, row.positions = 0.5, [1, 40_000]
+        row.pk = None
+        self.assertEqual(bulk_load.load_postings([row]), 1)
+        self.assertEqual(InvertedIndex.objects.filter(document=copied).count(), len(postings(created)))
+        stored = InvertedIndex.objects.get(document=copied, term=row.term_id)
+        self.assertEqual((stored.term_frequency, list(stored.positions)), (0.5, [1, 40_000]))
+
+        # Phrase text survives COPY's escaping.
+        phrase = 'tab\there, back\\slash and\nnewline'
+        bulk_load.load_phrases([DocumentPhrase(document=copied, user=self.user, phrase=phrase, position=99)])
+        self.assertEqual(DocumentPhrase.objects.get(document=copied, position=99).phrase, phrase)
+
+    def test_two_phase_rebuild_writes_exact_statistics_once_per_content(self):
+        from collections import Counter
+        from unittest import mock
+        from django.core.management import call_command
+        from apps.indexer import corpus, pipeline
+        from apps.indexer.models import CorpusStatistic, InvertedIndex, TermStatistic, VocabularyTerm
+        from apps.indexer.postings import PositionCount
+        from apps.indexer.services import IndexerService
+
+        texts = [
+            b'Volcanoes erupt lava. Lava cools into basalt.',
+            b'Basalt columns form when lava cools slowly.',
+            b'Geysers erupt hot water, not lava.',
+        ]
+        files = [self._create_indexed_file(f'geo{i}.txt', text) for i, text in enumerate(texts)]
+        # Re-uploaded bytes: analyzed once, indexed for both files.
+        copy = self._create_indexed_file('geo0-copy.txt', texts[0] + b'\n')
+        type(copy).objects.filter(pk__in=[files[0].pk, copy.pk]).update(content_hash='a' * 64)
+
+        def statistics():
+            return (
+                CorpusStatistic.objects.filter(user=self.user).values_list('total_documents', 'total_tokens').get(),
+                dict(TermStatistic.objects.filter(user=self.user).values_list('term', 'document_frequency')),
+                set(VocabularyTerm.objects.filter(user=self.user)
+                    .values_list('word', 'document_frequency', 'occurrences')),
+            )
+
+        before = statistics()
+        with mock.patch.object(pipeline, '_analyze_for_rebuild', wraps=pipeline._analyze_for_rebuild) as analyze:
+            call_command(
+                'reindex', '--all', '--rebuild', '--workers', '1', '--user', self.user.username,
+                stdout=StringIO(),
+            )
+        self.assertEqual(analyze.call_count, 4 - 1)
+        # Incrementally maintained statistics were already exact.
+        self.assertEqual(statistics(), before)
+
+        rows = list(
+            InvertedIndex.objects.filter(user=self.user)
+            .annotate(n=PositionCount('positions'))
+            .values_list('document_id', 'term__text', 'document_frequency', 'tf_idf', 'term_frequency', 'n')
+        )
+        self.assertEqual({document for document, *_ in rows}, {f.pk for f in [*files, copy]})
+        df = Counter(term for _, term, *_ in rows)
+        total_documents = len(files) + 1
+        for _, term, document_frequency, tf_idf, tf, _ in rows:
+            self.assertEqual(document_frequency, df[term])
+            self.assertAlmostEqual(tf_idf, tf * corpus.smoothed_idf(df[term], total_documents))
+        self.assertEqual(sum(n for *_, n in rows), before[0][1])
+
+        self.assertEqual(
+            {r['file_id'] for r in IndexerService.search(self.user, 'basalt', limit=10)},
+            {files[0].pk, files[1].pk, copy.pk},
+        )
+
+    def test_rebuild_keeps_rows_of_files_that_fail_analysis(self):
+        from unittest import mock
+        from apps.indexer import pipeline
+        from apps.indexer.models import CorpusStatistic, DocumentPhrase, InvertedIndex, TermStatistic
+
+        kept = self._create_indexed_file('kept.txt', b'Glaciers carve fjords. Fjords fill with seawater.')
+        rebuilt = self._create_indexed_file('rebuilt.txt', b'Glaciers retreat as the climate warms.')
+        kept_rows = set(InvertedIndex.objects.filter(document=kept).values_list('term__text', 'indexed_at'))
+        before = dict(TermStatistic.objects.filter(user=self.user).values_list('term', 'document_frequency'))
+
+        analyze = pipeline._analyze_for_rebuild
+        with mock.patch.object(
+            pipeline, '_analyze_for_rebuild', lambda f: None if f.pk == kept.pk else analyze(f),
+        ):
+            stats = pipeline.rebuild_user_corpus(self.user, workers=1)
+
+        self.assertEqual(stats, {'reindexed': 1, 'failed': 1})
+        kept.refresh_from_db()
+        self.assertEqual(kept.status, 'processed')
+        self.assertEqual(
+            set(InvertedIndex.objects.filter(document=kept).values_list('term__text', 'indexed_at')), kept_rows,
+        )
+        self.assertTrue(DocumentPhrase.objects.filter(document=kept).exists())
+        self.assertTrue(InvertedIndex.objects.filter(document=rebuilt).exists())
+        # The kept document still counts towards the corpus.
+        self.assertEqual(CorpusStatistic.objects.get(user=self.user).total_documents, 2)
+        self.assertEqual(
+            dict(TermStatistic.objects.filter(user=self.user).values_list('term', 'document_frequency')), before,
+        )
+
+    def test_failed_reindex_keeps_the_previous_index(self):
+        from unittest import mock
+        from apps.indexer import bulk_load
+        from apps.indexer.models import CorpusStatistic, DocumentPhrase, InvertedIndex
+        from apps.indexer.pipeline import index_document
+
+        uploaded = self._create_indexed_file('tides.txt', b'Spring tides follow the full moon.')
+        rows = InvertedIndex.objects.filter(document=uploaded).count()
+        totals = CorpusStatistic.objects.filter(user=self.user).values_list('total_documents', 'total_tokens').get()
+
+        type(uploaded).objects.filter(pk=uploaded.pk).update(status='pending')
+        with mock.patch.object(bulk_load, 'load_postings', side_effect=RuntimeError('disk full')):
+            self.assertFalse(index_document(uploaded.pk))
+
+        self.assertEqual(InvertedIndex.objects.filter(document=uploaded).count(), rows)
+        self.assertTrue(DocumentPhrase.objects.filter(document=uploaded).exists())
+        self.assertEqual(
+            CorpusStatistic.objects.filter(user=self.user).values_list('total_documents', 'total_tokens').get(),
+            totals,
+        )
+
+class IndexWorkerTestCase(TransactionTestCase):
+    """The worker command runs against committed data, like a separate process."""
+
+    def test_upload_enqueues_and_worker_indexes(self):
+        from django.core.management import call_command
+        from apps.upload.models import UploadedFile
+        from apps.upload.services import FileUploadService
+
+        user = User.objects.create_user(username='worker', password='TestPass123!')
+        uploaded = FileUploadService.save_file(
+            user, SimpleUploadedFile('worker.txt', b'durable queue indexing'),
+        )
+        self.assertEqual(uploaded.indexing_jobs.get().status, 'queued')
+
+        call_command('index_worker', '--burst', '--concurrency', '2', stdout=StringIO())
+
+        self.assertEqual(UploadedFile.objects.get(pk=uploaded.pk).status, 'processed')
+        self.assertEqual(uploaded.indexing_jobs.get().status, 'done')
+
+    def test_running_job_renews_its_lock(self):
+        import time
+        from unittest import mock
+        from django.core.management import call_command
+        from apps.indexer import jobs
+        from apps.indexer.pipeline import index_document
+        from apps.upload.services import FileUploadService
+
+        user = User.objects.create_user(username='slowworker', password='TestPass123!')
+        uploaded = FileUploadService.save_file(user, SimpleUploadedFile('slow.txt', b'slow ocr job'))
+        claims = []
+
+        def slow_index(file_id):
+            # Outlive the visibility timeout; the heartbeat keeps the lock fresh.
+            time.sleep(1.5)
+            claims.append(jobs.claim('intruder', visibility_timeout=1, max_attempts=5))
+            return index_document(file_id)
+
+        with mock.patch('apps.indexer.management.commands.index_worker.index_document', slow_index):
+            call_command('index_worker', '--burst', '--visibility-timeout', '1', stdout=StringIO())
+
+        self.assertEqual(claims, [None])
+        job = uploaded.indexing_jobs.get()
+        self.assertEqual((job.status, job.attempts), ('done', 1))
+
+
+def _make_pdf(pages: list[str | None]) -> bytes:
+    """A minimal PDF with one line of text per page; None makes a broken page."""
+    objects = [
+        '<< /Type /Catalog /Pages 2 0 R >>',
+        None,
+        '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    kids = []
+    for text in pages:
+        kids.append(len(objects) + 1)
+        resources = '/Resources << /Font << /F1 3 0 R >> >>'
+        if text is None:
+            # Content stream points at an object that does not exist.
+            objects.append(f'<< /Type /Page /Parent 2 0 R {resources} /Contents 999 0 R >>')
+            continue
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'
+        objects.append(f'<< /Type /Page /Parent 2 0 R {resources} /Contents {len(objects) + 2} 0 R >>')
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(f"{k} 0 R" for k in kids)}] /Count {len(kids)} >>'
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode()
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    out += b''.join(f'{offset:010d} 00000 n \n'.encode() for offset in offsets)
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
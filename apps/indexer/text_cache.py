@@ -0,0 +1,152 @@
+"""
+Content-addressed cache of extracted document text.
+
+`iter_text(uploaded_file, failures)` is a drop-in for `extractor.iter_text`.
+For file types whose extraction is expensive (PDF, DOCX) it first hashes the
+stored file and looks for an ExtractedText row with that SHA-256, file type
+and `extractor.EXTRACTOR_VERSION`:
+
+  - hit   the stored chunks are decompressed one at a time and yielded —
+          no extraction at all
+  - miss  the file is extracted as usual; the chunks are compressed as they
+          go by and stored once extraction completes without failures
+
+Chunks are stored with their boundaries (each UTF-8 chunk preceded by its
+byte length), because sentences are split within chunks: a cached document
+is tokenized exactly as a freshly extracted one.
+
+So re-indexing a corpus (`manage.py reindex`) costs tokenizing and writing
+only.  A file's entry is dropped when it is deleted and no other live file
+has its bytes (`discard`), and entries of older extractor versions when an
+index worker starts (`prune_stale`).  Text and Markdown files are read
+directly (a cache would only add a copy), and images have their own
+configuration-aware OCR cache (`ocr.py`).  EXTRACTED_TEXT_CACHE=False
+disables the cache.
+"""
+
+import gzip
+import hashlib
+import io
+import logging
+import struct
+from collections.abc import Iterator
+
+from django.conf import settings
+
+from apps.indexer import extractor
+
+logger = logging.getLogger(__name__)
+
+CACHED_TYPES = frozenset({'pdf', 'docx'})
+
+_LENGTH = struct.Struct('<I')
+
+
+def iter_text(uploaded_file, failures: list) -> Iterator[str]:
+    """Yield the text of `uploaded_file` in chunks, as `extractor.iter_text` does."""
+    from apps.indexer.models import ExtractedText
+
+    if uploaded_file.file_type not in CACHED_TYPES or not getattr(settings, 'EXTRACTED_TEXT_CACHE', True):
+        yield from extractor.iter_text(uploaded_file, failures)
+        return
+
+    try:
+        content_hash = uploaded_file.content_hash or file_sha256(uploaded_file.file.path)
+    except OSError:
+        # Let the extractor report the unreadable file.
+        yield from extractor.iter_text(uploaded_file, failures)
+        return
+
+    key = {
+        'content_hash': content_hash,
+        'file_type': uploaded_file.file_type,
+        'extractor_version': extractor.EXTRACTOR_VERSION,
+    }
+    cached = ExtractedText.objects.filter(**key).values_list('text', flat=True).first()
+    if cached is not None:
+        logger.debug('text_cache: hit for file id=%s (%s)', uploaded_file.pk, content_hash[:12])
+        yield from _iter_compressed(bytes(cached))
+        return
+
+    buffer = io.BytesIO()
+    length = 0
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) as gz:
+        for chunk in extractor.iter_text(uploaded_file, failures):
+            data = chunk.encode('utf-8', 'surrogatepass')
+            gz.write(_LENGTH.pack(len(data)))
+            gz.write(data)
+            length += len(chunk)
+            yield chunk
+
+    # Partial extractions (failed or timed-out pages) may succeed next time.
+    if failures or not length:
+        return
+    ExtractedText.objects.filter(
+        content_hash=content_hash, file_type=uploaded_file.file_type,
+    ).exclude(extractor_version=extractor.EXTRACTOR_VERSION).delete()
+    ExtractedText.objects.bulk_create(
+        [ExtractedText(**key, text=buffer.getvalue(), text_length=length)],
+        ignore_conflicts=True,
+    )
+    logger.debug(
+        'text_cache: stored file id=%s (%d chars, %d bytes compressed)',
+        uploaded_file.pk, length, buffer.tell(),
+    )
+
+
+def discard(uploaded_file) -> int:
+    """
+    Delete the cached text of `uploaded_file` (on delete), unless another
+    live file has the same bytes and type.  Returns the number of rows
+    deleted.
+    """
+    from apps.indexer.models import ExtractedText
+    from apps.upload.models import UploadedFile
+
+    if uploaded_file.file_type not in CACHED_TYPES:
+        return 0
+    try:
+        content_hash = uploaded_file.content_hash or file_sha256(uploaded_file.file.path)
+    except OSError:
+        return 0
+
+    still_used = (
+        UploadedFile.objects
+        .filter(content_hash=content_hash, file_type=uploaded_file.file_type, deleted_at=None)
+        .exclude(pk=uploaded_file.pk)
+        .exists()
+    )
+    if still_used:
+        return 0
+    deleted, _ = ExtractedText.objects.filter(content_hash=content_hash, file_type=uploaded_file.file_type).delete()
+    return deleted
+
+
+def prune_stale() -> int:
+    """
+    Delete cached text stored by other `EXTRACTOR_VERSION`s, which is never
+    read again.  Returns the number of rows deleted.
+    """
+    from apps.indexer.models import ExtractedText
+
+    deleted, _ = ExtractedText.objects.exclude(extractor_version=extractor.EXTRACTOR_VERSION).delete()
+    if deleted:
+        logger.info('text_cache: dropped %d entries of older extractor versions', deleted)
+    return deleted
+
+
+def file_sha256(file_path: str) -> str:
+    """Hex SHA-256 of the file at `file_path`, read in blocks."""
+    with open(file_path, 'rb') as fh:
+        return hashlib.file_digest(fh, 'sha256').hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Private helpers
+# ---------------------------------------------------------------------------
+
+def _iter_compressed(blob: bytes) -> Iterator[str]:
+    with gzip.GzipFile(fileobj=io.BytesIO(blob)) as gz:
+        while header := gz.read(_LENGTH.size):
+            (size,) = _LENGTH.unpack(header)
+            yield gz.read(size).decode('utf-8', 'surrogatepass')
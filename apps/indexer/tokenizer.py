@@ -5,15 +5,36 @@ Converts raw text into a cleaned, stemmed list of tokens suitable for
 building an inverted index.
 
 Pipeline:
-  1. Lowercase
-  2. NLTK word_tokenize (handles punctuation and contractions)
-  3. Keep only alphabetic tokens (drop numbers, punctuation)
-  4. Remove English stop-words (NLTK corpus)
-  5. Porter-stem each token
+  1. Sentence splitting (NLTK Punkt, on the original-case text)
+  2. Lowercase each sentence
+  3. Word tokenization (handles punctuation and contractions), by the
+     TOKENIZER_BACKEND:
+       'regex' — default; output identical to NLTK's Treebank tokenizer
+                 (see `_regex_sentence_words`) at a fraction of the cost
+       'nltk'  — NLTK Treebank word tokenizer
+  4. Keep only alphabetic tokens (drop numbers, punctuation)
+  5. Remove English stop-words (NLTK corpus)
+  6. Porter-stem each token (memoized in a bounded LRU —
+     TOKENIZER_STEM_CACHE_SIZE entries — since natural text repeats words)
+
+`analyze()` runs this as one pass over the text's sentences and returns the
+term positions together with each sentence's character offsets, so the
+indexing pipeline builds InvertedIndex and DocumentPhrase rows without
+splitting or scanning the text again.  `StreamAnalyzer` does the same over a
+stream of chunks (PDF pages, ...) so a document is never held whole.
+
+Documents longer than TOKENIZER_PARALLEL_MIN_CHARS are split into spans at
+paragraph (or whitespace) boundaries and tokenized in a process pool of
+TOKENIZER_WORKERS processes; the per-span position maps are merged with each
+span's token offset.  `manage.py bench_tokenizer` reports the throughput.
 """
 
 import logging
+import multiprocessing
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +45,11 @@ logger = logging.getLogger(__name__)
 
 _stopwords = None
 _stemmer = None
+_stem = None
+_treebank = None
+_pool = None
+_pool_backend = None
+_pool_lock = threading.Lock()
 
 
 def _get_stopwords():
@@ -48,6 +74,29 @@ def _get_stemmer():
     return _stemmer
 
 
+def _get_stem():
+    """PorterStemmer.stem behind a bounded LRU memo."""
+    global _stem
+    if _stem is None:
+        _stem = lru_cache(maxsize=_setting('TOKENIZER_STEM_CACHE_SIZE', 100_000))(
+            _get_stemmer().stem
+        )
+    return _stem
+
+
+def _backend() -> str:
+    return _pool_backend or _setting('TOKENIZER_BACKEND', 'regex')
+
+
+def _setting(name: str, default):
+    from django.conf import settings
+    try:
+        return getattr(settings, name, default)
+    except Exception:
+        # Pool workers run without configured Django settings.
+        return default
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
@@ -69,6 +118,114 @@ def tokenize(text: str) -> list[str]:
         return _simple_tokenize(text)
 
 
+class Analysis:
+    """
+    Result of `analyze()`.
+
+    terms        {stemmed: {'positions': [...], 'original': str}}, as returned
+                 by `tokenize_with_positions()`
+    sentences    [(start, end, first_token), ...] — character offsets of each
+                 sentence in the analysed text, and the position of the first
+                 token at or after its start (empty from StreamAnalyzer)
+    token_count  number of positioned tokens
+    """
+
+    __slots__ = ('terms', 'sentences', 'token_count')
+
+    def __init__(self, terms: dict[str, dict], sentences: list[tuple[int, int, int]], token_count: int):
+        self.terms = terms
+        self.sentences = sentences
+        self.token_count = token_count
+
+
+def analyze(text: str) -> Analysis:
+    """
+    Tokenize text with positions and split it into sentences in a single
+    pass.  `analyze(text).terms == tokenize_with_positions(text)`.
+
+    If NLTK fails, falls back to simple tokenization with no sentences.
+    """
+    if not text:
+        return Analysis({}, [], 0)
+
+    try:
+        if _use_pool(text):
+            return _analyze_parallel(text)
+        return _analyze(text)
+    except Exception as exc:
+        logger.error('Text analysis failed: %s', exc, exc_info=True)
+        # Fallback: positional map from simple tokenization
+        positions, original_counts, token_count, _ = _simple_span(text)
+        return Analysis(_finalize(positions, original_counts), [], token_count)
+
+
+class StreamAnalyzer:
+    """
+    `analyze()` over a stream of text chunks (e.g. `extractor.iter_text()`),
+    holding only the chunks not yet analysed.
+
+    Token positions carry on from chunk to chunk; sentences are split within
+    each chunk, so chunks should end at page or paragraph breaks.  Each
+    chunk's sentences are handed to `on_sentences(chunk, sentences)` —
+    character offsets relative to the chunk, token positions absolute — and
+    not kept, so the returned Analysis has no `sentences`.
+
+    With TOKENIZER_WORKERS > 1, chunks are batched up to
+    TOKENIZER_PARALLEL_MIN_CHARS and each batch is analysed in the process
+    pool.
+    """
+
+    def __init__(self, on_sentences=None):
+        self._on_sentences = on_sentences
+        self._positions: dict[str, list[int]] = {}
+        self._original_counts: dict[str, dict[str, int]] = {}
+        self._offset = 0
+        self._pending: list[str] = []
+        self._pending_chars = 0
+
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        self._pending.append(chunk)
+        self._pending_chars += len(chunk)
+        if (
+            _setting('TOKENIZER_WORKERS', 0) <= 1
+            or self._pending_chars >= _setting('TOKENIZER_PARALLEL_MIN_CHARS', 1_000_000)
+        ):
+            self._flush()
+
+    def close(self) -> Analysis:
+        self._flush()
+        return Analysis(_finalize(self._positions, self._original_counts), [], self._offset)
+
+    def _flush(self):
+        chunks = self._pending
+        if not chunks:
+            return
+        parallel = _setting('TOKENIZER_WORKERS', 0) > 1 and len(chunks) > 1 and (
+            self._pending_chars >= _setting('TOKENIZER_PARALLEL_MIN_CHARS', 1_000_000)
+        )
+        self._pending, self._pending_chars = [], 0
+
+        try:
+            if parallel:
+                chunksize = max(1, len(chunks) // (_setting('TOKENIZER_WORKERS', 0) * 4))
+                results = list(_get_pool().map(_analyze_span, chunks, chunksize=chunksize))
+            else:
+                results = [_analyze_span(chunk) for chunk in chunks]
+        except Exception as exc:
+            logger.error('Text analysis failed: %s', exc, exc_info=True)
+            results = [_simple_span(chunk) for chunk in chunks]
+
+        for chunk, (span_positions, span_originals, span_tokens, span_sentences) in zip(chunks, results):
+            _merge_span(self._positions, self._original_counts, span_positions, span_originals, self._offset)
+            if self._on_sentences is not None:
+                self._on_sentences(chunk, [
+                    (start, end, first + self._offset) for start, end, first in span_sentences
+                ])
+            self._offset += span_tokens
+
+
 def tokenize_with_positions(text: str) -> dict[str, dict]:
     """
     Tokenize text and record the 0-based token-offset position of every
@@ -84,21 +241,7 @@ def tokenize_with_positions(text: str) -> dict[str, dict]:
             ...
         }
     """
-    if not text:
-        return {}
-
-    try:
-        return _tokenize_with_positions(text)
-    except Exception as exc:
-        logger.error('Position-aware tokenization failed: %s', exc, exc_info=True)
-        # Fallback: positional map from simple tokenization
-        tokens = _simple_tokenize(text)
-        result: dict[str, dict] = {}
-        for pos, token in enumerate(tokens):
-            if token not in result:
-                result[token] = {'positions': [], 'original': token}
-            result[token]['positions'].append(pos)
-        return result
+    return analyze(text).terms
 
 
 # ---------------------------------------------------------------------------
@@ -107,65 +250,280 @@ def tokenize_with_positions(text: str) -> dict[str, dict]:
 
 _ALPHA_RE = re.compile(r'^[a-z]+$')
 
+# Whitespace-delimited chunks of a sentence, and chunks made only of the
+# closing brackets / quotes Treebank allows after a sentence-final period
+# (a leading " or '' after whitespace is an opening quote to Treebank).
+_CHUNK_RE = re.compile(r'\S+')
+_CLOSING_RE = re.compile(r'''^(?!"|'')[\])}>"'»”’]+$''')
 
-def _tokenize(text: str) -> list[str]:
+# Alphabetic words Treebank splits in two (can|not, gon|na, ...).
+_TREEBANK_SPLIT_WORDS = frozenset({'cannot', 'gimme', 'gonna', 'gotta', 'lemme', 'wanna'})
+
+
+def _sentence_spans(text: str):
+    """`(start, end)` character offsets of each Punkt sentence in `text`."""
     try:
-        from nltk.tokenize import word_tokenize
-        raw_tokens = word_tokenize(text.lower())
+        from nltk.tokenize import _get_punkt_tokenizer
+        punkt = _get_punkt_tokenizer('english')
     except LookupError:
         import nltk
         nltk.download('punkt_tab', quiet=True)
-        from nltk.tokenize import word_tokenize
-        raw_tokens = word_tokenize(text.lower())
+        from nltk.tokenize import _get_punkt_tokenizer
+        punkt = _get_punkt_tokenizer('english')
+    return punkt.span_tokenize(text)
+
+
+def _sentence_words(sentence: str) -> list[str] | tuple[str, ...]:
+    """Word tokens of one lowercased sentence from the configured backend."""
+    if _backend() == 'nltk':
+        return _get_treebank().tokenize(sentence)
+    return _regex_sentence_words(sentence)
 
+
+def _get_treebank():
+    global _treebank
+    if _treebank is None:
+        from nltk.tokenize import NLTKWordTokenizer
+        _treebank = NLTKWordTokenizer()
+    return _treebank
+
+
+def _regex_sentence_words(sentence: str) -> list[str]:
+    """
+    The alphabetic tokens NLTK's Treebank tokenizer would produce for one
+    sentence, without running its regex cascade over the whole sentence.
+
+    Treebank only inserts token breaks next to punctuation, and every rule
+    looks no further than the neighbouring whitespace — except the
+    sentence-final period and a sentence-initial quote.  So a single regex
+    scan yields the sentence's whitespace chunks: plain `[a-z]+` chunks are
+    tokens as-is, and only chunks containing punctuation go through
+    Treebank, one chunk at a time with its sentence position, memoized.
+    """
+    spans = [m.span() for m in _CHUNK_RE.finditer(sentence)]
+    chunks = [sentence[start:end] for start, end in spans]
+    # A final period may be followed by chunks of closing quotes/brackets,
+    # separated by plain spaces only.
+    tail = len(chunks) - 1
+    while (
+        tail > 0
+        and _CLOSING_RE.match(chunks[tail])
+        and not sentence[spans[tail - 1][1]:spans[tail][0]].strip(' ')
+    ):
+        tail -= 1
+
+    tokens: list[str] = []
+    for i, chunk in enumerate(chunks):
+        if _ALPHA_RE.match(chunk) and chunk not in _TREEBANK_SPLIT_WORDS:
+            tokens.append(chunk)
+        else:
+            # Some rules match a literal space, so pass on the actual
+            # whitespace character on either side of the chunk.
+            start, end = spans[i]
+            before = '' if i == 0 else sentence[start - 1]
+            after = '' if i >= tail else sentence[end]
+            tokens.extend(_chunk_words(chunk, before, after))
+    return tokens
+
+
+@lru_cache(maxsize=65_536)
+def _chunk_words(chunk: str, before: str, after: str) -> tuple[str, ...]:
+    # Neighbouring chunks are stood in for by 'x', so rules that look at the
+    # surrounding whitespace see the same context as in the full sentence.
+    # An empty `before`/`after` marks the start/end of the sentence.
+    first, last = not before, not after
+    words = _get_treebank().tokenize(('' if first else 'x' + before) + chunk + ('' if last else after + 'x'))
+    if not first:
+        words = words[1:]
+    if not last:
+        words = words[:-1]
+    return tuple(w for w in words if _ALPHA_RE.match(w))
+
+
+def _tokenize(text: str) -> list[str]:
     stop_words = _get_stopwords()
-    stemmer = _get_stemmer()
+    stem = _get_stem()
 
     result = []
-    for tok in raw_tokens:
-        if not _ALPHA_RE.match(tok):
-            continue
-        if tok in stop_words:
-            continue
-        result.append(stemmer.stem(tok))
+    for start, end in _sentence_spans(text):
+        for tok in _sentence_words(text[start:end].lower()):
+            if not _ALPHA_RE.match(tok):
+                continue
+            if tok in stop_words:
+                continue
+            result.append(stem(tok))
     return result
 
 
-def _tokenize_with_positions(text: str) -> dict[str, dict]:
-    try:
-        from nltk.tokenize import word_tokenize
-        raw_tokens = word_tokenize(text.lower())
-    except LookupError:
-        import nltk
-        nltk.download('punkt_tab', quiet=True)
-        from nltk.tokenize import word_tokenize
-        raw_tokens = word_tokenize(text.lower())
+def _analyze(text: str) -> Analysis:
+    positions, original_counts, token_count, sentences = _analyze_span(text)
+    return Analysis(_finalize(positions, original_counts), sentences, token_count)
 
+
+def _analyze_span(text: str) -> tuple[dict[str, list[int]], dict[str, dict[str, int]], int, list]:
+    """
+    Analyse one span in a single pass over its sentences.  Returns
+    `(positions, original_counts, token_count, sentences)` with positions
+    and sentence offsets relative to the start of the span.
+    """
     stop_words = _get_stopwords()
-    stemmer = _get_stemmer()
+    stem = _get_stem()
 
-    result: dict[str, dict] = {}
+    positions: dict[str, list[int]] = {}
     original_counts: dict[str, dict[str, int]] = {}   # stemmed → {original → count}
+    sentences: list[tuple[int, int, int]] = []
     offset = 0
-    for tok in raw_tokens:
-        if not _ALPHA_RE.match(tok):
-            continue
-        if tok in stop_words:
-            continue
-        stemmed = stemmer.stem(tok)
-        if stemmed not in result:
-            result[stemmed] = {'positions': [], 'original': tok}
-            original_counts[stemmed] = {}
-        result[stemmed]['positions'].append(offset)
-        original_counts[stemmed][tok] = original_counts[stemmed].get(tok, 0) + 1
-        offset += 1
+    for start, end in _sentence_spans(text):
+        sentences.append((start, end, offset))
+        for tok in _sentence_words(text[start:end].lower()):
+            if not _ALPHA_RE.match(tok):
+                continue
+            if tok in stop_words:
+                continue
+            stemmed = stem(tok)
+            if stemmed not in positions:
+                positions[stemmed] = []
+                original_counts[stemmed] = {}
+            positions[stemmed].append(offset)
+            original_counts[stemmed][tok] = original_counts[stemmed].get(tok, 0) + 1
+            offset += 1
+
+    return positions, original_counts, offset, sentences
+
+
+def _finalize(positions: dict[str, list[int]], original_counts: dict[str, dict[str, int]]) -> dict[str, dict]:
+    # Pick the most frequent original form for each stem (first seen on ties)
+    return {
+        stemmed: {
+            'positions': term_positions,
+            'original': max(original_counts[stemmed], key=original_counts[stemmed].get),
+        }
+        for stemmed, term_positions in positions.items()
+    }
 
-    # Pick the most frequent original form for each stem
-    for stemmed, counts in original_counts.items():
-        best = max(counts, key=counts.get)
-        result[stemmed]['original'] = best
 
-    return result
+# ---------------------------------------------------------------------------
+# Process-pool tokenization
+# ---------------------------------------------------------------------------
+
+def _use_pool(text: str) -> bool:
+    return (
+        _setting('TOKENIZER_WORKERS', 0) > 1
+        and len(text) >= _setting('TOKENIZER_PARALLEL_MIN_CHARS', 1_000_000)
+    )
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import nltk
+
+            # forkserver/spawn: forking the multi-threaded index worker is unsafe.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            _pool = ProcessPoolExecutor(
+                max_workers=_setting('TOKENIZER_WORKERS', 0),
+                mp_context=context,
+                initializer=_init_pool_worker,
+                initargs=(
+                    list(nltk.data.path),
+                    _setting('TOKENIZER_STEM_CACHE_SIZE', 100_000),
+                    _backend(),
+                ),
+            )
+        return _pool
+
+
+def _init_pool_worker(nltk_paths: list[str], stem_cache_size: int, backend: str):
+    global _stem, _pool_backend
+    import nltk
+    nltk.data.path[:0] = [p for p in nltk_paths if p not in nltk.data.path]
+    _stem = lru_cache(maxsize=stem_cache_size)(_get_stemmer().stem)
+    _pool_backend = backend
+
+
+def _split_spans(text: str, parts: int) -> list[str]:
+    """
+    Cut `text` into about `parts` spans, each ending after a paragraph break
+    (or, failing that, whitespace) so no token is split across spans.
+    """
+    target = max(1, len(text) // parts)
+    spans = []
+    start = 0
+    while start < len(text):
+        end = start + target
+        if end >= len(text):
+            spans.append(text[start:])
+            break
+        cut = text.find('\n\n', end, end + target // 2)
+        if cut < 0:
+            cut = end
+            while cut < len(text) and not text[cut].isspace():
+                cut += 1
+        # Keep the whitespace with the previous span, so each span starts
+        # where a sentence does.
+        while cut < len(text) and text[cut].isspace():
+            cut += 1
+        spans.append(text[start:cut])
+        start = cut
+    return spans
+
+
+def _analyze_parallel(text: str) -> Analysis:
+    pool = _get_pool()
+    spans = _split_spans(text, _setting('TOKENIZER_WORKERS', 0) * 4)
+
+    positions: dict[str, list[int]] = {}
+    original_counts: dict[str, dict[str, int]] = {}
+    sentences: list[tuple[int, int, int]] = []
+    offset = 0
+    char_offset = 0
+    # map() yields in span order, so offsets accumulate correctly.
+    results = pool.map(_analyze_span, spans)
+    for span, (span_positions, span_originals, span_tokens, span_sentences) in zip(spans, results):
+        _merge_span(positions, original_counts, span_positions, span_originals, offset)
+        sentences.extend(
+            (start + char_offset, end + char_offset, first + offset)
+            for start, end, first in span_sentences
+        )
+        offset += span_tokens
+        char_offset += len(span)
+
+    return Analysis(_finalize(positions, original_counts), sentences, offset)
+
+
+def _merge_span(
+    positions: dict[str, list[int]],
+    original_counts: dict[str, dict[str, int]],
+    span_positions: dict[str, list[int]],
+    span_originals: dict[str, dict[str, int]],
+    offset: int,
+):
+    """Fold one span's results into the running maps, shifted by `offset`."""
+    for stemmed, term_positions in span_positions.items():
+        merged = positions.get(stemmed)
+        if merged is None:
+            merged = positions[stemmed] = []
+            original_counts[stemmed] = {}
+        merged.extend(p + offset for p in term_positions)
+        counts = original_counts[stemmed]
+        for original, n in span_originals[stemmed].items():
+            counts[original] = counts.get(original, 0) + n
+
+
+def _simple_span(text: str) -> tuple[dict[str, list[int]], dict[str, dict[str, int]], int, list]:
+    """`_analyze_span()` result from simple tokenization, with no sentences."""
+    positions: dict[str, list[int]] = {}
+    original_counts: dict[str, dict[str, int]] = {}
+    tokens = _simple_tokenize(text)
+    for pos, token in enumerate(tokens):
+        if token not in positions:
+            positions[token] = []
+            original_counts[token] = {token: 0}
+        positions[token].append(pos)
+        original_counts[token][token] += 1
+    return positions, original_counts, len(tokens), []
 
 
 def _simple_tokenize(text: str) -> list[str]:
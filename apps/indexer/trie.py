@@ -1,13 +1,21 @@
 """
 Trie helpers for prefix autocomplete.
 
-This is the first backend Trie structure for autocomplete. It is intentionally
-in-memory and request-scoped for now; it can be swapped with a cached/Redis
-adapter later without changing the public suggestion API.
+The Trie is in-memory and built per user.  `apps/indexer/suggest_cache.py`
+keeps built tries in a per-process LRU cache and keeps them current with
+`insert()` / `remove()` as the user's documents change.
+
+`CompactTrie` is the read-only counterpart: built in one pass from a sorted
+phrase list into flat arrays, with the same `suggest()` API and a fraction of
+the memory.  `manage.py bench_trie` compares the two.
 """
 
 from __future__ import annotations
 
+import sys
+from array import array
+from bisect import insort
+
 
 class _TrieNode:
     __slots__ = ('children', 'top_keys')
@@ -20,11 +28,16 @@ class _TrieNode:
 class PrefixTrie:
     """Stores phrases and returns top prefix-matching suggestions."""
 
+    # Rough per-object costs used by estimated_size() (CPython, 64-bit).
+    _NODE_BYTES = 240
+    _ENTRY_BYTES = 160
+
     def __init__(self, max_node_suggestions: int = 32):
         self.root = _TrieNode()
         self.max_node_suggestions = max_node_suggestions
         self._display_map: dict[str, str] = {}
         self._score_map: dict[str, float] = {}
+        self._node_count = 1
 
     @staticmethod
     def _normalize(text: str) -> str:
@@ -42,9 +55,78 @@ class PrefixTrie:
         node = self.root
         self._update_node_top_keys(node, key)
         for char in key:
-            node = node.children.setdefault(char, _TrieNode())
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+                self._node_count += 1
+            node = child
             self._update_node_top_keys(node, key)
 
+    def remove(self, phrase: str) -> bool:
+        """
+        Remove a phrase.  Returns False if it was not present.
+
+        Every node's top_keys is the top-k of its subtree, so after dropping
+        the key each affected node is refilled from its children's top_keys
+        (deepest first), and nodes left without keys are pruned.
+        """
+        key = self._normalize(phrase)
+        if key not in self._score_map:
+            return False
+
+        del self._score_map[key]
+        self._display_map.pop(key, None)
+
+        path = [self.root]
+        for char in key:
+            node = path[-1].children.get(char)
+            if node is None:
+                break
+            path.append(node)
+
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            if key not in node.top_keys:
+                # Not in this subtree's top-k, so not in any ancestor's either.
+                break
+            self._refill_node_top_keys(node, key[:depth])
+            if depth and not node.top_keys:
+                del path[depth - 1].children[key[depth - 1]]
+                self._node_count -= 1
+        return True
+
+    def __len__(self) -> int:
+        return len(self._score_map)
+
+    def items(self):
+        """Yield `(phrase, weight)` for every stored phrase."""
+        for key, score in self._score_map.items():
+            yield self._display_map[key], score
+
+    def copy(self) -> PrefixTrie:
+        """An independent copy, edited while readers keep using this one."""
+        clone = PrefixTrie(max_node_suggestions=self.max_node_suggestions)
+        clone._display_map = dict(self._display_map)
+        clone._score_map = dict(self._score_map)
+        clone._node_count = self._node_count
+        stack = [(self.root, clone.root)]
+        while stack:
+            node, twin = stack.pop()
+            twin.top_keys = list(node.top_keys)
+            for char, child in node.children.items():
+                twin.children[char] = _TrieNode()
+                stack.append((child, twin.children[char]))
+        return clone
+
+    def estimated_size(self) -> int:
+        """Approximate memory footprint in bytes (used for cache budgeting)."""
+        key_bytes = sum(len(k) + len(self._display_map.get(k, '')) for k in self._score_map)
+        return (
+            self._node_count * self._NODE_BYTES
+            + len(self._score_map) * self._ENTRY_BYTES
+            + key_bytes
+        )
+
     def suggest(self, prefix: str, limit: int = 8) -> list[str]:
         normalized_prefix = self._normalize(prefix)
         if not normalized_prefix:
@@ -59,11 +141,219 @@ class PrefixTrie:
         keys = node.top_keys[: max(0, limit)]
         return [self._display_map[k] for k in keys]
 
+    def _rank(self, key: str) -> tuple[float, str]:
+        return -self._score_map[key], key
+
     def _update_node_top_keys(self, node: _TrieNode, key: str):
-        if key not in node.top_keys:
-            node.top_keys.append(key)
+        # top_keys is kept sorted, so one binary-search insert replaces a
+        # full re-sort of the list at every node on the path.
+        top = node.top_keys
+        if key in top:
+            top.remove(key)
+        elif len(top) >= self.max_node_suggestions and self._rank(key) >= self._rank(top[-1]):
+            return
+
+        insort(top, key, key=self._rank)
+        del top[self.max_node_suggestions :]
+
+    def _refill_node_top_keys(self, node: _TrieNode, prefix: str):
+        candidates = set()
+        if prefix in self._score_map:
+            candidates.add(prefix)
+        for child in node.children.values():
+            candidates.update(child.top_keys)
+
+        node.top_keys = sorted(candidates, key=self._rank)
+        del node.top_keys[self.max_node_suggestions :]
+
+
+class _Layout:
+    """Flat breadth-first radix-trie arrays shared by CompactTrie and trie_store."""
+
+    __slots__ = ('depth', 'rep', 'first_child', 'child_count', 'edges', 'top_start', 'top_ids')
+
+    def __init__(self):
+        self.depth = array('I')
+        self.rep = array('I')
+        self.first_child = array('I')
+        self.child_count = array('I')
+        self.edges: list = []
+        self.top_start = array('I', [0])
+        self.top_ids = array('I')
+
+
+def build_layout(keys, weights: list[float], max_node_suggestions: int) -> _Layout:
+    """
+    Lay out a radix trie over `keys`, which must be sorted and unique.
+
+    Keys may be `str` or `bytes`; `edges[n]` is then the first character
+    (or byte value) of node n's edge label, and None for the root.
+    """
+    layout = _Layout()
+    depth, rep = layout.depth, layout.rep
+    first_child, child_count = layout.first_child, layout.child_count
+    edges = layout.edges
+    ranges: list[tuple[int, int]] = []
 
-        node.top_keys.sort(key=lambda k: (-self._score_map[k], k))
-        if len(node.top_keys) > self.max_node_suggestions:
-            del node.top_keys[self.max_node_suggestions :]
+    def add_node(lo: int, hi: int, parent_depth: int):
+        # A node spells the longest common prefix of its key range;
+        # sorted order means comparing the first and last key suffices.
+        a, b = keys[lo], keys[hi - 1]
+        d = parent_depth + 1
+        limit = min(len(a), len(b))
+        while d < limit and a[d] == b[d]:
+            d += 1
+        depth.append(d)
+        rep.append(lo)
+        edges.append(a[parent_depth])
+        ranges.append((lo, hi))
+
+    if keys:
+        depth.append(0)
+        rep.append(0)
+        edges.append(None)
+        ranges.append((0, len(keys)))
+
+    node = 0
+    while node < len(ranges):
+        lo, hi = ranges[node]
+        d = depth[node]
+        if lo < hi and len(keys[lo]) == d:
+            lo += 1  # terminal key of this node; it has no child edge
+        first_child.append(len(ranges))
+        count = 0
+        while lo < hi:
+            char = keys[lo][d]
+            group_end = lo + 1
+            while group_end < hi and keys[group_end][d] == char:
+                group_end += 1
+            add_node(lo, group_end, d)
+            count += 1
+            lo = group_end
+        child_count.append(count)
+        node += 1
+
+    # Top-k bottom-up: a node's best keys come from its own terminal key and
+    # its children's lists.  Ties break on key id, i.e. on the key.
+    tops: list[list[int]] = [[] for _ in ranges]
+    for node in range(len(ranges) - 1, -1, -1):
+        lo, _ = ranges[node]
+        candidates = [lo] if len(keys[lo]) == depth[node] else []
+        first = first_child[node]
+        for child in range(first, first + child_count[node]):
+            candidates.extend(tops[child])
+        candidates.sort(key=lambda i: (-weights[i], i))
+        tops[node] = candidates[:max_node_suggestions]
+
+    for top in tops:
+        layout.top_ids.extend(top)
+        layout.top_start.append(len(layout.top_ids))
+    return layout
+
+
+def normalized_phrases(phrases) -> tuple[list[str], list[str], list[float]]:
+    """
+    Normalize and de-duplicate `phrase` / `(phrase, weight)` items.
+
+    Returns parallel `(keys, displays, weights)` lists sorted by key; for a
+    repeated key the highest weight wins.
+    """
+    best: dict[str, tuple[float, str]] = {}
+    for item in phrases:
+        phrase, weight = (item, 1.0) if isinstance(item, str) else item
+        key = PrefixTrie._normalize(phrase)
+        if len(key) < 2:
+            continue
+        if key not in best or weight > best[key][0]:
+            best[key] = (weight, phrase.strip())
+
+    keys = sorted(best)
+    return keys, [best[k][1] for k in keys], [best[k][0] for k in keys]
+
+
+class CompactTrie:
+    """
+    Immutable, array-backed radix trie with precomputed top-k per node.
+
+    Phrases are normalized, de-duplicated (highest weight wins) and sorted,
+    so every node's subtree is a contiguous run of key ids.  Nodes are laid
+    out breadth-first, which makes each node's children contiguous too:
+
+      - `_depth[n]`        length of the prefix node n spells
+      - `_rep[n]`          id of a key in n's subtree (its prefix is
+                           `keys[_rep[n]][:_depth[n]]`, so edge labels are
+                           never stored separately)
+      - `_first_child[n]`, `_child_count[n]`
+      - `_edge_chars`      first character of each node's edge, for a
+                           C-speed `str.find` over a node's children
+      - `_top_start[n]` … `_top_start[n + 1]` slice of `_top_ids`, the
+                           node's best key ids by (-weight, key)
+
+    Changes require a rebuild; use PrefixTrie when the set is edited in place.
+    """
+
+    def __init__(self, max_node_suggestions: int = 32):
+        self.max_node_suggestions = max_node_suggestions
+        self._keys: list[str] = []
+        self._display: list[str] = []
+        self._depth = array('I')
+        self._rep = array('I')
+        self._first_child = array('I')
+        self._child_count = array('I')
+        self._edge_chars = ''
+        self._top_start = array('I', [0])
+        self._top_ids = array('I')
+        self._size = 0
+
+    @classmethod
+    def from_phrases(cls, phrases, max_node_suggestions: int = 32) -> CompactTrie:
+        """Build from an iterable of `phrase` or `(phrase, weight)` items."""
+        trie = cls(max_node_suggestions)
+        trie._keys, trie._display, weights = normalized_phrases(phrases)
+
+        layout = build_layout(trie._keys, weights, max_node_suggestions)
+        trie._depth, trie._rep = layout.depth, layout.rep
+        trie._first_child, trie._child_count = layout.first_child, layout.child_count
+        trie._top_start, trie._top_ids = layout.top_start, layout.top_ids
+        trie._edge_chars = ''.join(c or '\0' for c in layout.edges)
+        trie._size = (
+            sum(
+                sys.getsizeof(a)
+                for a in (trie._depth, trie._rep, trie._first_child, trie._child_count,
+                          trie._top_start, trie._top_ids)
+            )
+            + sys.getsizeof(trie._edge_chars)
+            + sum(sys.getsizeof(k) + sys.getsizeof(d) for k, d in zip(trie._keys, trie._display))
+            + 16 * len(trie._keys)
+        )
+        return trie
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def estimated_size(self) -> int:
+        """Approximate memory footprint in bytes (used for cache budgeting)."""
+        return self._size
+
+    def suggest(self, prefix: str, limit: int = 8) -> list[str]:
+        normalized_prefix = PrefixTrie._normalize(prefix)
+        if not normalized_prefix or not self._keys:
+            return []
+
+        keys, depth = self._keys, self._depth
+        node, pos, end = 0, 0, len(normalized_prefix)
+        while pos < end:
+            first = self._first_child[node]
+            child = self._edge_chars.find(
+                normalized_prefix[pos], first, first + self._child_count[node],
+            )
+            if child < 0:
+                return []
+            stop = min(depth[child], end)
+            if keys[self._rep[child]][pos:stop] != normalized_prefix[pos:stop]:
+                return []
+            node, pos = child, stop
 
+        start = self._top_start[node]
+        stop = min(self._top_start[node + 1], start + max(0, limit))
+        return [self._display[i] for i in self._top_ids[start:stop]]
@@ -0,0 +1,256 @@
+"""
+On-disk autocomplete trie snapshots.
+
+A snapshot is a user's phrase set at one CorpusStatistic.suggestion_version,
+laid out as a radix trie over UTF-8 keys (see `trie.build_layout`) in a
+single binary file:
+
+    header   magic, format, byte order, version, counts, section offsets
+    uint32   key offsets, display offsets          (n_keys + 1 each)
+    float64  weights                                (n_keys)
+    uint32   depth, representative key, first child, child count  (n_nodes)
+    uint32   top-k start offsets (n_nodes + 1), top-k key ids
+    bytes    first byte of each node's edge label   (n_nodes)
+    bytes    UTF-8 keys, UTF-8 display phrases
+
+`MappedTrie` opens a snapshot with mmap and answers `suggest()` straight from
+the mapped buffer — nothing is deserialized, so every worker process on the
+host shares one copy in the page cache and a cold worker answers its first
+request without building anything.
+
+Files live in AUTOCOMPLETE_SNAPSHOT_DIR/<user_id>/<version>.trie and are
+written atomically (temp file + rename).  Older versions of a user's
+snapshot are removed once a newer one is in place; processes that still map
+them keep reading the unlinked file until they move on.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+
+from django.conf import settings
+
+from apps.indexer.trie import PrefixTrie, build_layout, normalized_phrases
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'LORETRIE'
+FORMAT_VERSION = 1
+
+# magic, format, little-endian flag, max_node_suggestions, suggestion version,
+# n_keys, n_nodes, n_top, then the byte offset of each of the 13 sections.
+_HEADER = struct.Struct('<8sIII Q III 13Q')
+_BYTE_ORDER = 1 if sys.byteorder == 'little' else 0
+
+# A process that replays this many deltas on top of a snapshot writes a new
+# one, so cold workers never have to replay a long chain.
+RESNAPSHOT_AFTER = 50
+
+
+def snapshot_dir() -> Path | None:
+    """Configured snapshot directory, or None when snapshots are disabled."""
+    path = getattr(settings, 'AUTOCOMPLETE_SNAPSHOT_DIR', '')
+    return Path(path) if path else None
+
+
+def save(user_id: int, version: int, phrases, max_node_suggestions: int = 32) -> Path | None:
+    """
+    Write the snapshot for `user_id` at `version` from `(phrase, weight)`
+    items.  Returns the file path, or None when snapshots are disabled or
+    the file could not be written.
+    """
+    root = snapshot_dir()
+    if root is None:
+        return None
+
+    keys, displays, weights = normalized_phrases(phrases)
+    key_bytes = [k.encode('utf-8', 'surrogatepass') for k in keys]
+    display_bytes = [d.encode('utf-8', 'surrogatepass') for d in displays]
+    layout = build_layout(key_bytes, weights, max_node_suggestions)
+
+    sections = [
+        _offsets(key_bytes),
+        _offsets(display_bytes),
+        array('d', weights),
+        layout.depth,
+        layout.rep,
+        layout.first_child,
+        layout.child_count,
+        layout.top_start,
+        layout.top_ids,
+        bytes(b or 0 for b in layout.edges),
+        b''.join(key_bytes),
+        b''.join(display_bytes),
+    ]
+
+    body = bytearray()
+    offsets = []
+    for section in sections:
+        body.extend(b'\0' * (-(_HEADER.size + len(body)) % 8))
+        offsets.append(_HEADER.size + len(body))
+        body.extend(section.tobytes() if isinstance(section, array) else section)
+    offsets.append(_HEADER.size + len(body))
+
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, _BYTE_ORDER, max_node_suggestions, version,
+        len(keys), len(layout.depth), len(layout.top_ids), *offsets,
+    )
+
+    user_dir = root / str(user_id)
+    path = user_dir / f'{version}.trie'
+    try:
+        user_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=user_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(header)
+            fh.write(body)
+        os.replace(tmp, path)
+    except OSError as exc:
+        logger.warning('trie_store: could not write %s: %s', path, exc)
+        return None
+
+    _prune(user_dir, below=version)
+    logger.debug('trie_store: wrote %s (%d phrases, %d bytes)', path, len(keys), len(header) + len(body))
+    return path
+
+
+def open_latest(user_id: int, max_version: int):
+    """
+    Map the newest snapshot of `user_id` whose version is at most
+    `max_version`.  Returns a MappedTrie or None.
+    """
+    root = snapshot_dir()
+    if root is None:
+        return None
+
+    user_dir = root / str(user_id)
+    try:
+        versions = [
+            int(p.stem) for p in user_dir.glob('*.trie')
+            if p.stem.isdigit() and int(p.stem) <= max_version
+        ]
+    except OSError:
+        return None
+    if not versions:
+        return None
+
+    version = max(versions)
+    try:
+        return MappedTrie(user_dir / f'{version}.trie')
+    except (OSError, ValueError) as exc:
+        logger.warning('trie_store: ignoring snapshot user=%s v%s: %s', user_id, version, exc)
+        return None
+
+
+def thaw(trie) -> PrefixTrie:
+    """Copy a MappedTrie into an editable PrefixTrie."""
+    editable = PrefixTrie(max_node_suggestions=trie.max_node_suggestions)
+    for phrase, weight in trie.items():
+        editable.insert(phrase, weight=weight)
+    return editable
+
+
+class MappedTrie:
+    """Read-only trie answering `suggest()` directly from a mapped snapshot."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < _HEADER.size:
+            raise ValueError('truncated snapshot')
+        (
+            magic, fmt, byte_order, self.max_node_suggestions, self.version,
+            self._n_keys, n_nodes, _, *offsets,
+        ) = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or fmt != FORMAT_VERSION or byte_order != _BYTE_ORDER:
+            raise ValueError('incompatible snapshot format')
+        if offsets[-1] != len(self._mm):
+            raise ValueError('truncated snapshot')
+
+        view = memoryview(self._mm)
+
+        def sized(i, fmt, count):
+            size = struct.calcsize(fmt)
+            return view[offsets[i]:offsets[i] + size * count].cast(fmt)
+
+        n = self._n_keys
+        self._key_offsets = sized(0, 'I', n + 1)
+        self._display_offsets = sized(1, 'I', n + 1)
+        self._weights = sized(2, 'd', n)
+        self._depth = sized(3, 'I', n_nodes)
+        self._rep = sized(4, 'I', n_nodes)
+        self._first_child = sized(5, 'I', n_nodes)
+        self._child_count = sized(6, 'I', n_nodes)
+        self._top_start = sized(7, 'I', n_nodes + 1)
+        top_count = self._top_start[n_nodes] if n_nodes else 0
+        self._top_ids = sized(8, 'I', top_count)
+        self._edges_at = offsets[9]
+        self._keys_at = offsets[10]
+        self._displays_at = offsets[11]
+
+    def __len__(self) -> int:
+        return self._n_keys
+
+    def estimated_size(self) -> int:
+        # Mapped pages are shared and reclaimable, but counting them keeps
+        # the number of open mappings bounded by the cache budget.
+        return len(self._mm)
+
+    def suggest(self, prefix: str, limit: int = 8) -> list[str]:
+        normalized_prefix = PrefixTrie._normalize(prefix).encode('utf-8', 'surrogatepass')
+        if not normalized_prefix or not self._n_keys:
+            return []
+
+        mm, depth = self._mm, self._depth
+        node, pos, end = 0, 0, len(normalized_prefix)
+        while pos < end:
+            first = self._edges_at + self._first_child[node]
+            child = mm.find(normalized_prefix[pos:pos + 1], first, first + self._child_count[node])
+            if child < 0:
+                return []
+            child -= self._edges_at
+            stop = min(depth[child], end)
+            key_at = self._keys_at + self._key_offsets[self._rep[child]]
+            if mm[key_at + pos:key_at + stop] != normalized_prefix[pos:stop]:
+                return []
+            node, pos = child, stop
+
+        start = self._top_start[node]
+        stop = min(self._top_start[node + 1], start + max(0, limit))
+        return [self._display(i) for i in self._top_ids[start:stop]]
+
+    def items(self):
+        """Yield `(phrase, weight)` for every stored phrase."""
+        for i in range(self._n_keys):
+            yield self._display(i), self._weights[i]
+
+    def _display(self, i: int) -> str:
+        at = self._displays_at
+        return self._mm[at + self._display_offsets[i]:at + self._display_offsets[i + 1]].decode(
+            'utf-8', 'surrogatepass',
+        )
+
+
+def _offsets(chunks: list[bytes]) -> array:
+    offsets = array('I', [0])
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        offsets.append(total)
+    return offsets
+
+
+def _prune(user_dir: Path, below: int):
+    # Only older versions: a concurrent writer may already have a newer one.
+    for path in user_dir.glob('*.trie'):
+        if path.stem.isdigit() and int(path.stem) < below:
+            try:
+                path.unlink()
+            except OSError:
+                pass
@@ -3,17 +3,14 @@ from .models import UploadedFile
 
 
 def reindex_selected_files(modeladmin, request, queryset):
-    """Admin action — clears index entries for the selected files and re-indexes them."""
-    from apps.indexer.models import InvertedIndex, DocumentPhrase
+    """Admin action — re-indexes the selected files, replacing their index entries."""
     from apps.indexer.pipeline import index_document
 
     ok = failed = 0
     for f in queryset:
-        # Reset status and clear old entries for a clean rebuild
+        # Reset status for a clean rebuild (index_document replaces the old entries)
         f.status = 'pending'
         f.save(update_fields=['status'])
-        InvertedIndex.objects.filter(document=f).delete()
-        DocumentPhrase.objects.filter(document=f).delete()
 
         if index_document(f.pk):
             ok += 1
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('upload', '0004_uploadedfile_add_txt_file_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 (hex) of the file bytes, computed on upload.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='uploadedfile',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Identical file of the same user whose index this file was copied from.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='upload.uploadedfile'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfile',
+            index=models.Index(fields=['uploaded_by', 'content_hash'], name='upload_uplo_uploade_04cb2f_idx'),
+        ),
+    ]
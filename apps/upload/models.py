@@ -32,9 +32,26 @@ class UploadedFile(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(null=True, blank=True)    # For soft deletion
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text='SHA-256 (hex) of the file bytes, computed on upload.',
+    )
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates',
+        help_text='Identical file of the same user whose index this file was copied from.',
+    )
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['uploaded_by', 'content_hash']),
+        ]
 
     def __str__(self):
         return f'{self.original_filename} ({self.uploaded_by.username})'
@@ -1,6 +1,5 @@
 import logging
 import os
-import threading
 from django.utils import timezone
 
 from .models import UploadedFile
@@ -20,6 +19,8 @@ class FileUploadService:
         """
         file_type = UploadUtils.get_canonical_file_type(file.name)
 
+        # Hashed while streaming the upload; lets the indexer copy the index
+        # of an identical file the user already has instead of re-extracting.
         uploaded_file = UploadedFile.objects.create(
             file=file,
             original_filename=file.name,
@@ -27,6 +28,7 @@ class FileUploadService:
             file_size=file.size,
             uploaded_by=user,
             status='pending',
+            content_hash=UploadUtils.content_hash(file),
         )
 
         logger.info(
@@ -34,20 +36,16 @@ class FileUploadService:
             uploaded_file.id, uploaded_file.original_filename, user.username,
         )
 
-        # Trigger indexing in a daemon background thread so the upload
-        # response is not blocked.  To swap in Celery later, replace this
-        # block with: index_document.delay(uploaded_file.id)
-        def _run_indexing(file_id):
-            from apps.indexer.pipeline import index_document
-            index_document(file_id)
-
-        thread = threading.Thread(
-            target=_run_indexing,
-            args=(uploaded_file.id,),
-            daemon=True,
-            name=f'indexer-{uploaded_file.id}',
-        )
-        thread.start()
+        try:
+            from apps.indexer.services import AutocompleteService
+            AutocompleteService.record_file_added(uploaded_file)
+        except Exception as exc:
+            logger.error('Failed to publish autocomplete update for file=%s: %s', uploaded_file.id, exc)
+
+        # Queue the file for indexing; `manage.py index_worker` picks it up.
+        # The job row is durable, so nothing is lost if this process restarts.
+        from apps.indexer import jobs
+        jobs.enqueue(uploaded_file.id)
 
         return uploaded_file
 
@@ -82,6 +80,7 @@ class FileUploadService:
         if not new_name:
             raise ValueError('Filename must not be empty.')
 
+        old_filename = uploaded_file.original_filename
         old_abs_path = uploaded_file.file.path          # absolute path on disk
         old_rel_name = uploaded_file.file.name          # relative path stored in DB
 
@@ -95,6 +94,7 @@ class FileUploadService:
         if os.path.abspath(old_abs_path) == os.path.abspath(new_abs_path):
             uploaded_file.original_filename = new_name
             uploaded_file.save(update_fields=['original_filename', 'updated_at'])
+            FileUploadService._record_rename(uploaded_file, old_filename)
             return uploaded_file
 
         # Guard: don't clobber a different existing file
@@ -113,8 +113,17 @@ class FileUploadService:
             'File renamed on disk: id=%s old=%s new=%s user=%s',
             uploaded_file.id, old_abs_path, new_abs_path, uploaded_file.uploaded_by.username,
         )
+        FileUploadService._record_rename(uploaded_file, old_filename)
         return uploaded_file
 
+    @staticmethod
+    def _record_rename(uploaded_file, old_filename: str):
+        try:
+            from apps.indexer.services import AutocompleteService
+            AutocompleteService.record_file_renamed(uploaded_file, old_filename)
+        except Exception as exc:
+            logger.error('Failed to publish autocomplete update for file=%s: %s', uploaded_file.id, exc)
+
     @staticmethod
     def delete_file(uploaded_file):
         """
@@ -135,8 +144,26 @@ class FileUploadService:
         except Exception as exc:
             logger.error('Failed to remove index entries for file=%s: %s', file_name, exc)
 
+        try:
+            from apps.indexer.services import AutocompleteService
+            AutocompleteService.record_file_removed(uploaded_file)
+        except Exception as exc:
+            logger.error('Failed to publish autocomplete update for file=%s: %s', file_name, exc)
+
         uploaded_file.deleted_at = timezone.now()
         uploaded_file.status = 'deleted'
         uploaded_file.save()
 
+        try:
+            from apps.indexer import text_cache
+            text_cache.discard(uploaded_file)
+        except Exception as exc:
+            logger.error('Failed to drop cached text for file=%s: %s', file_name, exc)
+
+        try:
+            from apps.indexer.pipeline import sync_deleted_flag
+            sync_deleted_flag(uploaded_file)
+        except Exception as exc:
+            logger.error('Failed to flag index rows as deleted for file=%s: %s', file_name, exc)
+
         logger.info('File deleted: name=%s user=%s', file_name, user)
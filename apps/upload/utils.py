@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'png', 'jpg', 'jpeg', 'md', 'txt'}
@@ -53,3 +54,11 @@ class UploadUtils:
     def get_canonical_file_type(filename):
         """Return the canonical file type string stored in the model"""
         return UploadUtils.get_file_extension(filename)
+
+    @staticmethod
+    def content_hash(file):
+        """Return the hex SHA-256 of an uploaded file, read chunk by chunk"""
+        digest = hashlib.sha256()
+        for chunk in file.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
@@ -134,6 +134,82 @@ NLTK_DATA_PATH = env('NLTK_DATA', default=str(BASE_DIR / 'data' / 'nltk'))
 os.makedirs(NLTK_DATA_PATH, exist_ok=True)
 nltk.data.path.insert(0, NLTK_DATA_PATH)
 
+# Tokenizer: word tokenization backend ('regex' — fast, same output as
+# 'nltk' word_tokenize), stem memo size, and a process pool for very large
+# documents (TOKENIZER_WORKERS <= 1 tokenizes in-process).
+TOKENIZER_BACKEND = env('TOKENIZER_BACKEND', default='regex')
+TOKENIZER_STEM_CACHE_SIZE = env.int('TOKENIZER_STEM_CACHE_SIZE', default=100_000)
+TOKENIZER_WORKERS = env.int('TOKENIZER_WORKERS', default=0)
+TOKENIZER_PARALLEL_MIN_CHARS = env.int('TOKENIZER_PARALLEL_MIN_CHARS', default=1_000_000)
+
+# PDF text extraction: pages are extracted in PDF_EXTRACT_WORKERS worker
+# processes (0 = serially in-process, without timeouts).  A page running
+# longer than PDF_PAGE_TIMEOUT seconds, or any page still pending after
+# PDF_DOCUMENT_TIMEOUT seconds, is skipped and recorded as an
+# ExtractionFailure.
+PDF_EXTRACT_WORKERS = env.int('PDF_EXTRACT_WORKERS', default=2)
+PDF_PAGE_TIMEOUT = env.float('PDF_PAGE_TIMEOUT', default=30)
+PDF_DOCUMENT_TIMEOUT = env.float('PDF_DOCUMENT_TIMEOUT', default=300)
+
+# Extraction sandbox: non-PDF documents are extracted in a reusable worker
+# process (EXTRACTOR_SANDBOX=False extracts in-process).  Workers — including
+# the PDF page workers — are capped at EXTRACTOR_MEMORY_LIMIT_MB of address
+# space (0 = unlimited) and EXTRACTOR_CPU_LIMIT CPU seconds per document or
+# page; a sandboxed document taking longer than EXTRACTOR_TIMEOUT seconds
+# (wall clock) has its worker killed.
+EXTRACTOR_SANDBOX = env.bool('EXTRACTOR_SANDBOX', default=True)
+EXTRACTOR_MEMORY_LIMIT_MB = env.int('EXTRACTOR_MEMORY_LIMIT_MB', default=1024)
+EXTRACTOR_CPU_LIMIT = env.int('EXTRACTOR_CPU_LIMIT', default=120)
+EXTRACTOR_TIMEOUT = env.float('EXTRACTOR_TIMEOUT', default=300)
+
+# OCR (png/jpg): images scanned above OCR_TARGET_DPI are downscaled to it and
+# optionally binarized; images larger than OCR_TILE_PIXELS are split into
+# strips OCR'd by up to OCR_WORKERS Tesseract processes at once.  Results are
+# cached in OCR_CACHE_DIR by image hash and engine configuration (empty
+# disables the cache), least recently used entries evicted beyond
+# OCR_CACHE_MAX_BYTES (0 = unbounded).
+OCR_TESSERACT_CMD = env('OCR_TESSERACT_CMD', default='tesseract')
+OCR_LANG = env('OCR_LANG', default='eng')
+OCR_TARGET_DPI = env.int('OCR_TARGET_DPI', default=300)
+OCR_BINARIZE = env.bool('OCR_BINARIZE', default=True)
+OCR_TILE_PIXELS = env.int('OCR_TILE_PIXELS', default=6_000_000)
+OCR_WORKERS = env.int('OCR_WORKERS', default=2)
+OCR_CACHE_DIR = env('OCR_CACHE_DIR', default=str(BASE_DIR / 'data' / 'ocr'))
+OCR_CACHE_MAX_BYTES = env.int('OCR_CACHE_MAX_BYTES', default=256 * 1024 * 1024)
+
+# Extracted-text cache: PDF/DOCX text is stored (compressed, keyed by file
+# hash and EXTRACTOR_VERSION) so re-indexing skips extraction.
+EXTRACTED_TEXT_CACHE = env.bool('EXTRACTED_TEXT_CACHE', default=True)
+
+# Indexer scoring mode:
+#   'query_time' — IDF is computed per search from the live corpus statistics,
+#                  so rankings never drift as the corpus grows.
+#   'index_time' — rank on the tf_idf snapshot stored when each row was written.
+INDEXER_SCORING_MODE = env('INDEXER_SCORING_MODE', default='query_time')
+
+# InvertedIndex layout applied by `migrate` (see apps/indexer/partitions.py):
+# 0 keeps one table; N > 0 partitions it by user into N hash partitions.
+# Change it later with `manage.py partition_index`.
+INDEXER_PARTITIONS = env.int('INDEXER_PARTITIONS', default=0)
+
+# Write postings and phrases with COPY through a staging table
+# (apps/indexer/bulk_load.py); False uses the ORM's bulk_create instead.
+INDEXER_COPY_LOADER = env.bool('INDEXER_COPY_LOADER', default=True)
+
+# Threads that extract and tokenize documents for `reindex --all --rebuild`
+# (1 analyzes them one by one in the calling thread).
+INDEXER_REBUILD_WORKERS = env.int('INDEXER_REBUILD_WORKERS', default=4)
+
+# Autocomplete trie cache (per process): memory budget for cached user tries,
+# and how often a cached trie re-checks the database for newer versions.
+AUTOCOMPLETE_CACHE_MAX_BYTES = env.int('AUTOCOMPLETE_CACHE_MAX_BYTES', default=64 * 1024 * 1024)
+AUTOCOMPLETE_VERSION_CHECK_INTERVAL = env.float('AUTOCOMPLETE_VERSION_CHECK_INTERVAL', default=1.0)
+# Latency budget for /api/autocomplete; a cold trie answers with partial
+# suggestions instead of blocking past this.
+AUTOCOMPLETE_TIMEOUT_MS = env.int('AUTOCOMPLETE_TIMEOUT_MS', default=50)
+# Shared on-disk trie snapshots (one file per user version); empty disables.
+AUTOCOMPLETE_SNAPSHOT_DIR = env('AUTOCOMPLETE_SNAPSHOT_DIR', default=str(BASE_DIR / 'data' / 'autocomplete'))
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
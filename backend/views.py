@@ -54,10 +54,19 @@ def auto_complete(request):
     """
     Return prefix autocomplete phrase suggestions for the authenticated user.
 
-    Suggestions are built by a Trie over user filenames and indexed content
-    phrases. Response shape remains: {'suggestions': [{'phrase': ...}], ...}.
+    Suggestions come from AutocompleteService's cached Trie over user
+    filenames and indexed content phrases, so a keystroke is an in-memory
+    prefix walk — never a table scan.  The call is bounded by
+    AUTOCOMPLETE_TIMEOUT_MS: if the user's Trie is still being built, partial
+    filename suggestions are returned instead of waiting.  Remaining slots
+    are filled with completions of the last word from the user's indexed
+    vocabulary.
+    Response shape remains: {'suggestions': [{'phrase': ...}], ...}.
     """
-    import re
+    from django.conf import settings
+    from apps.indexer.services import AutocompleteService
+
+    MAX_RESULTS = 8
 
     query = request.GET.get('q', '').strip().lower()
     user  = _get_user_from_request(request)
@@ -65,74 +74,24 @@ def auto_complete(request):
     if not user or not query:
         return JsonResponse({'suggestions': [], 'csrf_token': get_token(request)})
 
-    from apps.upload.models import UploadedFile
-    from apps.indexer.models import DocumentPhrase
-
-    MAX_RESULTS      = 8
-    MAX_PHRASE_WORDS  = 7
-    SHORT_WINDOW      = 4
-
-    seen:    set[str]  = set()
-    phrases: list[str] = []
-
-    def _add(phrase: str) -> bool:
-        key = phrase.lower().strip()
-        if key and key not in seen and len(key) > 1:
-            seen.add(key)
-            phrases.append(phrase.strip())
-            return True
-        return False
-
-    def _clean_filename(filename: str) -> str:
-        name = re.sub(r'\.[^.]+$', '', filename)
-        name = re.sub(r'[\s_\-]+', ' ', name)
-        name = re.sub(r'[()[\]{}]', ' ', name)
-        return re.sub(r'\s{2,}', ' ', name).strip()
-
-    # ── Pass 1: filename-based phrases ────────────────────────────────────
-    filenames = list(
-        UploadedFile.objects
-        .filter(uploaded_by=user, deleted_at=None)
-        .values_list('original_filename', flat=True)
+    phrases = AutocompleteService.get_suggestions(
+        user,
+        query,
+        limit=MAX_RESULTS,
+        timeout=settings.AUTOCOMPLETE_TIMEOUT_MS / 1000,
     )
 
-    for filename in filenames:
-        cleaned = _clean_filename(filename)
-        words   = cleaned.split()
-        for i, word in enumerate(words):
-            if word.lower().startswith(query):
-                full = ' '.join(words[:MAX_PHRASE_WORDS])
-                if len(words) > MAX_PHRASE_WORDS:
-                    full += '…'
-                _add(full)
-                start  = max(0, i - 1)
-                end    = min(len(words), i + SHORT_WINDOW)
-                window = ' '.join(words[start:end])
-                if window.lower() != full.lower():
-                    _add(window)
-                break
-        if len(phrases) >= MAX_RESULTS:
-            break
-
-    # ── Pass 2: content phrases — real sentences from DocumentPhrase ──────
+    # Fill the remaining slots with single-word completions of the last word.
     if len(phrases) < MAX_RESULTS:
-        remaining = MAX_RESULTS - len(phrases)
-        content_phrases = (
-            DocumentPhrase.objects
-            .filter(
-                document__uploaded_by=user,
-                document__deleted_at=None,
-                phrase__icontains=query,
-            )
-            .values_list('phrase', flat=True)
-            [:remaining * 3]    # fetch extra to account for dedup
-        )
-        for raw_phrase in content_phrases:
-            _add(raw_phrase)
+        seen = {p.lower() for p in phrases}
+        for completion in AutocompleteService.get_word_completions(user, query, limit=MAX_RESULTS):
+            if completion not in seen and completion != query:
+                seen.add(completion)
+                phrases.append(completion)
             if len(phrases) >= MAX_RESULTS:
                 break
 
-    suggestions = [{'phrase': p} for p in phrases[:MAX_RESULTS]]
+    suggestions = [{'phrase': p} for p in phrases]
     return JsonResponse({'suggestions': suggestions, 'csrf_token': get_token(request)})
 
 